@@ -0,0 +1,87 @@
+# Benchmark: latency vs. accuracy for single-engine OCR and the ensemble.
+#
+#   python benchmarks/ensemble_ocr.py [image_dir] [--labels labels.json] [--deadline 10]
+#
+# Every image goes through the same preprocess/segment stages, then OCR with
+# Tesseract alone, EasyOCR alone and the Tesseract+EasyOCR ensemble. Reports
+# OCR time per image, document-type accuracy (labels from the file name unless
+# a labels JSON is given) and how often an ID number was read.
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ocr_pipeline import ensemble, stages
+from ocr_pipeline.manifest import IMAGE_EXTENSIONS
+from preprocessing_profiles import DEFAULT_CORPUS, label_from_filename
+
+MODES = ["tesseract", "easyocr", "ensemble"]
+
+
+def run_mode(mode, paths, labels):
+    pipeline = stages.build_pipeline(ocr_config={"engine": mode, "reocr": False}).without("persist")
+    rows = []
+    for path in paths:
+        start = time.perf_counter()
+        ctx = pipeline.run_ctx({"image_path": path})
+        output = ctx["output_data"]
+        file_name = os.path.basename(path)
+        expected = labels.get(file_name, label_from_filename(file_name))
+        rows.append({
+            "file": file_name,
+            "total_time": time.perf_counter() - start,
+            "ocr_time": ctx["timings"]["ocr"] / 1000,
+            "correct": None if expected is None else output["document_type"] == expected,
+            "number": output["cleaned_summary"]["Number"] if output.get("cleaned_summary") else None,
+        })
+    return rows
+
+
+def print_table(results):
+    print("| mode | images | OCR ms (mean) | OCR ms (max) | doc-type acc | ID read |")
+    print("|---|---|---|---|---|---|")
+    for mode, rows in results.items():
+        n = len(rows)
+        if not n:
+            continue
+        labelled = [r for r in rows if r["correct"] is not None]
+        acc = (sum(r["correct"] for r in labelled) / len(labelled)) if labelled else float("nan")
+        print(
+            f"| {mode} | {n} "
+            f"| {1000 * sum(r['ocr_time'] for r in rows) / n:.0f} "
+            f"| {1000 * max(r['ocr_time'] for r in rows):.0f} "
+            f"| {acc:.2f} ({len(labelled)} labelled) "
+            f"| {sum(1 for r in rows if r['number'])}/{n} |"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single engine vs. ensemble OCR benchmark")
+    parser.add_argument("image_dir", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--labels", help="JSON file mapping file name to expected document type")
+    parser.add_argument("--deadline", type=float, help="Ensemble deadline in seconds")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--out", help="Optional path to dump per-image results as JSON")
+    args = parser.parse_args()
+
+    labels = {}
+    if args.labels:
+        with open(args.labels, encoding="utf-8") as f:
+            labels = json.load(f)
+    if args.deadline is not None:
+        ensemble.ENSEMBLE_DEADLINE = args.deadline
+
+    paths = sorted(
+        os.path.join(args.image_dir, f) for f in os.listdir(args.image_dir)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    results = {mode: run_mode(mode, paths, labels) for mode in args.modes}
+    print_table(results)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
@@ -0,0 +1,71 @@
+# Load test against a locally served app.
+#
+#   python serve.py fuzzy_front_back --bind 127.0.0.1:8000 &
+#   python benchmarks/loadtest.py http://127.0.0.1:8000/process/pan2.jpg --requests 64
+#
+# Runs the same GET at 1, 4 and 16 concurrent clients and reports throughput
+# and latency percentiles for each level. Standard library only.
+import argparse
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CONCURRENCY = [1, 4, 16]
+
+
+def fetch(url, timeout):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            resp.read()
+            ok = 200 <= resp.status < 300
+    except (urllib.error.URLError, TimeoutError):
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def run_level(url, concurrency, total, timeout):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: fetch(url, timeout), range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(t for ok, t in results if ok)
+    errors = sum(1 for ok, _ in results if not ok)
+
+    def pct(p):
+        if not latencies:
+            return float("nan")
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p95": pct(95),
+        "max": latencies[-1] if latencies else float("nan"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput at several concurrency levels")
+    parser.add_argument("url")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--warmup", type=int, default=2)
+    args = parser.parse_args()
+
+    for _ in range(args.warmup):
+        fetch(args.url, args.timeout)
+
+    print("| clients | requests | errors | req/s | p50 s | p95 s | max s |")
+    print("|---|---|---|---|---|---|---|")
+    for level in args.concurrency:
+        r = run_level(args.url, level, max(args.requests, level), args.timeout)
+        print(f"| {r['concurrency']} | {r['requests']} | {r['errors']} | {r['throughput']:.2f} "
+              f"| {r['p50']:.3f} | {r['p95']:.3f} | {r['max']:.3f} |")
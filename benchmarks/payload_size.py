@@ -0,0 +1,80 @@
+# Benchmark: response size per shaping option over the corpus.
+#
+#   python benchmarks/payload_size.py [image_dir] [--fields document_type,side,fields]
+#
+# Runs the fuzzy pipeline (no persist) on every image and measures the JSON
+# body each app would send: the full result with the input image inlined as
+# base64 (the old ocr_accuracy response), the full result with a
+# /images/<sha1> reference instead, and a ?fields= selection. Each is
+# reported raw, gzip'd and brotli'd (when brotli is installed).
+import argparse
+import base64
+import json
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+from ocr_pipeline import responses, stages
+from ocr_pipeline.manifest import IMAGE_EXTENSIONS, file_sha1
+
+DEFAULT_CORPUS = os.path.join(ROOT, "fuzzy_front_back", "input_images")
+DEFAULT_FIELDS = "filename,document_type,side,fields"
+
+
+def variants(path, output, fields):
+    with open(path, "rb") as f:
+        inline = base64.b64encode(f.read()).decode("utf-8")
+    sha1 = file_sha1(path)
+    return {
+        "full + base64 image": dict(output, input_image=inline),
+        "full + image ref": dict(output, input_image={"sha1": sha1, "url": f"/images/{sha1}"}),
+        f"?fields={fields}": responses.select_fields(output, fields),
+    }
+
+
+def encoded_sizes(payload):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    sizes = {"raw": len(body), "gzip": len(responses.compress(body, "gzip"))}
+    if responses.brotli is not None:
+        sizes["br"] = len(responses.compress(body, "br"))
+    return sizes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Response payload size per shaping option")
+    parser.add_argument("image_dir", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--fields", default=DEFAULT_FIELDS)
+    parser.add_argument("--out", help="Optional path to dump per-image sizes as JSON")
+    args = parser.parse_args()
+
+    pipeline = stages.build_pipeline().without("persist")
+    paths = sorted(
+        os.path.join(args.image_dir, f) for f in os.listdir(args.image_dir)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    rows = []
+    totals = {}
+    for path in paths:
+        output = pipeline.run(path)
+        row = {"file": os.path.basename(path)}
+        for name, payload in variants(path, output, args.fields).items():
+            row[name] = encoded_sizes(payload)
+            for encoding, size in row[name].items():
+                totals.setdefault(name, {}).setdefault(encoding, 0)
+                totals[name][encoding] += size
+        rows.append(row)
+
+    n = max(len(rows), 1)
+    encodings = ["raw", "gzip"] + (["br"] if responses.brotli is not None else [])
+    baseline = totals.get("full + base64 image", {}).get("raw", 0) or 1
+    print(f"{len(rows)} images, mean bytes per response")
+    print("| payload | " + " | ".join(encodings) + " | vs. base64 raw |")
+    print("|---|" + "---|" * (len(encodings) + 1))
+    for name, sizes in totals.items():
+        cells = " | ".join(f"{sizes[e] / n:,.0f}" for e in encodings)
+        print(f"| {name} | {cells} | {100 * min(sizes.values()) / baseline:.1f}% |")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=4)
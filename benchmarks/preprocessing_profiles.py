@@ -0,0 +1,162 @@
+# Benchmark: cost vs. OCR accuracy for each preprocessing profile.
+#
+#   python benchmarks/preprocessing_profiles.py [image_dir] [--labels labels.json] [--no-ocr]
+#
+# For every image and profile it times preprocessing and the full
+# region + Tesseract pass, records the mean Tesseract word confidence and
+# checks the fuzzy document classifier against the expected document type.
+# Expected types come from the file name (pan*, aadhar*, voter* ...) unless a
+# labels JSON ({"file.jpg": "PAN Card", ...}) is given. --no-ocr times
+# preprocessing + region finding only ("blocks" are then regions).
+#
+# Measured with --no-ocr on fuzzy_front_back/input_images (14 images; that
+# machine had no Tesseract, so there are no confidence/accuracy numbers yet):
+#
+#   | profile  | prep ms (mean) | prep + regions ms (mean) | regions |
+#   |----------|----------------|--------------------------|---------|
+#   | fast     |            0.9 |                      1.8 |    22.9 |
+#   | balanced |            3.6 |                      4.6 |    30.9 |
+#   | heavy    |          410.6 |                    411.8 |    36.3 |
+#   | auto     |            9.5 |                     10.5 |    25.3 |
+#
+# auto picked fast for 2 images, balanced for 11 and heavy for 1 (voter.jpg).
+# The word confidence and doc-type accuracy columns still need a run with
+# Tesseract installed before the auto thresholds are tuned any further.
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import cv2
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+from ocr_pipeline.preprocessing import PROFILES, preprocess
+from ocr_pipeline.regions import find_regions, scale_regions
+from ocr_pipeline.rules import classify_document
+
+DEFAULT_CORPUS = os.path.join(ROOT, "fuzzy_front_back", "input_images")
+
+FILENAME_LABELS = [
+    (re.compile(r"pan", re.I), "PAN Card"),
+    (re.compile(r"aadh?aa?r", re.I), "Aadhaar Card"),
+    (re.compile(r"voter", re.I), "Voter ID Card"),
+    (re.compile(r"passport", re.I), "Passport"),
+    (re.compile(r"driv", re.I), "Driving License"),
+    (re.compile(r"bank", re.I), "Bank Passbook"),
+]
+
+
+def label_from_filename(file_name):
+    for pattern, doc_type in FILENAME_LABELS:
+        if pattern.search(file_name):
+            return doc_type
+    return None
+
+
+def ocr_with_profile(image, profile, ocr=True):
+    start = time.perf_counter()
+    prep = preprocess(image, profile)
+    prep_time = time.perf_counter() - start
+
+    boxes = scale_regions(find_regions(prep["dilated"]), prep["scale"]).tolist()
+    if not ocr:
+        return {
+            "profile": prep["profile"],
+            "prep_time": prep_time,
+            "total_time": time.perf_counter() - start,
+            "blocks": len(boxes),
+            "mean_conf": None,
+            "doc_type": None,
+        }
+
+    import pytesseract
+
+    blocks, confs = [], []
+    for x, y, w, h in boxes:
+        roi = image[y:y+h, x:x+w]
+        data = pytesseract.image_to_data(roi, config="--psm 6", output_type=pytesseract.Output.DICT)
+        words = []
+        for word, conf in zip(data["text"], data["conf"]):
+            if word.strip() and float(conf) >= 0:
+                words.append(word)
+                confs.append(float(conf))
+        if words:
+            blocks.append(" ".join(words))
+
+    total_time = time.perf_counter() - start
+    return {
+        "profile": prep["profile"],
+        "prep_time": prep_time,
+        "total_time": total_time,
+        "blocks": len(blocks),
+        "mean_conf": sum(confs) / len(confs) if confs else 0.0,
+        "doc_type": classify_document(blocks)[0] if blocks else None,
+    }
+
+
+def run_benchmark(image_dir, labels, ocr=True):
+    profiles = list(PROFILES) + ["auto"]
+    rows = {p: [] for p in profiles}
+    auto_choices = {}
+
+    for file_name in sorted(os.listdir(image_dir)):
+        if not file_name.lower().endswith((".jpg", ".jpeg", ".png")):
+            continue
+        image = cv2.imread(os.path.join(image_dir, file_name))
+        if image is None:
+            continue
+        expected = labels.get(file_name, label_from_filename(file_name))
+        for profile in profiles:
+            result = ocr_with_profile(image, profile, ocr)
+            result["correct"] = None if expected is None or not ocr else result["doc_type"] == expected
+            rows[profile].append(result)
+            if profile == "auto":
+                auto_choices[file_name] = result["profile"]
+        print(f"  {file_name}: auto -> {auto_choices[file_name]}", file=sys.stderr)
+
+    return rows, auto_choices
+
+
+def print_table(rows):
+    print("| profile | images | prep ms (mean) | total ms (mean) | blocks | word conf | doc-type acc |")
+    print("|---|---|---|---|---|---|---|")
+    for profile, results in rows.items():
+        if not results:
+            continue
+        n = len(results)
+        labelled = [r for r in results if r["correct"] is not None]
+        acc = f"{sum(r['correct'] for r in labelled) / len(labelled):.2f}" if labelled else "n/a"
+        confs = [r["mean_conf"] for r in results if r["mean_conf"] is not None]
+        conf = f"{sum(confs) / len(confs):.1f}" if confs else "n/a"
+        print(
+            f"| {profile} | {n} "
+            f"| {1000 * sum(r['prep_time'] for r in results) / n:.1f} "
+            f"| {1000 * sum(r['total_time'] for r in results) / n:.1f} "
+            f"| {sum(r['blocks'] for r in results) / n:.1f} "
+            f"| {conf} "
+            f"| {acc} ({len(labelled)} labelled) |"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preprocessing profile benchmark")
+    parser.add_argument("image_dir", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--labels", help="JSON file mapping file name to expected document type")
+    parser.add_argument("--out", help="Optional path to dump per-image results as JSON")
+    parser.add_argument("--no-ocr", action="store_true", help="time preprocessing + regions only")
+    args = parser.parse_args()
+
+    labels = {}
+    if args.labels:
+        with open(args.labels, encoding="utf-8") as f:
+            labels = json.load(f)
+
+    rows, auto_choices = run_benchmark(args.image_dir, labels, ocr=not args.no_ocr)
+    print_table(rows)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"results": rows, "auto_choices": auto_choices}, f, indent=4)
@@ -0,0 +1,57 @@
+# Benchmark: re-running classification with and without the artifact cache.
+#
+#   python benchmarks/reclassify.py [image_dir] [--db /tmp/artifacts.sqlite]
+#
+# Pass 1 runs the full fuzzy pipeline (no persist) over the corpus and fills
+# the cache; pass 2 runs it again, which now only reads cached OCR blocks and
+# re-runs classify + extract. This is what tuning DOCUMENT_KEYWORDS or the side
+# indicators costs once the corpus has been OCR'd once.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+from ocr_pipeline import stages
+from ocr_pipeline.artifacts import ArtifactCache
+from ocr_pipeline.manifest import IMAGE_EXTENSIONS
+
+DEFAULT_CORPUS = os.path.join(ROOT, "fuzzy_front_back", "input_images")
+
+
+def run_pass(pipeline, paths):
+    start = time.perf_counter()
+    hits = 0
+    types = {}
+    for path in paths:
+        ctx = pipeline.run_ctx({"image_path": path})
+        hits += ctx["cache_hit"]
+        types[os.path.basename(path)] = ctx["output_data"]["document_type"]
+    return time.perf_counter() - start, hits, types
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold vs. cached reclassification")
+    parser.add_argument("image_dir", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--db", help="Cache database (default: a fresh temporary file)")
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.image_dir, f) for f in os.listdir(args.image_dir)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "artifacts.sqlite")
+    pipeline = stages.build_pipeline(cache=ArtifactCache(db_path)).without("persist")
+
+    cold, cold_hits, cold_types = run_pass(pipeline, paths)
+    warm, warm_hits, warm_types = run_pass(pipeline, paths)
+
+    print(f"{len(paths)} images, cache at {db_path}")
+    print("| pass | seconds | per image ms | cache hits |")
+    print("|---|---|---|---|")
+    print(f"| cold | {cold:.2f} | {cold / max(len(paths), 1) * 1000:.1f} | {cold_hits} |")
+    print(f"| cached | {warm:.2f} | {warm / max(len(paths), 1) * 1000:.1f} | {warm_hits} |")
+    if cold_types != warm_types:
+        print("WARNING: cached pass classified some images differently")
@@ -0,0 +1,88 @@
+# Benchmark: per-contour loop vs. vectorized region analysis.
+#
+#   python benchmarks/region_stats.py [image_dir] [--noise 0.002] [--repeat 5]
+#
+# For every image it preprocesses once ("fast" profile), optionally sprinkles
+# salt noise on the binary to mimic a bad scan, and times
+#   - the old segment: boundingRect in the sort key and again per contour
+#   - find_regions + scale_regions with method="contours" and "components"
+# reporting blob counts, best-of-N ms per image and how many of the old
+# boxes each method reproduces.
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+from ocr_pipeline.manifest import IMAGE_EXTENSIONS
+from ocr_pipeline.preprocessing import preprocess, scale_box
+from ocr_pipeline.regions import METHODS, find_regions, scale_regions
+
+DEFAULT_CORPUS = os.path.join(ROOT, "fuzzy_front_back", "input_images")
+
+
+def contour_boxes(dilated, scale):
+    contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    contours = sorted(contours, key=lambda ctr: cv2.boundingRect(ctr)[1])
+    return [scale_box(cv2.boundingRect(c), scale) for c in contours]
+
+
+def region_boxes(dilated, scale, method):
+    return scale_regions(find_regions(dilated, method, min_side=0, order="top"), scale).tolist()
+
+
+def noisy_mask(prep, noise, rng):
+    if not noise:
+        return prep["dilated"]
+    binary = prep["binary"].copy()
+    binary[rng.random(binary.shape) < noise] = 255
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+    return cv2.dilate(binary, kernel, iterations=2)
+
+
+def best_ms(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Contour loop vs. connectedComponentsWithStats")
+    parser.add_argument("image_dir", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--noise", type=float, default=0.0, help="share of binary pixels flipped to ink")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    paths = sorted(
+        os.path.join(args.image_dir, f) for f in os.listdir(args.image_dir)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    columns = ["loop"] + list(METHODS)
+    totals = dict.fromkeys(columns, 0.0)
+    print(f"{'file':40s} {'blobs':>6s} " + " ".join(f"{c + ' ms':>14s}" for c in columns) + "  same boxes")
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        prep = preprocess(image, "fast")
+        mask = noisy_mask(prep, args.noise, rng)
+        loop_ms, old = best_ms(lambda: contour_boxes(mask, prep["scale"]), args.repeat)
+        row = {"loop": loop_ms}
+        same = []
+        for method in METHODS:
+            row[method], new = best_ms(lambda: region_boxes(mask, prep["scale"], method), args.repeat)
+            same.append(f"{len(set(old) & {tuple(b) for b in new})}/{len(old)}")
+        for column in columns:
+            totals[column] += row[column]
+        print(f"{os.path.basename(path)[:40]:40s} {len(old):6d} "
+              + " ".join(f"{row[c]:14.2f}" for c in columns) + "  " + " ".join(same))
+
+    print("\nTotal ms: " + ", ".join(f"{c} {totals[c]:.1f}" for c in columns))
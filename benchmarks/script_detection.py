@@ -0,0 +1,69 @@
+# Benchmark: per-box script detection and what skipping Hindi boxes saves.
+#
+#   python benchmarks/script_detection.py [image_dir ...] [--show devanagari] [--out crops/]
+#
+# Runs ingest -> layout on every image, classifies each OCR box with
+# scripts.detect_script and prints per image the boxes per script, the
+# detector's ms per box and the Tesseract calls devanagari="skip" would save.
+# --show with --out writes the crops of one script as <image>_<n>.png, to
+# eyeball what gets skipped before turning it on.
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+from ocr_pipeline.manifest import IMAGE_EXTENSIONS
+from ocr_pipeline.scripts import DEVANAGARI, SCRIPTS, devanagari_share, detect_script
+from ocr_pipeline.stages import build_pipeline
+
+DEFAULT_CORPUS = [os.path.join(ROOT, "images1"), os.path.join(ROOT, "fuzzy_front_back", "input_images")]
+LAYOUT_STAGES = ("ingest", "preprocess", "segment", "layout")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Script detection per OCR box")
+    parser.add_argument("image_dirs", nargs="*", default=DEFAULT_CORPUS)
+    parser.add_argument("--show", choices=SCRIPTS, help="write the crops detected as this script")
+    parser.add_argument("--out", default="script_crops")
+    args = parser.parse_args()
+
+    pipeline = build_pipeline()
+    paths = sorted(
+        os.path.join(d, f) for d in args.image_dirs for f in os.listdir(d)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if args.show:
+        os.makedirs(args.out, exist_ok=True)
+
+    totals = dict.fromkeys(SCRIPTS, 0)
+    detect_ms, box_count = 0.0, 0
+    print(f"{'file':40s} {'boxes':>6s} " + " ".join(f"{s:>10s}" for s in SCRIPTS) + f" {'ms/box':>7s}")
+    for path in paths:
+        ctx = pipeline.run_ctx({"image_path": path}, only=LAYOUT_STAGES)
+        image = ctx["image"]
+        counts = dict.fromkeys(SCRIPTS, 0)
+        start = time.perf_counter()
+        for n, (x, y, w, h) in enumerate(ctx["boxes"]):
+            roi = image[y:y+h, x:x+w]
+            script = detect_script(roi)
+            counts[script] += 1
+            if script == args.show:
+                name = f"{os.path.splitext(os.path.basename(path))[0]}_{n}.png"
+                cv2.imwrite(os.path.join(args.out, name), roi)
+                print(f"  {name}: devanagari share {devanagari_share(roi):.2f}")
+        elapsed = (time.perf_counter() - start) * 1000
+        detect_ms += elapsed
+        box_count += len(ctx["boxes"])
+        for script in SCRIPTS:
+            totals[script] += counts[script]
+        per_box = elapsed / len(ctx["boxes"]) if ctx["boxes"] else 0.0
+        print(f"{os.path.basename(path)[:40]:40s} {len(ctx['boxes']):6d} "
+              + " ".join(f"{counts[s]:10d}" for s in SCRIPTS) + f" {per_box:7.2f}")
+
+    print(f"\nBoxes: {box_count}, " + ", ".join(f"{s} {totals[s]}" for s in SCRIPTS))
+    print(f"Detection: {detect_ms / max(box_count, 1):.2f} ms per box")
+    print(f"devanagari=\"skip\" saves {totals[DEVANAGARI]} of {box_count} OCR calls")
@@ -0,0 +1,89 @@
+# Benchmark: cold import time of every app, checked against a budget.
+#
+#   python benchmarks/startup_time.py [app ...] [--budget-ms 750] [--top 8]
+#
+# Each app module is imported in a fresh interpreter under `python -X
+# importtime` (what a new gunicorn worker, autoscaled instance or batch run
+# pays before it can do anything; create_app()/warm-up is not included). For
+# every app it prints the wall time, the import total and the most expensive
+# top-level imports, and checks that none of the lazily loaded engines
+# (engines.py) were imported. Exits 1 if an app is over budget or imports one.
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+from serve import APPS
+
+BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", 750))
+# Must only be imported when a request actually needs them
+LAZY_MODULES = ("torch", "easyocr", "pytesseract")
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+LOAD_APP = """
+import importlib.util, os, sys
+path = os.path.join({root!r}, {path!r})
+sys.path.insert(0, {root!r})
+sys.path.insert(0, os.path.dirname(path))
+spec = importlib.util.spec_from_file_location("app_under_test", path)
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+"""
+
+
+def measure(path):
+    code = LOAD_APP.format(root=ROOT, path=path)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    top_level, imported = [], set()
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        imported.add(name.split(".")[0])
+        if not indent:
+            top_level.append((int(cumulative) / 1000, name))
+    return {
+        "wall_ms": wall_ms,
+        "import_ms": sum(ms for ms, _ in top_level),
+        "top": sorted(top_level, reverse=True),
+        "eager": sorted(imported & set(LAZY_MODULES)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start import time per app")
+    parser.add_argument("apps", nargs="*", default=sorted(APPS))
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="max wall time per app")
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    failed = []
+    for name in args.apps:
+        try:
+            result = measure(APPS[name])
+        except RuntimeError as e:
+            print(f"{name}: import failed: {e}")
+            failed.append(name)
+            continue
+        over = result["wall_ms"] > args.budget_ms
+        print(f"{name}: {result['wall_ms']:.0f} ms wall, {result['import_ms']:.0f} ms imports"
+              + ("  OVER BUDGET" if over else ""))
+        for ms, module in result["top"][:args.top]:
+            print(f"    {ms:8.1f} ms  {module}")
+        if result["eager"]:
+            print(f"    imported at startup: {', '.join(result['eager'])}")
+        if over or result["eager"]:
+            failed.append(name)
+
+    print(f"\nBudget {args.budget_ms:.0f} ms: " + (f"FAILED ({', '.join(failed)})" if failed else "ok"))
+    sys.exit(1 if failed else 0)
@@ -1,24 +1,40 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
-import cv2
-import numpy as np
-import pytesseract
-import re
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response, stream_with_context
 import json
 import os
-import uuid
+import queue
+import sys
+import threading
+from contextlib import closing
 from werkzeug.utils import secure_filename
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from ocr_pipeline import admission, profiling, responses, rules, stages
+from ocr_pipeline.results_store import get_store, search_args
+from ocr_pipeline.annotations import ANNOTATION_SUFFIX
+from ocr_pipeline.pipeline import PipelineCancelled
+from ocr_pipeline.artifacts import get_artifact_cache
+from ocr_pipeline.storage import FileStore, env_quota
+from ocr_pipeline.stages import build_pipeline
+from ocr_pipeline.serving import warm_up
+
 app = Flask(__name__)
+responses.install(app)
+profiling.install(app)
 
 # Configuration
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['OUTPUT_FOLDER'] = 'outputs'
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+app.config['UPLOAD_FOLDER'] = os.path.join(BASE_DIR, 'uploads')
+app.config['OUTPUT_FOLDER'] = os.path.join(BASE_DIR, 'outputs')
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'bmp', 'tiff'}
+# Near-duplicate re-uploads: "return" the stored result, "flag" it (default), or "off"
+app.config['NEAR_DUPLICATES'] = os.environ.get('NEAR_DUPLICATES', 'flag')
 
-# Create directories if they don't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
+# Uploads and outputs live in hash-sharded folders with an index, so nothing
+# lists them. Quotas: UPLOADS_MAX_GB / UPLOADS_MAX_DAYS, OUTPUTS_MAX_GB /
+# OUTPUTS_MAX_DAYS, enforced by a background sweeper (unset = keep forever)
+upload_store = FileStore(app.config['UPLOAD_FOLDER'], *env_quota("UPLOADS"))
+output_store = FileStore(app.config['OUTPUT_FOLDER'], *env_quota("OUTPUTS"))
 
 # Helper function to check allowed file types
 def allowed_file(filename):
@@ -26,186 +42,70 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 # OCR & Document Processing Logic
-def process_document(image_path):
-    image = cv2.imread(image_path)
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-    dilated = cv2.dilate(thresh, kernel, iterations=2)
-    contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    contours = sorted(contours, key=lambda ctr: cv2.boundingRect(ctr)[1])
-
-    # Document detection flags
-    is_pan = False
-    is_aadhar = False
-    is_bank_passbook = False
-    is_driving_license = False
-    is_voter_id = False
-    is_passport_id = False
-
-    # Regex patterns
-    pan_pattern = re.compile(r"^[A-Z]{5}[0-9]{4}[A-Z]$")
-    aadhar_pattern = re.compile(r"^\d{4}\s\d{4}\s\d{4}$")
-    aadhar_pattern_nospace = re.compile(r"^\d{12}$")
-    dl_number_pattern = re.compile(r"^[A-Z]{2}\d{2}[0-9A-Z]{11,}$")
-
-    # Keywords for document type
-    bank_keywords = ["IFSC", "CIF", "ACCOUNT", "A/C", "SAVING", "SB A/C", "CURRENT","BRANCH CODE","BRANCH"]
-    dl_keywords = ["DRIVING LICENCE", "DRIVING LICENSE", "DL NO", "VALID TILL", "DATE OF ISSUE", "DOB", "AUTHORISATION TO DRIVE"]
-    voter_keywords = ["ELECTION COMMISSION OF INDIA", "VOTER ID", "ELECTOR'S PHOTO IDENTITY CARD"]
-    passport_keywords = ["REPUBLIC OF INDIA", "PASSPORT", "TYPE", "CODE", "DATE OF ISSUE", "DATE OF EXPIRY"]
-
-    # Side detection keywords
-    aadhaar_front_keywords = ["GOVERNMENT OF INDIA", "AADHAAR", "UIDAI"]
-    aadhaar_back_keywords = ["VID", "ENROLMENT", "HELPLINE", "WWW.UIDAI.GOV.IN", "ADDRESS"]
-
-    pan_front_keywords = ["INCOME TAX DEPARTMENT", "PERMANENT ACCOUNT NUMBER"]
-    pan_back_keywords = ["INCOME TAX PAN SERVICES UNIT", "CBD BELAPUR", "NSDL", "UTIITSL"]
-
-    dl_front_keywords = ["DRIVING LICENCE", "DL NO", "VALID TILL"]
-    dl_back_keywords = ["AUTHORISED TO DRIVE", "COV", "TRANSPORT", "NON-TRANSPORT"]
-
-    voter_front_keywords = ["ELECTION","ELECTION COMMISSION OF INDIA", "PHOTO IDENTITY CARD"]
-    voter_back_keywords = ["ADDRESS", "EPIC NO"]
-
-    passport_front_keywords = ["REPUBLIC OF INDIA", "PASSPORT", "TYPE", "CODE"]
-    passport_back_keywords = ["PARENTS NAME", "ADDRESS", "PLACE OF ISSUE"]
-
-    extracted_blocks = []
-
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)
-        cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
-        roi = image[y:y+h, x:x+w]
-        text = pytesseract.image_to_string(roi, config="--psm 6").strip()
-        text_clean = text.upper().replace(" ", "")
-        extracted_blocks.append(text)
-
-        # Document detection
-        if "PERMANENTACCOUNTNUMBER" in text_clean or "INCOMETAXDEPARTMENT" in text_clean or "INCOMETAXPAN" in text_clean or pan_pattern.match(text_clean):
-            is_pan = True
-        if aadhar_pattern.match(text.strip()) or aadhar_pattern_nospace.match(text.strip()) or "GOVERNMENTOFINDIA" in text_clean or "UNIQUEIDENTIFICATIONAUTHORITYOFINDIA" in text_clean:
-            is_aadhar = True
-        for keyword in bank_keywords:
-            if keyword in text.upper():
-                is_bank_passbook = True
-        for keyword in dl_keywords:
-            if keyword in text.upper() or dl_number_pattern.match(text_clean):
-                is_driving_license = True
-        for keyword in voter_keywords:
-            if keyword in text.upper():
-                is_voter_id = True
-        for keyword in passport_keywords:
-            if keyword in text.upper():
-                is_passport_id = True
-
-    # Determine document type
-    doc_type = "Unknown Document"
-    if is_pan:
-        doc_type = "PAN Card"
-    elif is_aadhar:
-        doc_type = "Aadhaar Card"
-    elif is_bank_passbook:
-        doc_type = "Bank Passbook"
-    elif is_driving_license:
-        doc_type = "Driving License"
-    elif is_voter_id:
-        doc_type = "Voter ID Card"
-    elif is_passport_id:
-        doc_type = "Passport"
+# This app's own keyword flags and per-flag side keywords, its "Father's Name"
+# key, empty blocks kept, uuid-named outputs whose annotated image is only
+# drawn when /outputs is requested
+CLASSIFY_CONFIG = {"passport_keywords": rules.UI_PASSPORT_KEYWORDS, "number_patterns": False, "side": "keywords"}
+pipeline = build_pipeline(
+    classify=stages.classify_flags,
+    classify_config=CLASSIFY_CONFIG,
+    ocr_config={"keep_empty": True},
+    extract_config={"side_key": "document_side", "include_scores": False, "father_key": "Father's Name"},
+    persist=stages.persist_unique,
+    persist_config={"output_folder": app.config['OUTPUT_FOLDER'], "store_source": "flask_ui",
+                    "lazy_image": True, "storage": output_store},
+    cache=get_artifact_cache,
+    dedupe_action=None if app.config['NEAR_DUPLICATES'] == 'off' else app.config['NEAR_DUPLICATES'],
+)
 
-    # Determine document side
-    doc_side = "Unknown Side"
-    blocks_upper = [b.upper() for b in extracted_blocks]
-
-    if is_aadhar:
-        if any(any(k in b for k in aadhaar_front_keywords) for b in blocks_upper):
-            doc_side = "Front"
-        elif any(any(k in b for k in aadhaar_back_keywords) for b in blocks_upper):
-            doc_side = "Back"
-    elif is_pan:
-        if any(any(k in b for k in pan_front_keywords) for b in blocks_upper):
-            doc_side = "Front"
-        elif any(any(k in b for k in pan_back_keywords) for b in blocks_upper):
-            doc_side = "Back"
-    elif is_driving_license:
-        if any(any(k in b for k in dl_front_keywords) for b in blocks_upper):
-            doc_side = "Front"
-        elif any(any(k in b for k in dl_back_keywords) for b in blocks_upper):
-            doc_side = "Back"
-    elif is_voter_id:
-        if any(any(k in b for k in voter_front_keywords) for b in blocks_upper):
-            doc_side = "Front"
-        elif any(any(k in b for k in voter_back_keywords) for b in blocks_upper):
-            doc_side = "Back"
-    elif is_passport_id:
-        if any(any(k in b for k in passport_front_keywords) for b in blocks_upper):
-            doc_side = "Front"
-        elif any(any(k in b for k in passport_back_keywords) for b in blocks_upper):
-            doc_side = "Back"
-
-    # Cleaned Summary Function
-    def generate_cleaned_summary(blocks, doc_type):
-        summary = {
-            "Document": doc_type,
-            "Name": None,
-            "Father's Name": None,
-            "DOB": None,
-            "Number": None,
-            "Issuing Authority": None,
-            "Other Details": []
-        }
-
-        for text in blocks:
-            clean_text = text.strip()
-            if "ELECTION COMMISSION OF INDIA" in clean_text.upper():
-                summary["Issuing Authority"] = "Election Commission of India"
-            if "GOVERNMENT OF INDIA" in clean_text.upper():
-                summary["Issuing Authority"] = "Government of India"
-            if "NAME" in clean_text.upper() and "FATHER" not in clean_text.upper():
-                summary["Name"] = clean_text.split(":")[-1].strip()
-            if "FATHER" in clean_text.upper():
-                summary["Father's Name"] = clean_text.split(":")[-1].strip()
-            dob_match = re.search(r"\d{2}[-/]\d{2}[-/]\d{4}", clean_text)
-            if dob_match:
-                summary["DOB"] = dob_match.group()
-            if re.match(r"^\d{4}\s\d{4}\s\d{4}$", clean_text):
-                summary["Number"] = clean_text
-            elif re.match(r"^[A-Z]{5}[0-9]{4}[A-Z]$", clean_text):
-                summary["Number"] = clean_text
-            elif re.match(r"^[A-Z]{2}\d{2}[0-9A-Z]{11,}$", clean_text):
-                summary["Number"] = clean_text
-            if clean_text and len(clean_text) > 2:
-                summary["Other Details"].append(clean_text)
-        return summary
-
-    summary = generate_cleaned_summary(extracted_blocks, doc_type)
-
-    # Generate unique filename for output
-    unique_id = str(uuid.uuid4())[:8]
-    base_name = os.path.splitext(os.path.basename(image_path))[0]
-
-    output_data = {
-        "filename": os.path.basename(image_path),
-        "raw_detected_text": extracted_blocks,
-        "cleaned_summary": summary,
-        "document_type": doc_type,
-        "document_side": doc_side  # ✅ Added side info
-    }
-
-    # Save output JSON
-    json_filename = os.path.join(app.config['OUTPUT_FOLDER'], f"{base_name}_{unique_id}.json")
-    with open(json_filename, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=4)
-
-    # Save output image with contours
-    result_image_path = os.path.join(app.config['OUTPUT_FOLDER'], f"{base_name}_{unique_id}_output.jpg")
-    cv2.imwrite(result_image_path, image)
-
-    # Add the processed image filename to the response
-    output_data['processed_image'] = f"{base_name}_{unique_id}_output.jpg"
-
-    return output_data
+def process_document(image_path):
+    # Run the whole pipeline and return only the final result
+    return pipeline.run(image_path)
+
+def iter_process_document(image_path):
+    # Yields (event, data) as the pipeline progresses, ending with ("result", output_data).
+    # The pipeline runs in a worker thread and hands its events over a queue.
+    # Closing the generator early (the SSE client went away) cancels the run
+    # at its next event and waits for the worker, so the admission slot the
+    # response holds is only given back once the OCR work has stopped.
+    events = queue.Queue()
+    cancelled = threading.Event()
+
+    def emit(event, data):
+        if cancelled.is_set():
+            raise PipelineCancelled("Client disconnected")
+        events.put((event, data))
+
+    def run():
+        try:
+            events.put(("result", pipeline.run(image_path, emit=emit)))
+        except PipelineCancelled:
+            pass
+        except Exception as e:
+            events.put(("exception", e))
+
+    worker = threading.Thread(target=profiling.propagate(run), daemon=True)
+    worker.start()
+
+    flags = set()
+    provisional_type = None
+    try:
+        while True:
+            event, data = events.get()
+            if event == "exception":
+                raise data
+            yield event, data
+            if event == "result":
+                return
+            if event == "block":
+                flags |= rules.block_flags(data["text"], CLASSIFY_CONFIG["passport_keywords"],
+                                           CLASSIFY_CONFIG["number_patterns"])
+                if rules.flags_doc_type(flags) != provisional_type:
+                    provisional_type = rules.flags_doc_type(flags)
+                    yield "provisional_type", {"document_type": provisional_type}
+    finally:
+        cancelled.set()
+        worker.join()
 
 @app.route('/')
 def index():
@@ -222,8 +122,7 @@ def upload_file():
     
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        upload_store.save(filename, file)
         
         return jsonify({
             'message': 'File uploaded successfully',
@@ -233,25 +132,72 @@ def upload_file():
     return jsonify({'error': 'File type not allowed'})
 
 @app.route('/extract/<filename>', methods=['GET'])
+@admission.admit("interactive")
 def extract_text(filename):
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    filepath = upload_store.lookup(secure_filename(filename))
     
-    if not os.path.exists(filepath):
+    if filepath is None:
         return jsonify({'error': 'File not found'})
     
     try:
         result = process_document(filepath)
-        return jsonify(result)
+        return responses.shaped_json(result)
     except Exception as e:
         return jsonify({'error': f'Processing failed: {str(e)}'})
 
+def sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/extract-stream/<filename>', methods=['GET'])
+@admission.admit("interactive")
+def extract_text_stream(filename):
+    # Same pipeline as /extract, streamed as Server-Sent Events
+    filepath = upload_store.lookup(secure_filename(filename))
+
+    def generate():
+        if filepath is None:
+            yield sse_message("error", {"error": "File not found"})
+            return
+        try:
+            # closing(): a disconnect closes this generator, which must cancel the run
+            with closing(iter_process_document(filepath)) as events:
+                for event, data in events:
+                    yield sse_message(event, data)
+        except Exception as e:
+            yield sse_message("error", {"error": f"Processing failed: {str(e)}"})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    filepath = upload_store.lookup(secure_filename(filename))
+    if filepath is None:
+        return jsonify({'error': 'File not found'}), 404
+    return send_from_directory(os.path.dirname(filepath), os.path.basename(filepath))
 
 @app.route('/outputs/<filename>')
 def output_file(filename):
-    return send_from_directory(app.config['OUTPUT_FOLDER'], filename)
+    # Annotated image drawn on request; ?w=320 for a thumbnail, ?format=webp
+    stored = output_store.lookup(filename) or output_store.lookup(os.path.splitext(filename)[0] + ANNOTATION_SUFFIX)
+    folder = os.path.dirname(stored) if stored else app.config['OUTPUT_FOLDER']
+    return responses.send_annotation(folder, filename)
+
+@app.route('/search', methods=['GET'])
+def search_results():
+    # e.g. /search?document_type=PAN Card&side=Front&dob_year=1990
+    try:
+        return responses.shaped_json(get_store().search(**search_args(request.args)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+def create_app():
+    # Used by serve.py: warm up OpenCV/Tesseract once, before workers fork
+    warm_up()
+    return app
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -1,14 +1,25 @@
 import cv2
-import numpy as np
-import pytesseract
-import re
 import json
 import os
-import time
-from flask import Flask, jsonify
-from rapidfuzz import fuzz
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, jsonify, request
+from werkzeug.utils import secure_filename
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from ocr_pipeline import admission, engines, profiling, responses, stages
+from ocr_pipeline.pipeline import PipelineError
+from ocr_pipeline.artifacts import get_artifact_cache
+from ocr_pipeline.stages import build_pipeline
+from ocr_pipeline.segmentation import find_document_regions
+from ocr_pipeline.pairing import load_results, pair_sides
+from ocr_pipeline.passbook import iter_pages
+from ocr_pipeline.results_store import get_store, search_args
+from ocr_pipeline.serving import warm_up
 
 app = Flask(__name__)
+responses.install(app)
+profiling.install(app)
 
 # -----------------------------
 # Config
@@ -16,208 +27,102 @@ app = Flask(__name__)
 BASE_DIR = os.path.dirname(__file__)  # folder where app.py is
 INPUT_FOLDER = os.path.join(BASE_DIR, "input_images")  # folder inside project
 OUTPUT_FOLDER = os.path.join(BASE_DIR, "outputs") 
-os.makedirs(INPUT_FOLDER, exist_ok=True)
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-
-
-# Keyword dictionary
-
-DOCUMENT_KEYWORDS = {
-    "PAN Card": [
-        "income tax department", "permanent account number", "govt of india", "father's name"
-    ],
-    "Aadhaar Card": [
-        "aadhaar", "uidai", "government of india", "year of birth", "date of birth", "gender"
-    ],
-    "Voter ID Card": [
-        "election commission of india", "voter id", "elector's photo identity card",
-        "elector's name", "sex", "epic"
-    ],
-    "Passport": [
-        "passport", "republic of india", "place of birth", "date of issue", "date of expiry"
-    ],
-    "Driving License": [
-        "driving license", "dl no", "valid till", "transport", "date of issue", "dob"
-    ],
-    "Bank Passbook": [
-        "account number", "ifsc", "branch", "customer id", "balance", "transaction", "a/c"
-    ]
-}
 
-# -----------------------------
-# Regex patterns
-# -----------------------------
-PAN_PATTERN = re.compile(r"^[A-Z]{5}[0-9]{4}[A-Z]$")
-AADHAR_PATTERN = re.compile(r"^\d{4}\s\d{4}\s\d{4}$")
-AADHAR_PATTERN_NOSPACE = re.compile(r"^\d{12}$")
-DL_NUMBER_PATTERN = re.compile(r"^[A-Z]{2}\d{2}[0-9A-Z]{11,}$")
-VOTER_PATTERN = re.compile(r"^[A-Z]{3}[0-9]{7}$")
-PASSPORT_PATTERN = re.compile(r"^[A-Z][0-9]{7}$")
-IFSC_PATTERN = re.compile(r"^[A-Z]{4}0[A-Z0-9]{6}$")
+# "auto" picks fast/balanced/heavy per image, or force one profile by name
+PREPROCESS_PROFILE = os.environ.get("PREPROCESS_PROFILE", "auto")
 
-# -----------------------------
-# Document classifier
-# -----------------------------
-def classify_document(raw_blocks):
-    all_text = " ".join(raw_blocks).lower()
-    scores = {}
-    for doc, keywords in DOCUMENT_KEYWORDS.items():
-        score = max(fuzz.partial_ratio(all_text, kw.lower()) for kw in keywords)
-        scores[doc] = score
-    best_doc = max(scores, key=scores.get)
-    return best_doc, scores
+# "tesseract", "easyocr", or "ensemble" (both engines in parallel, merged per block)
+OCR_ENGINE = os.environ.get("OCR_ENGINE", "tesseract")
+if not engines.available(OCR_ENGINE):
+    # create_app() refuses to start; anything else importing the app is warned
+    print(f"Warning: OCR_ENGINE={OCR_ENGINE} is not available, every document will read as empty")
 
-# -----------------------------
-# Side classifier
-# -----------------------------
-def classify_side(doc_type, raw_blocks):
-    all_text = " ".join(raw_blocks).upper()
-    side = "Unknown"
-
-    def fuzzy_in(text, indicators, threshold=70):
-        for ind in indicators:
-            if fuzz.partial_ratio(text, ind.upper()) >= threshold:
-                return True
-        return False
-
-    if doc_type == "PAN Card":
-        if fuzzy_in(all_text, ["INCOME TAX DEPARTMENT", "PERMANENT ACCOUNT NUMBER", "GOVT. OF INDIA"]) \
-           or any(PAN_PATTERN.match(block.replace(" ", "")) for block in raw_blocks):
-            side = "Front"
-        elif fuzzy_in(all_text, ["QR CODE", "NSDL", "UTIITSL"]):
-            side = "Back"
-
-    elif doc_type == "Aadhaar Card":
-        if fuzzy_in(all_text, ["GOVERNMENT OF INDIA", "AADHAAR", "UIDAI", "DOB", "GENDER"]) \
-           or any(AADHAR_PATTERN.match(b) or AADHAR_PATTERN_NOSPACE.match(b) for b in raw_blocks):
-            side = "Front"
-        elif fuzzy_in(all_text, ["ADDRESS", "DISTRICT", "STATE", "PIN", "CARE OF"]):
-            side = "Back"
-
-    elif doc_type == "Voter ID Card":
-        if fuzzy_in(all_text, ["ELECTION COMMISSION OF INDIA", "ELECTOR'S PHOTO IDENTITY CARD", "NAME", "FATHER", "DOB"]) \
-           or any(VOTER_PATTERN.match(b) for b in raw_blocks):
-            side = "Front"
-        elif fuzzy_in(all_text, ["ADDRESS", "DISTRICT", "STATE", "PIN CODE", "ISSUE DATE"]):
-            side = "Back"
-
-    elif doc_type == "Passport":
-        if fuzzy_in(all_text, ["PASSPORT", "REPUBLIC OF INDIA", "NATIONALITY", "DATE OF BIRTH"]) \
-           or any(PASSPORT_PATTERN.match(b) for b in raw_blocks):
-            side = "Front"
-        elif fuzzy_in(all_text, ["ADDRESS", "EMERGENCY CONTACT", "PLACE OF ISSUE"]):
-            side = "Back"
-
-    elif doc_type == "Bank Passbook":
-        if fuzzy_in(all_text, ["ACCOUNT NUMBER", "IFSC", "BRANCH", "CUSTOMER ID", "SAVINGS ACCOUNT"]) \
-           or any(IFSC_PATTERN.match(b) for b in raw_blocks):
-            side = "Front"
-        elif fuzzy_in(all_text, ["DEPOSIT", "WITHDRAWAL", "BALANCE", "CHEQUE"]):
-            side = "Back"
-
-    return side
+# Re-uploads of an already processed card (recompressed, re-photographed):
+# "return" its stored result without OCR, "flag" it in the output (default), or "off"
+NEAR_DUPLICATES = os.environ.get("NEAR_DUPLICATES", "flag")
+
+# Max cards OCR'd at the same time when one page holds several documents
+MULTI_DOC_WORKERS = int(os.environ.get("MULTI_DOC_WORKERS", os.cpu_count() or 4))
 
 # -----------------------------
-# Cleaned summary generator
+# Pipeline
 # -----------------------------
-def generate_cleaned_summary(blocks, doc_type):
-    summary = {
-        "Document": doc_type,
-        "Name": None,
-        "Father’s Name": None,
-        "DOB": None,
-        "Number": None,
-        "Issuing Authority": None,
-        "Other Details": []
-    }
+# Stages live in ocr_pipeline.stages; this app uses the fuzzy classifier and
+# timestamped outputs. The rules themselves are in ocr_pipeline.rules.
+pipeline = build_pipeline(
+    classify=stages.classify_fuzzy,
+    profile=PREPROCESS_PROFILE,
+    ocr_config={"engine": OCR_ENGINE},
+    persist=stages.persist_timestamped,
+    persist_config={"output_folder": OUTPUT_FOLDER, "store_source": "fuzzy_front_back"},
+    cache=get_artifact_cache,
+    dedupe_action=None if NEAR_DUPLICATES == "off" else NEAR_DUPLICATES,
+)
 
-    for text in blocks:
-        clean_text = text.strip()
-        upper_text = clean_text.upper()
 
-        if "ELECTION COMMISSION OF INDIA" in upper_text:
-            summary["Issuing Authority"] = "Election Commission of India"
-        if "GOVERNMENT OF INDIA" in upper_text:
-            summary["Issuing Authority"] = "Government of India"
+def process_document(image_path):
+    try:
+        return pipeline.run(image_path)
+    except PipelineError as e:
+        return {"error": str(e)}
 
-        if "NAME" in upper_text and "FATHER" not in upper_text:
-            summary["Name"] = clean_text.split(":")[-1].strip()
-        if "FATHER" in upper_text:
-            summary["Father’s Name"] = clean_text.split(":")[-1].strip()
 
-        dob_match = re.search(r"\d{2}[-/]\d{2}[-/]\d{4}", clean_text)
-        if dob_match:
-            summary["DOB"] = dob_match.group()
+def input_path(filename):
+    # A request's file name inside INPUT_FOLDER, None if it would resolve outside
+    folder = os.path.realpath(INPUT_FOLDER)
+    path = os.path.realpath(os.path.join(folder, secure_filename(filename)))
+    return path if os.path.dirname(path) == folder else None
 
-        if PAN_PATTERN.match(clean_text):
-            summary["Number"] = clean_text
-        elif AADHAR_PATTERN.match(clean_text) or AADHAR_PATTERN_NOSPACE.match(clean_text):
-            summary["Number"] = clean_text
-        elif DL_NUMBER_PATTERN.match(clean_text):
-            summary["Number"] = clean_text
-        elif VOTER_PATTERN.match(clean_text):
-            summary["Number"] = clean_text
-        elif PASSPORT_PATTERN.match(clean_text):
-            summary["Number"] = clean_text
+# -------------MULTI-DOCUMENT PAGES ----------------
 
-        if clean_text and len(clean_text) > 2:
-            summary["Other Details"].append(clean_text)
+def process_region(image, region):
+    x, y, w, h = region
+    ctx = pipeline.run_image(image[y:y+h, x:x+w].copy())
+    document = dict(ctx["output_data"], bounding_box={"x": x, "y": y, "w": w, "h": h})
+    document.pop("filename", None)
 
-    return summary
+    # Block boxes are reported in page coordinates
+    page_boxes = [(x + bx, y + by, bw, bh) for bx, by, bw, bh in ctx["boxes"]]
+    return document, page_boxes
 
-# -------------OCR PROCESSING ----------------
 
-def process_document(image_path):
+def process_document_multi(image_path):
     image = cv2.imread(image_path)
     if image is None:
         return {"error": f"Could not read image: {image_path}"}
 
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-    dilated = cv2.dilate(thresh, kernel, iterations=2)
-    contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    contours = sorted(contours, key=lambda ctr: cv2.boundingRect(ctr)[1])
-
-    extracted_blocks = []
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)
-        cv2.rectangle(image,(x,y),(x+w,y+h),(0,255,0),2)
-        roi = image[y:y+h, x:x+w]
-        text = pytesseract.image_to_string(roi, config="--psm 6").strip()
-        if text:
-            extracted_blocks.append(text)
-
-    # Document classification
-    doc_type, fuzzy_scores = classify_document(extracted_blocks)
+    regions = find_document_regions(image)
 
-    # Side classification
-    side = classify_side(doc_type, extracted_blocks)
+    # Tesseract runs as a subprocess, so threads give real parallelism here
+    workers = min(len(regions), MULTI_DOC_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(profiling.propagate(lambda r: process_region(image, r)), regions))
 
-    # Generate cleaned summary
-    summary = generate_cleaned_summary(extracted_blocks, doc_type)
+    boxes = []
+    documents = []
+    for document, page_boxes in results:
+        boxes.extend(page_boxes)
+        documents.append(document)
 
-    # Output
     output_data = {
         "filename": os.path.basename(image_path),
-        "raw_detected_text": extracted_blocks,
-        "cleaned_summary": summary,
-        "document_type": doc_type,
-        "side": side,
-        "fuzzy_scores": fuzzy_scores
+        "document_count": len(documents),
+        "documents": documents
     }
 
-    # Save output JSON
-    ts = time.strftime("%Y%m%d_%H%M%S")
-    base_name = os.path.splitext(os.path.basename(image_path))[0]
-    json_filename = os.path.join(OUTPUT_FOLDER, f"{base_name}_{ts}.json")
-    with open(json_filename, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=4)
-
-    # Save processed image
-    result_image_path = os.path.join(OUTPUT_FOLDER, f"{base_name}_{ts}_output.jpg")
-    cv2.imwrite(result_image_path, image)
-
+    # Persist through the same stage as single documents, with card outlines drawn in
+    annotated = image.copy()
+    for document in documents:
+        box = document["bounding_box"]
+        cv2.rectangle(annotated,(box["x"],box["y"]),(box["x"]+box["w"],box["y"]+box["h"]),(255,0,0),3)
+    stages.persist_timestamped(
+        {"image_path": image_path, "image": annotated, "boxes": boxes,
+         "output_data": output_data, "name_suffix": "_multi"},
+        OUTPUT_FOLDER,
+    )
+    get_store().add_many(
+        [dict(d, filename=output_data["filename"]) for d in documents], source="fuzzy_front_back/multi"
+    )
     return output_data
 
 # -----------------------------
@@ -228,22 +133,73 @@ def home():
     return "Flask OCR API with fuzzy classification is running!"
 
 @app.route('/process-all', methods=['GET'])
+@admission.admit("batch")
 def process_all_files():
     results = []
-    for file_name in os.listdir(INPUT_FOLDER):
+    for file_name in (os.listdir(INPUT_FOLDER) if os.path.isdir(INPUT_FOLDER) else []):
         if file_name.lower().endswith((".jpg", ".jpeg", ".png")):
             image_path = os.path.join(INPUT_FOLDER, file_name)
             result = process_document(image_path)
             results.append(result)
-    return jsonify(results)
+    return responses.shaped_json(results)
 
 @app.route('/process/<filename>', methods=['GET'])
+@admission.admit("interactive")
 def process_single_file(filename):
-    image_path = os.path.join(INPUT_FOLDER, filename)
-    if not os.path.exists(image_path):
+    image_path = input_path(filename)
+    if image_path is None or not os.path.exists(image_path):
         return jsonify({"error": f"File {filename} not found in {INPUT_FOLDER}"}), 404
     result = process_document(image_path)
-    return jsonify(result)
+    return responses.shaped_json(result)
+
+@app.route('/process-multi/<filename>', methods=['GET'])
+@admission.admit("interactive")
+def process_multi_file(filename):
+    image_path = input_path(filename)
+    if image_path is None or not os.path.exists(image_path):
+        return jsonify({"error": f"File {filename} not found in {INPUT_FOLDER}"}), 404
+    result = process_document_multi(image_path)
+    return responses.shaped_json(result)
+
+@app.route('/passbook', methods=['GET'])
+@admission.admit("batch")
+def passbook_rows():
+    # e.g. /passbook?pages=page1.jpg,page2.jpg -> one JSON transaction per line,
+    # streamed page by page with the running balance checked across pages
+    names = [n for n in request.args.get("pages", "").split(",") if n]
+    if not names:
+        return jsonify({"error": "pages is required"}), 400
+    paths = [input_path(n) for n in names]
+    missing = [n for n, p in zip(names, paths) if p is None or not os.path.exists(p)]
+    if missing:
+        return jsonify({"error": f"Files not found in {INPUT_FOLDER}: {', '.join(missing)}"}), 404
+
+    def generate():
+        for row in iter_pages(paths):
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+@app.route('/pair-sides', methods=['GET'])
+def pair_all_sides():
+    # Pair fronts and backs across everything already in OUTPUT_FOLDER
+    return responses.shaped_json(pair_sides(load_results([OUTPUT_FOLDER] if os.path.isdir(OUTPUT_FOLDER) else [])))
+
+@app.route('/search', methods=['GET'])
+def search_results():
+    # e.g. /search?document_type=PAN Card&side=Front&dob_year=1990
+    try:
+        return responses.shaped_json(get_store().search(**search_args(request.args)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+def create_app():
+    # Used by serve.py: refuse to start on an engine that isn't installed,
+    # then warm up OpenCV/Tesseract once, before workers fork
+    engines.check(OCR_ENGINE)
+    warm_up()
+    return app
 
 if __name__ == "__main__":
+    engines.check(OCR_ENGINE)
     app.run(debug=True)
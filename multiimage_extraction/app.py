@@ -1,14 +1,21 @@
-import cv2
-import numpy as np
-import pytesseract
-import re
-import json
 import os
+import sys
 import time
-from flask import Flask, jsonify
-from rapidfuzz import fuzz
+from flask import Flask, jsonify, request
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from ocr_pipeline import admission, profiling, responses, stages
+from ocr_pipeline.manifest import Manifest
+from ocr_pipeline.pipeline import PipelineError
+from ocr_pipeline.artifacts import get_artifact_cache
+from ocr_pipeline.stages import build_pipeline
+from ocr_pipeline.watcher import FolderWatcher
+from ocr_pipeline.results_store import get_store, search_args
+from ocr_pipeline.serving import warm_up
 
 app = Flask(__name__)
+responses.install(app)
+profiling.install(app)
 
 
 # Config
@@ -20,144 +27,133 @@ OUTPUT_FOLDER = os.path.join(BASE_DIR, "outputs")
 PREDICTED_FOLDER = os.path.join(OUTPUT_FOLDER, "image_out")
 NOT_PREDICTED_FOLDER = os.path.join(OUTPUT_FOLDER, "not_predicted")
 
-os.makedirs(PREDICTED_FOLDER, exist_ok=True)
-os.makedirs(NOT_PREDICTED_FOLDER, exist_ok=True)
 
+# Manifest of processed inputs so reruns only OCR new or changed images
+MANIFEST_PATH = os.path.join(OUTPUT_FOLDER, "manifest.sqlite")
+_manifest = None
 
-# Keyword dictionary (unchanged)
 
-DOCUMENT_KEYWORDS = {
-    "PAN Card": ["income tax department", "permanent account number", "govt of india", "father's name"],
-    "Aadhaar Card": ["aadhaar", "uidai", "government of india", "year of birth", "date of birth", "gender"],
-    "Voter ID Card": ["election commission of india", "voter id", "elector's photo identity card", "elector's name", "sex", "epic"],
-    "Passport": ["passport", "republic of india", "place of birth", "date of issue", "date of expiry"],
-    "Driving License": ["driving license", "dl no", "valid till", "transport", "date of issue", "dob"],
-    "Bank Passbook": ["account number", "ifsc", "branch", "customer id", "balance", "transaction", "a/c"]
-}
+def get_manifest():
+    # Opened on first use so batch workers importing this module don't touch it
+    global _manifest
+    if _manifest is None:
+        os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+        _manifest = Manifest(MANIFEST_PATH)
+    return _manifest
 
 
-# Regex patterns
+# Pipeline: fuzzy classifier with a "not sure" threshold, results filed by prediction
 
-PAN_PATTERN = re.compile(r"^[A-Z]{5}[0-9]{4}[A-Z]$")
-AADHAR_PATTERN = re.compile(r"^\d{4}\s\d{4}\s\d{4}$")
-AADHAR_PATTERN_NOSPACE = re.compile(r"^\d{12}$")
-DL_NUMBER_PATTERN = re.compile(r"^[A-Z]{2}\d{2}[0-9A-Z]{11,}$")
-VOTER_PATTERN = re.compile(r"^[A-Z]{3}[0-9]{7}$")
-PASSPORT_PATTERN = re.compile(r"^[A-Z][0-9]{7}$")
-IFSC_PATTERN = re.compile(r"^[A-Z]{4}0[A-Z0-9]{6}$")
+CLASSIFY_MIN_SCORE = 50
 
+pipeline = build_pipeline(
+    classify=stages.classify_fuzzy,
+    classify_config={"min_score": CLASSIFY_MIN_SCORE},
+    extract_config={"not_predicted_error": True},
+    persist=stages.persist_by_prediction,
+    persist_config={"predicted_folder": PREDICTED_FOLDER, "not_predicted_folder": NOT_PREDICTED_FOLDER,
+                    "store_source": "multiimage_extraction"},
+    cache=get_artifact_cache,
+)
+analysis_pipeline = pipeline.without("persist")
 
-# Document classifier
 
-def classify_document(raw_blocks):
-    if not raw_blocks:
-        return None, {}
-    all_text = " ".join(raw_blocks).lower()
-    scores = {}
-    for doc, keywords in DOCUMENT_KEYWORDS.items():
-        score = max(fuzz.partial_ratio(all_text, kw.lower()) for kw in keywords)
-        scores[doc] = score
-    best_doc = max(scores, key=scores.get)
-    if scores[best_doc] < 50:  # threshold for "not sure"
-        return None, scores
-    return best_doc, scores
+def analyze_document(image_path):
+    # OCR + classification only, nothing is written to disk
+    try:
+        return analysis_pipeline.run(image_path)
+    except PipelineError as e:
+        return {"error": str(e)}
 
 
-# Side classifier (unchanged)
+def result_path_for(image_path, result):
+    folder = PREDICTED_FOLDER if result.get("document_type") else NOT_PREDICTED_FOLDER
+    return os.path.join(folder, f"{os.path.basename(image_path)}.json")
 
-def classify_side(doc_type, raw_blocks):
-    # your existing side logic (unchanged for brevity)
-    return "Front"  # fallback
-
-
-# Cleaned summary generator (unchanged)
-
-def generate_cleaned_summary(blocks, doc_type):
-    # your existing summary logic
-    return {"Document": doc_type, "Other Details": blocks}
 
+def process_document(image_path):
+    # Predicted results go to image_out, the rest to not_predicted
+    try:
+        return pipeline.run(image_path)
+    except PipelineError as e:
+        return {"error": str(e)}
 
-# OCR Processing
 
-def process_document(image_path):
-    image = cv2.imread(image_path)
-    if image is None:
-        return {"error": f"Could not read image: {image_path}"}
-
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-    dilated = cv2.dilate(thresh, kernel, iterations=2)
-    contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    contours = sorted(contours, key=lambda ctr: cv2.boundingRect(ctr)[1])
-
-    extracted_blocks = []
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)
-        roi = image[y:y+h, x:x+w]
-        text = pytesseract.image_to_string(roi, config="--psm 6").strip()
-        if text:
-            extracted_blocks.append(text)
-
-    doc_type, fuzzy_scores = classify_document(extracted_blocks)
-
-    if not doc_type:  # not predicted
-        output_data = {
-            "filename": os.path.basename(image_path),
-            "raw_detected_text": extracted_blocks,
-            "document_type": None,
-            "side": None,
-            "error": "Not Predicted"
-        }
-        # Save into not_predicted folder
-        out_path = os.path.join(NOT_PREDICTED_FOLDER, f"{os.path.basename(image_path)}.json")
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(output_data, f, indent=4, ensure_ascii=False)
-        return output_data
-
-    side = classify_side(doc_type, extracted_blocks)
-    summary = generate_cleaned_summary(extracted_blocks, doc_type)
-
-    output_data = {
-        "filename": os.path.basename(image_path),
-        "raw_detected_text": extracted_blocks,
-        "cleaned_summary": summary,
-        "document_type": doc_type,
-        "side": side,
-        "fuzzy_scores": fuzzy_scores
-    }
+# Flask Routes
 
-    out_path = os.path.join(PREDICTED_FOLDER, f"{os.path.basename(image_path)}.json")
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, indent=4, ensure_ascii=False)
+def result_status(result):
+    # "Not Predicted" is a finished result, an unreadable image is not
+    return "error" if result.get("error", "").startswith("Could not read image") else "ok"
 
-    return output_data
 
+def process_and_record(image_path, sha1=None):
+    result = process_document(image_path)
+    get_manifest().mark_done(image_path, sha1, result_status(result), result_path_for(image_path, result))
+    return result
 
-# Flask Routes
 
 @app.route('/process-all', methods=['GET'])
+@admission.admit("batch")
 def process_all_files():
+    # ?full=1 re-OCRs everything, otherwise only new/changed files are processed
+    full = request.args.get("full", "0") == "1"
+    if full:
+        pending = [(os.path.join(INPUT_FOLDER, f), None) for f in sorted(os.listdir(INPUT_FOLDER))
+                   if f.lower().endswith((".jpg", ".jpeg", ".png"))]
+    else:
+        pending = get_manifest().scan(INPUT_FOLDER)
+
     results = []
     predicted_count = 0
     not_predicted_count = 0
 
-    for file_name in os.listdir(INPUT_FOLDER):
-        if file_name.lower().endswith((".jpg", ".jpeg", ".png")):
-            image_path = os.path.join(INPUT_FOLDER, file_name)
-            result = process_document(image_path)
-            results.append(result)
-            if result.get("document_type"):
-                predicted_count += 1
-            else:
-                not_predicted_count += 1
+    for image_path, sha1 in pending:
+        result = process_and_record(image_path, sha1)
+        results.append(result)
+        if result.get("document_type"):
+            predicted_count += 1
+        else:
+            not_predicted_count += 1
 
     summary = {
         "total_files": len(results),
         "predicted": predicted_count,
-        "not_predicted": not_predicted_count
+        "not_predicted": not_predicted_count,
+        "already_processed": get_manifest().count() - len(results) if not full else 0
     }
-    return jsonify({"summary": summary, "results": results})
+    return responses.shaped_json({"summary": summary, "results": results})
+
+
+@app.route('/search', methods=['GET'])
+def search_results():
+    # e.g. /search?document_type=PAN Card&side=Front&dob_year=1990
+    try:
+        return responses.shaped_json(get_store().search(**search_args(request.args)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+def run_watcher():
+    # Keep processing images as they land in INPUT_FOLDER
+    def handle(image_path):
+        result = process_document(image_path)
+        return result_status(result), result_path_for(image_path, result)
+
+    watcher = FolderWatcher(INPUT_FOLDER, get_manifest(), handle)
+    watcher.start()
+    print(f"Watching {INPUT_FOLDER} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watcher.stop()
+
+def create_app():
+    # Used by serve.py: warm up OpenCV/Tesseract once, before workers fork
+    warm_up()
+    return app
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    if "--watch" in sys.argv:
+        run_watcher()
+    else:
+        app.run(debug=True)
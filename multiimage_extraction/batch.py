@@ -0,0 +1,239 @@
+# Command-line batch runner for large backfills (no Flask involved).
+#
+#   python multiimage_extraction/batch.py /archive/scans --out backfill_out --workers 8
+#
+# - images are OCR'd in a process pool, at most --max-in-flight at a time, and
+#   input folders are walked lazily, so memory stays flat for any input size
+# - results are appended to sharded JSONL files (results-00000.jsonl, ...)
+# - every --checkpoint-every results the shard is fsync'd and the checkpoint
+#   (an SQLite manifest of finished paths) is committed
+# - rerunning the same command resumes: finished paths are skipped and output
+#   continues in a new shard. Results written after the last checkpoint may
+#   appear twice after a crash, never zero times.
+# - a file that vanishes or can't be read, or a worker that dies, is recorded
+#   as failed and the run goes on (a dead pool is replaced)
+# - the stage artifact cache is off unless --artifact-cache is given: a
+#   backfill reads every image once, so caching it only grows the database
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, ".."))
+from ocr_pipeline.manifest import IMAGE_EXTENSIONS, Manifest, file_sha1
+
+# Loaded from its file, as serve.py does: every app folder has an app.py, so
+# "import app" gets whichever one is first on sys.path
+APP_PATH = os.path.join(BASE_DIR, "app.py")
+APP_MODULE = "multiimage_extraction_app"
+
+SHARD_SIZE = 10000
+CHECKPOINT_EVERY = 200
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+def init_worker():
+    import cv2
+    # One OpenCV thread per process, the pool already uses every core
+    cv2.setNumThreads(1)
+
+
+def load_app():
+    module = sys.modules.get(APP_MODULE)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(APP_MODULE, APP_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[APP_MODULE] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[APP_MODULE]
+            raise
+    return module
+
+
+def run_one(image_path):
+    analyze_document = load_app().analyze_document
+    sha1 = None
+    try:
+        # Hash in the worker so the parent only writes and checkpoints
+        sha1 = file_sha1(image_path)
+        result = analyze_document(image_path)
+    except Exception as e:
+        result = {"error": f"Processing failed: {e}"}
+    result["path"] = image_path
+    result["sha1"] = sha1
+    return result
+
+
+def failed_result(image_path, error):
+    # For a job whose worker never returned (crashed pool, unpicklable result)
+    return {"error": f"Processing failed: {error}", "path": image_path, "sha1": None}
+
+
+# -----------------------------
+# Input and output
+# -----------------------------
+def iter_images(paths):
+    # Lazy recursive walk, sorted per directory so runs are repeatable
+    for path in paths:
+        if os.path.isfile(path):
+            yield os.path.abspath(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.abspath(os.path.join(root, name))
+
+
+class ShardWriter:
+    def __init__(self, out_dir, shard_size):
+        self.out_dir = out_dir
+        self.shard_size = shard_size
+        existing = [f for f in os.listdir(out_dir) if f.startswith("results-") and f.endswith(".jsonl")]
+        # Never append to a shard a crashed run may have left half-written
+        self.index = len(existing)
+        self.lines = 0
+        self.file = None
+
+    def write(self, record):
+        if self.file is None or self.lines >= self.shard_size:
+            self._rotate()
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.lines += 1
+
+    def _rotate(self):
+        self.close()
+        path = os.path.join(self.out_dir, f"results-{self.index:05d}.jsonl")
+        self.file = open(path, "a", encoding="utf-8")
+        self.index += 1
+        self.lines = 0
+
+    def sync(self):
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+
+# -----------------------------
+# Driver
+# -----------------------------
+def run_batch(paths, out_dir, workers, max_in_flight, shard_size, checkpoint_every, artifact_cache=False):
+    if not artifact_cache:
+        # Read by the workers when they import the pipeline
+        os.environ["ARTIFACT_CACHE"] = "off"
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint = Manifest(os.path.join(out_dir, "checkpoint.sqlite"))
+    writer = ShardWriter(out_dir, shard_size)
+
+    done = skipped = failed = 0
+    since_checkpoint = 0
+    start = time.time()
+
+    def checkpoint_now():
+        writer.sync()
+        checkpoint.commit()
+
+    def new_pool():
+        return ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+
+    pool = new_pool()
+    try:
+        in_flight = {}
+        images = iter_images(paths)
+        exhausted = False
+
+        while in_flight or not exhausted:
+            # Top up the pool without ever holding more than max_in_flight jobs
+            while not exhausted and len(in_flight) < max_in_flight:
+                image_path = next(images, None)
+                if image_path is None:
+                    exhausted = True
+                    break
+                if checkpoint.is_done(image_path):
+                    skipped += 1
+                    continue
+                try:
+                    future = pool.submit(run_one, image_path)
+                except BrokenProcessPool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = new_pool()
+                    future = pool.submit(run_one, image_path)
+                in_flight[future] = image_path
+
+            if not in_flight:
+                break
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            broken = False
+            for future in finished:
+                image_path = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = failed_result(image_path, e)
+                    broken = broken or isinstance(e, BrokenProcessPool)
+                writer.write(result)
+                error = result.get("error") or ""
+                status = "error" if error.startswith(("Could not read", "Processing failed")) else "ok"
+                failed += status == "error"
+                checkpoint.mark_done(result["path"], result["sha1"], status=status, commit=False)
+                done += 1
+                since_checkpoint += 1
+            if broken:
+                # A worker died: every job still on the old pool fails with it
+                # the next time round, new jobs go to a fresh pool
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = new_pool()
+
+            if since_checkpoint >= checkpoint_every:
+                checkpoint_now()
+                since_checkpoint = 0
+                rate = done / max(time.time() - start, 1e-6)
+                print(f"{done} processed ({failed} failed, {skipped} skipped) - {rate:.1f} img/s", flush=True)
+    finally:
+        pool.shutdown()
+
+    checkpoint_now()
+    writer.close()
+    checkpoint.close()
+    return {"processed": done, "failed": failed, "skipped": skipped, "seconds": round(time.time() - start, 1)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill OCR over folders of scans")
+    parser.add_argument("paths", nargs="+", help="Image files or folders (walked recursively)")
+    parser.add_argument("--out", default=os.path.join(BASE_DIR, "outputs", "batch"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Images submitted but not yet written (default: 2 x workers)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY)
+    parser.add_argument("--artifact-cache", action="store_true",
+                        help="Keep the stage artifact cache on (off by default for backfills)")
+    args = parser.parse_args()
+
+    stats = run_batch(
+        args.paths,
+        args.out,
+        args.workers,
+        args.max_in_flight or 2 * args.workers,
+        args.shard_size,
+        args.checkpoint_every,
+        args.artifact_cache,
+    )
+    print(json.dumps(stats))
@@ -1,19 +1,21 @@
 # ocr_flask_api_static.py
-from flask import Flask, jsonify
+from flask import Flask, request
 import cv2
-import numpy as np
-import pytesseract
-import easyocr
-import base64
 import os
 import json
+import sys
 import time
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from ocr_pipeline import admission, engines, profiling, responses, stages
+from ocr_pipeline.ocr_engine import get_easyocr_reader
+from ocr_pipeline.preprocessing import preprocess, image_cache_key
+from ocr_pipeline.serving import warm_up
+
 # Initialize Flask app
 app = Flask(__name__)
-
-# Initialize EasyOCR
-easyocr_reader = easyocr.Reader(['en'], gpu=False)
+responses.install(app)
+profiling.install(app)
 
 # ---------------------------
 # Config: Image path & Output
@@ -28,39 +30,36 @@ OUTPUT_FILE = os.path.join(OUTPUT_DIR, "ocr_output.json")
 # ---------------------------
 # Image Preprocessing
 # ---------------------------
-def preprocess_image(image_path):
+def preprocess_image(image_path, profile="auto"):
     img = cv2.imread(image_path)
 
-    # Resize (max dimension 1024)
-    max_dim = 1024
-    h, w = img.shape[:2]
-    if max(h, w) > max_dim:
-        scale = max_dim / max(h, w)
-        img = cv2.resize(img, (int(w*scale), int(h*scale)), interpolation=cv2.INTER_AREA)
-
-    # Grayscale
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    # Resize / denoise / binarize according to the chosen profile. The old
+    # fixed path (resize 1024 + fastNlMeansDenoising + adaptive threshold) is
+    # the "heavy" profile and now only runs on images that look noisy.
+    prep = preprocess(img, profile, cache_key=image_cache_key(image_path))
 
-    # Denoising
-    denoised = cv2.fastNlMeansDenoising(gray, h=30)
+    # Tesseract wants dark text on a light background
+    binarized = cv2.bitwise_not(prep["binary"])
 
-    # Adaptive threshold (binarization)
-    binarized = cv2.adaptiveThreshold(
-        denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 2
-    )
-
-    return binarized
+    return binarized, prep["profile"]
 
 # ---------------------------
 # OCR Functions
 # ---------------------------
 def ocr_tesseract(image):
+    import pytesseract  # lazy: see ocr_pipeline/engines.py
+
     start = time.time()
     text = pytesseract.image_to_string(image)
     elapsed = time.time() - start
     return text, elapsed
 
 def ocr_easyocr(image_path):
+    # The EasyOCR reader (and torch) load on the first request that needs them,
+    # shared with the ensemble engine
+    easyocr_reader = get_easyocr_reader()
+    if easyocr_reader is None:
+        return "EasyOCR is not installed", 0.0
     start = time.time()
     result = easyocr_reader.readtext(image_path)
     text = "\n".join([text[1] for text in result])
@@ -70,29 +69,27 @@ def ocr_easyocr(image_path):
 def ocr_paddleocr_placeholder(image):
     return "PaddleOCR integration placeholder", 0.0
 
-# ---------------------------
-# Helper: Image to Base64
-# ---------------------------
-def image_to_base64(image_path):
-    with open(image_path, "rb") as f:
-        return base64.b64encode(f.read()).decode('utf-8')
-
 # ---------------------------
 # Flask Route
 # ---------------------------
 @app.route('/ocr', methods=['GET'])
+@admission.admit("interactive")
 def ocr_api():
     # Preprocess
-    processed_img = preprocess_image(IMAGE_PATH)
+    processed_img, profile = preprocess_image(IMAGE_PATH)
 
     # OCR + timing
     tesseract_text, tesseract_time = ocr_tesseract(processed_img)
     easyocr_text, easyocr_time = ocr_easyocr(IMAGE_PATH)
     paddleocr_text, paddleocr_time = ocr_paddleocr_placeholder(processed_img)
 
-    # Build JSON Response
+    # Build JSON Response. The input image is a /images/<sha1> reference
+    # unless ?images=inline asks for the old base64 copy
+    image_mode = request.args.get("images", "ref")
+    image_key = "Input_Image_Base64" if image_mode == "inline" else "Input_Image"
     response = {
-        "Input_Image_Base64": image_to_base64(IMAGE_PATH),
+        image_key: responses.image_field(IMAGE_PATH, image_mode),
+        "Preprocess_Profile": profile,
         "Tesseract": {
             "ocr_response": tesseract_text,
             "execution_time_sec": round(tesseract_time, 3),
@@ -115,7 +112,44 @@ def ocr_api():
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
         json.dump(response, f, indent=4, ensure_ascii=False)
 
-    return jsonify(response)
+    return responses.shaped_json(response)
+
+# Per-block OCR with each engine and with the ensemble, same regions for all
+ENSEMBLE_MODES = ["tesseract", "easyocr", "ensemble"]
+ensemble_pipelines = {
+    mode: stages.build_pipeline(ocr_config={"engine": mode, "reocr": False}).without("persist")
+    for mode in ENSEMBLE_MODES
+}
+
+@app.route('/ocr-ensemble', methods=['GET'])
+@admission.admit("interactive")
+def ocr_ensemble_api():
+    response = {"Input_Image": os.path.basename(IMAGE_PATH)}
+    for mode, pipeline in ensemble_pipelines.items():
+        if not engines.available(mode):
+            # Its reader would return nothing, which reads as a blank image
+            response[mode] = {"error": f"{mode} is not installed"}
+            continue
+        ctx = pipeline.run_ctx({"image_path": IMAGE_PATH})
+        output = ctx["output_data"]
+        response[mode] = {
+            "ocr_response": "\n".join(output["raw_detected_text"]),
+            "document_type": output["document_type"],
+            "number": output["cleaned_summary"]["Number"],
+            "ocr_time_sec": round(ctx["timings"]["ocr"] / 1000, 3),
+            "block_confidence": output.get("block_confidence", []),
+        }
+    return responses.shaped_json(response)
+
+def create_app():
+    # Used by serve.py: warm up OpenCV/Tesseract once, before workers fork.
+    # EasyOCR (and torch) load on the first request that needs them, or here
+    # with WARM_ENGINES=tesseract,easyocr
+    for mode in ENSEMBLE_MODES:
+        if not engines.available(mode):
+            print(f"Warning: OCR engine {mode} is not installed, /ocr and /ocr-ensemble report it as missing")
+    warm_up()
+    return app
 
 # ---------------------------
 # Run Flask App
@@ -0,0 +1,2 @@
+# Shared OCR building blocks used by the Flask apps in this repo.
+# Each app folder adds the repo root to sys.path and imports from here.
@@ -0,0 +1,255 @@
+import functools
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import jsonify, make_response, request
+
+try:
+    import redis
+except ImportError:  # optional: rate limits stay per process without it
+    redis = None
+
+from ocr_pipeline.serving import THREADS
+
+# -----------------------------
+# Admission control for OCR endpoints
+# -----------------------------
+# Two checks before a request may start OCR work:
+#
+#  1. Per-client token bucket. The client is the remote address, or the
+#     X-API-Key header when it is one of ADMISSION_API_KEYS (any other value
+#     is ignored: a made-up key per request must not buy a fresh bucket).
+#     Empty bucket -> 429 with Retry-After until the next token. Buckets live
+#     in process memory, or in Redis (any Redis-compatible server) when
+#     ADMISSION_REDIS_URL is set, so all workers share one limit.
+#  2. Lanes. "interactive" (single documents) and "batch" (/process-all ...)
+#     share the process's work slots but batch may hold at most
+#     BATCH_MAX_IN_FLIGHT of them, and whenever a slot frees up waiting
+#     interactive requests go first. A request whose estimated queue wait
+#     (waiters ahead x mean service time / slots) exceeds its lane's SLO, or
+#     that finds the lane's queue full, is shed at once with 503 + Retry-After
+#     instead of timing out later.
+#
+#   @app.route('/extract/<filename>')
+#   @admission.admit("interactive")
+#   def extract_text(filename): ...
+SLOTS = int(os.environ.get("ADMISSION_SLOTS", THREADS))
+RATE = float(os.environ.get("ADMISSION_RATE", 2.0))          # tokens per second per client
+BURST = float(os.environ.get("ADMISSION_BURST", 10.0))
+REDIS_URL = os.environ.get("ADMISSION_REDIS_URL")
+API_KEYS = frozenset(k.strip() for k in os.environ.get("ADMISSION_API_KEYS", "").split(",") if k.strip())
+MAX_CLIENTS = 100_000                                        # in-process buckets kept (LRU)
+EWMA_ALPHA = 0.2
+
+# name -> priority (lower first), in-flight cap, SLO seconds, max queued, token cost
+LANES = {
+    "interactive": {"priority": 0, "max_in_flight": SLOTS, "slo": float(os.environ.get("INTERACTIVE_SLO", 10)),
+                    "max_queue": 4 * SLOTS, "cost": 1.0},
+    "batch": {"priority": 1, "max_in_flight": int(os.environ.get("BATCH_MAX_IN_FLIGHT", 1)),
+              "slo": float(os.environ.get("BATCH_SLO", 120)), "max_queue": 2, "cost": 5.0},
+}
+
+
+class Rejected(Exception):
+    def __init__(self, status, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+# -----------------------------
+# Token buckets
+# -----------------------------
+class LocalBuckets:
+    def __init__(self, rate=RATE, burst=BURST, max_clients=MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, client, cost=1.0):
+        # Returns 0 if admitted, else seconds until cost tokens are available
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - ts) * self.rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+# Same algorithm as LocalBuckets, atomically inside Redis
+TAKE_SCRIPT = """
+local rate, burst, now, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    def __init__(self, url, rate=RATE, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2)
+        self._take = self._client.register_script(TAKE_SCRIPT)
+        self._fallback = LocalBuckets(rate, burst)
+
+    def take(self, client, cost=1.0):
+        try:
+            return float(self._take(keys=[f"ocr:bucket:{client}"], args=[self.rate, self.burst, time.time(), cost]))
+        except redis.RedisError:
+            # Never fail a request because the limiter is down
+            return self._fallback.take(client, cost)
+
+
+def make_buckets():
+    if REDIS_URL and redis is not None:
+        return RedisBuckets(REDIS_URL)
+    if REDIS_URL:
+        print("Warning: ADMISSION_REDIS_URL set but redis is not installed, using per-process limits")
+    return LocalBuckets()
+
+
+# -----------------------------
+# Lanes + priority queue
+# -----------------------------
+class Admission:
+    def __init__(self, slots=SLOTS, lanes=LANES, buckets=None):
+        self.slots = slots
+        self.lanes = lanes
+        self.buckets = buckets or make_buckets()
+        self._cond = threading.Condition()
+        self._waiting = []                          # heap of (priority, seq, lane)
+        self._seq = itertools.count()
+        self._in_flight = {name: 0 for name in lanes}
+        self._service = {name: 1.0 for name in lanes}   # EWMA seconds per request
+
+    def _free(self, lane):
+        return (sum(self._in_flight.values()) < self.slots
+                and self._in_flight[lane] < self.lanes[lane]["max_in_flight"])
+
+    def estimated_wait(self, lane):
+        # Waiters that will be served before a new arrival, spread over the lane's slots
+        priority = self.lanes[lane]["priority"]
+        ahead = sum(1 for p, _, _ in self._waiting if p <= priority)
+        if not ahead and self._free(lane):
+            return 0.0
+        parallel = max(1, min(self.slots, self.lanes[lane]["max_in_flight"]))
+        return (ahead + 1) * self._service[lane] / parallel
+
+    def _my_turn(self, entry):
+        # First waiter (priority order) whose lane has room is served
+        for waiting in sorted(self._waiting):
+            if self._free(waiting[2]):
+                return waiting is entry
+        return False
+
+    def acquire(self, lane, client):
+        config = self.lanes[lane]
+        wait = self.buckets.take(client, config["cost"])
+        if wait > 0:
+            raise Rejected(429, "Rate limit exceeded", wait)
+
+        with self._cond:
+            # Waiters of a lower-priority lane (batch at its cap) don't block us
+            if self._free(lane) and all(p > config["priority"] for p, _, _ in self._waiting):
+                self._in_flight[lane] += 1
+                return time.monotonic()
+            queued = sum(1 for _, _, name in self._waiting if name == lane)
+            estimate = self.estimated_wait(lane)
+            if queued >= config["max_queue"] or estimate > config["slo"]:
+                raise Rejected(503, "Server busy", estimate)
+
+            entry = (config["priority"], next(self._seq), lane)
+            heapq.heappush(self._waiting, entry)
+            deadline = time.monotonic() + config["slo"]
+            try:
+                while not self._my_turn(entry):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Rejected(503, "Server busy", self.estimated_wait(lane))
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+            self._in_flight[lane] += 1
+            self._cond.notify_all()
+        return time.monotonic()
+
+    def release(self, lane, started):
+        elapsed = time.monotonic() - started
+        with self._cond:
+            self._in_flight[lane] -= 1
+            self._service[lane] += EWMA_ALPHA * (elapsed - self._service[lane])
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                name: {"in_flight": self._in_flight[name],
+                       "queued": sum(1 for _, _, lane in self._waiting if lane == name),
+                       "mean_service_sec": round(self._service[name], 3)}
+                for name in self.lanes
+            }
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_admission():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Admission()
+    return _default
+
+
+def client_id():
+    key = request.headers.get("X-API-Key")
+    if key and key in API_KEYS:
+        return f"key:{key}"
+    return request.remote_addr or "anonymous"
+
+
+def admit(lane):
+    # Route decorator; the slot is held until the response is closed, so
+    # streamed (SSE / NDJSON) responses keep it while they produce output
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            admission = get_admission()
+            try:
+                started = admission.acquire(lane, client_id())
+            except Rejected as e:
+                response = make_response(jsonify({"error": str(e), "retry_after": e.retry_after}), e.status)
+                response.headers["Retry-After"] = str(e.retry_after)
+                return response
+            try:
+                response = make_response(view(*args, **kwargs))
+            except BaseException:
+                admission.release(lane, started)
+                raise
+            response.call_on_close(lambda: admission.release(lane, started))
+            return response
+        return wrapper
+    return decorator
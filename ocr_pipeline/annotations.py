@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import cv2
+
+# -----------------------------
+# Lazily rendered annotated images
+# -----------------------------
+# Instead of encoding a full-size *_output.jpg for every document, persist can
+# write a small sidecar next to where that image would be:
+#
+#   <name>_output.boxes.json   {"image": <source copy, relative>, "boxes": [[x, y, w, h], ...]}
+#   <name>_output.source.<ext> copy of the image the boxes were found on
+#
+# The source is copied rather than referenced: uploads are overwritten by a
+# re-upload of the same name and evicted on their own schedule, while the copy
+# lives and dies with the rest of the output group.
+#
+# The annotated image is drawn only when somebody asks for it, at one of a few
+# width buckets and as JPEG or WebP. Rendered bytes are kept in an LRU bounded
+# by RENDER_CACHE_BYTES; the ETag comes from the sidecar and source mtimes, so
+# a conditional GET is answered without decoding anything.
+BOX_COLOR = (0, 255, 0)
+ANNOTATION_SUFFIX = ".boxes.json"
+SOURCE_SUFFIX = ".source"
+SIZE_BUCKETS = (160, 320, 640, 1280)       # requested width rounds up to one of these
+RENDER_CACHE_BYTES = int(os.environ.get("RENDER_CACHE_MB", 64)) * 1024 * 1024
+
+# format -> (extension, imencode params, mimetype)
+FORMATS = {
+    "jpeg": (".jpg", [cv2.IMWRITE_JPEG_QUALITY, 85], "image/jpeg"),
+    "webp": (".webp", [cv2.IMWRITE_WEBP_QUALITY, 80], "image/webp"),
+}
+
+
+def draw_boxes(image, boxes, thickness=2):
+    for x, y, w, h in boxes:
+        cv2.rectangle(image, (x, y), (x + w, y + h), BOX_COLOR, thickness)
+    return image
+
+
+# -----------------------------
+# Sidecars
+# -----------------------------
+def sidecar_path(output_folder, image_name):
+    return os.path.join(output_folder, os.path.splitext(image_name)[0] + ANNOTATION_SUFFIX)
+
+
+def source_path(output_folder, image_name, image_path):
+    # Where the sidecar's copy of image_path goes; keeps the source extension
+    return os.path.join(output_folder, os.path.splitext(image_name)[0] + SOURCE_SUFFIX
+                        + os.path.splitext(image_path)[1].lower())
+
+
+def save_annotation(output_folder, image_name, image_path, boxes):
+    # Returns the paths written: the sidecar and the source copy
+    source = source_path(output_folder, image_name, image_path)
+    shutil.copyfile(image_path, source)
+    path = sidecar_path(output_folder, image_name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "image": os.path.relpath(source, output_folder),
+            "boxes": [list(b) for b in boxes],
+        }, f)
+    return [path, source]
+
+
+def load_annotation(path):
+    with open(path, encoding="utf-8") as f:
+        annotation = json.load(f)
+    annotation["image"] = os.path.normpath(os.path.join(os.path.dirname(path), annotation["image"]))
+    return annotation
+
+
+def bucket_for(width):
+    # None -> full size; anything wider than the largest bucket is full size too
+    if not width or width <= 0:
+        return None
+    return next((b for b in SIZE_BUCKETS if b >= width), None)
+
+
+# -----------------------------
+# Rendering + LRU
+# -----------------------------
+class RenderCache:
+    def __init__(self, max_bytes=RENDER_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, old = self._items.popitem(last=False)
+                self._size -= len(old)
+
+
+_render_cache = RenderCache()
+
+
+def annotation_etag(sidecar, bucket=None, fmt="jpeg"):
+    # Changes when the sidecar or its source image changes; None if either is gone
+    try:
+        annotation = load_annotation(sidecar)
+        stamps = (os.stat(sidecar).st_mtime_ns, os.stat(annotation["image"]).st_mtime_ns)
+    except (OSError, ValueError, KeyError):
+        return None
+    return hashlib.sha1(f"{sidecar}:{stamps}:{bucket}:{fmt}".encode("utf-8")).hexdigest()
+
+
+def render(sidecar, bucket=None, fmt="jpeg"):
+    annotation = load_annotation(sidecar)
+    image = cv2.imread(annotation["image"])
+    if image is None:
+        raise ValueError(f"Could not read image: {annotation['image']}")
+    boxes, thickness = annotation["boxes"], 2
+    h, w = image.shape[:2]
+    if bucket and w > bucket:
+        scale = bucket / w
+        image = cv2.resize(image, (bucket, max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+        boxes = [[round(v * scale) for v in box] for box in boxes]
+        thickness = 1
+    ext, params, _ = FORMATS[fmt]
+    ok, encoded = cv2.imencode(ext, draw_boxes(image, boxes, thickness), params)
+    if not ok:
+        raise ValueError(f"Could not encode {fmt}")
+    return encoded.tobytes()
+
+
+def rendered_bytes(sidecar, bucket, fmt, etag):
+    data = _render_cache.get(etag)
+    if data is None:
+        data = render(sidecar, bucket, fmt)
+        _render_cache.put(etag, data)
+    return data
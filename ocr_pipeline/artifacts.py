@@ -0,0 +1,196 @@
+# Stage artifact cache (SQLite).
+#
+#   python -m ocr_pipeline.artifacts stats
+#   python -m ocr_pipeline.artifacts clear
+#   python -m ocr_pipeline.artifacts prune
+#
+# Stores what the expensive stages produce (contour boxes, per-block OCR text,
+# the preprocessing profile used) keyed by the image's sha1 plus the config of
+# every stage up to and including OCR (defaults included, and for the script
+# stage the installed Tesseract models). Changing keywords, side indicators or
+# the summary logic doesn't touch the key, so re-running them over a corpus
+# skips imread, thresholding, findContours and Tesseract. Changing a cached
+# stage's config (profile, --psm, ...) gives a new key and a fresh OCR pass.
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_CACHE_PATH = os.path.join(ROOT, "artifacts.sqlite")
+
+# ARTIFACT_CACHE=off disables the cache, any other value is the database path
+CACHE_SETTING = os.environ.get("ARTIFACT_CACHE", DEFAULT_CACHE_PATH)
+
+# Size cap: every PRUNE_EVERY puts the oldest artifacts beyond MAX_ENTRIES,
+# and any older than ARTIFACT_CACHE_MAX_DAYS if set, are deleted
+MAX_ENTRIES = int(os.environ.get("ARTIFACT_CACHE_MAX_ENTRIES", 50000))
+MAX_DAYS = os.environ.get("ARTIFACT_CACHE_MAX_DAYS")
+PRUNE_EVERY = 200
+
+# Bump when the artifact layout or a cached stage's behaviour changes
+ARTIFACT_VERSION = 6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT PRIMARY KEY,
+    image_sha1 TEXT,
+    created_at REAL,
+    payload BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_sha1 ON artifacts (image_sha1);
+CREATE INDEX IF NOT EXISTS idx_artifacts_created ON artifacts (created_at);
+"""
+
+
+def config_digest(stage_configs):
+    # stage_configs: {stage name: {"func": "module.name", **config, ["inputs": {...}]}}
+    blob = json.dumps({"version": ARTIFACT_VERSION, "stages": stage_configs}, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def artifact_key(image_sha1, stage_configs):
+    return f"{image_sha1}-{config_digest(stage_configs)}"
+
+
+def artifact_from_ctx(ctx):
+    image = ctx["image"]
+    return {
+        "size": [image.shape[1], image.shape[0]],
+        "profile": ctx["prep"]["profile"],
+        "boxes": ctx["boxes"],
+        "blobs": len(ctx["regions"]) if "regions" in ctx else len(ctx["boxes"]),
+        "lines": len(ctx["line_regions"]) if "line_regions" in ctx else None,
+        "blocks": ctx["blocks"],
+        "block_boxes": ctx["block_boxes"],
+        "block_details": ctx.get("block_details", []),
+    }
+
+
+def restore_artifact(ctx, artifact):
+    # Put cached stage outputs back on the context and replay their progress
+    # events as a fresh run sends them: one "block" per OCR'd box, empty ones
+    # included, after an "ocr_start" with their count
+    width, height = artifact["size"]
+    ctx["prep"] = {"profile": artifact["profile"]}
+    ctx["image_size"] = (width, height)
+    ctx["boxes"] = [tuple(b) for b in artifact["boxes"]]
+    ctx["blocks"] = artifact["blocks"]
+    ctx["block_boxes"] = [tuple(b) for b in artifact["block_boxes"]]
+    ctx["block_details"] = artifact["block_details"]
+    emit = ctx["emit"]
+    emit("decoded", {"width": width, "height": height})
+    emit("contours", {"count": artifact["blobs"]})
+    if artifact["lines"] is not None:
+        emit("lines", {"count": artifact["lines"], "blobs": artifact["blobs"]})
+    emit("ocr_start", {"count": len(ctx["boxes"])})
+    # Blocks are the non-empty reads, in box order
+    read = iter(zip(ctx["block_boxes"], ctx["blocks"], ctx["block_details"]))
+    pending = next(read, None)
+    for index, box in enumerate(ctx["boxes"]):
+        text, conf = "", 0.0
+        if pending is not None and pending[0] == box:
+            text, conf = pending[1], pending[2]["conf"]
+            pending = next(read, None)
+        emit("block", {"index": index, "box": list(box), "text": text, "conf": conf})
+
+
+class ArtifactCache:
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, max_entries=MAX_ENTRIES,
+                 max_age=float(MAX_DAYS) * 86400 if MAX_DAYS else None):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._puts = 0
+        self._lock = threading.Lock()
+        # Batch workers in separate processes share the file, so wait on locks
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM artifacts WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, key, artifact):
+        payload = zlib.compress(json.dumps(artifact, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (key, image_sha1, created_at, payload) VALUES (?, ?, ?, ?)",
+                (key, key.split("-", 1)[0], time.time(), payload),
+            )
+            self._conn.commit()
+            self._puts += 1
+            due = self._puts % PRUNE_EVERY == 0
+        if due:
+            self.prune()
+
+    def prune(self):
+        # Returns how many artifacts were deleted
+        with self._lock:
+            deleted = 0
+            if self.max_age:
+                deleted += self._conn.execute(
+                    "DELETE FROM artifacts WHERE created_at < ?", (time.time() - self.max_age,)
+                ).rowcount
+            if self.max_entries:
+                deleted += self._conn.execute(
+                    "DELETE FROM artifacts WHERE key IN "
+                    "(SELECT key FROM artifacts ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM artifacts")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+_default_cache_pid = None
+_default_cache_lock = threading.Lock()
+
+
+def get_artifact_cache():
+    # Shared cache for the apps, opened on first use in each process (SQLite
+    # connections must not cross a fork); None when disabled
+    global _default_cache, _default_cache_pid
+    if CACHE_SETTING.lower() in ("off", "0", "none", ""):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None or _default_cache_pid != os.getpid():
+            _default_cache = ArtifactCache(CACHE_SETTING)
+            _default_cache_pid = os.getpid()
+    return _default_cache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the stage artifact cache")
+    parser.add_argument("command", choices=["stats", "clear", "prune"])
+    parser.add_argument("--db", default=DEFAULT_CACHE_PATH)
+    args = parser.parse_args()
+
+    cache = ArtifactCache(args.db)
+    if args.command == "clear":
+        cache.clear()
+    elif args.command == "prune":
+        print(f"{cache.prune()} artifacts pruned")
+    print(f"{cache.count()} cached artifacts in {args.db}")
@@ -0,0 +1,75 @@
+import importlib
+import importlib.util
+import threading
+
+# -----------------------------
+# OCR engine registry
+# -----------------------------
+# Engines are named "module:function" specs and imported on first use, so a
+# worker (or a CLI run) that never reads with EasyOCR never imports torch, and
+# one that only serves stored results never starts Tesseract. Every reader is
+# reader(roi, config) -> {"text", "conf", "lines", "words"} or None.
+#
+#   read = get_engine("easyocr")           # imports easyocr here, not at startup
+#   register("paddle", "my_pkg.paddle:read_block")
+#
+# Long-lived servers pay for the imports up front in serving.warm_up(). An
+# app configured with an engine that isn't installed should refuse to start
+# (check()): its reader would return None and every document come back empty.
+ENGINES = {
+    "tesseract": "ocr_pipeline.ocr_engine:read_block",
+    "easyocr": "ocr_pipeline.ocr_engine:read_block_easyocr",
+    "ensemble": "ocr_pipeline.ensemble:ensemble_block",
+}
+# Third-party package each engine needs; checked without importing it
+REQUIRES = {
+    "tesseract": "pytesseract",
+    "easyocr": "easyocr",
+    "ensemble": "rapidfuzz",
+}
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def register(name, spec, requires=None):
+    with _lock:
+        ENGINES[name] = spec
+        _loaded.pop(name, None)
+        if requires:
+            REQUIRES[name] = requires
+
+
+def load(spec):
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def get_engine(name):
+    reader = _loaded.get(name)
+    if reader is not None:
+        return reader
+    if name not in ENGINES:
+        raise ValueError(f"Unknown OCR engine: {name}")
+    with _lock:
+        if name not in _loaded:
+            _loaded[name] = load(ENGINES[name])
+        return _loaded[name]
+
+
+def available(name):
+    # Installed, as far as the import system can tell without importing it
+    package = REQUIRES.get(name)
+    return name in ENGINES and (package is None or importlib.util.find_spec(package) is not None)
+
+
+def check(name):
+    # Raises if name is not an engine, or its package is not installed
+    if name not in ENGINES:
+        raise ValueError(f"Unknown OCR engine: {name}")
+    if not available(name):
+        raise RuntimeError(f"OCR engine {name} needs {REQUIRES[name]}, which is not installed")
+
+
+def loaded():
+    return sorted(_loaded)
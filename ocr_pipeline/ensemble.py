@@ -0,0 +1,165 @@
+import difflib
+import itertools
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from rapidfuzz import fuzz
+
+from ocr_pipeline import rules
+from ocr_pipeline.ocr_engine import read_block, read_block_easyocr
+
+# -----------------------------
+# Tesseract + EasyOCR ensemble
+# -----------------------------
+# Both engines read the same block at the same time (Tesseract is a
+# subprocess and EasyOCR's torch ops release the GIL, so threads overlap).
+# Their lines are paired up and merged character by character: where they
+# agree the character is kept, where they disagree the more confident engine
+# wins, unless picking the other engine's characters makes the line a valid
+# ID number (PAN, Aadhaar, EPIC, passport, DL, IFSC). If both haven't answered
+# by ENSEMBLE_DEADLINE seconds, the first engine to answer is used alone, and
+# an engine that raises is treated as having read nothing.
+#
+# Every block gets its own threads, so a read that overran its deadline can't
+# hold up the next block's. Threads can't be stopped, though: an engine with
+# ENSEMBLE_MAX_STRAGGLERS overrun reads still running is skipped (the other
+# engine reads alone) until they finish.
+ENSEMBLE_DEADLINE = float(os.environ.get("ENSEMBLE_DEADLINE", 10.0))
+ENSEMBLE_MAX_STRAGGLERS = int(os.environ.get("ENSEMBLE_MAX_STRAGGLERS", 2))
+LINE_MATCH_MIN = 50         # rapidfuzz ratio for two lines to count as the same line
+MAX_DISAGREEMENTS = 8       # prior search tries at most 2**MAX_DISAGREEMENTS spellings
+
+# name -> reader(roi, tesseract_config)
+ENGINES = {
+    "tesseract": read_block,
+    "easyocr": read_block_easyocr,
+}
+
+# Shapes a merged line is allowed to snap to
+ID_PRIORS = [
+    rules.PAN_PATTERN, rules.AADHAR_PATTERN, rules.AADHAR_PATTERN_NOSPACE, rules.VOTER_PATTERN,
+    rules.PASSPORT_PATTERN, rules.DL_NUMBER_PATTERN, rules.IFSC_PATTERN,
+]
+
+_stragglers = Counter()         # engine name -> overrun reads still running
+_stragglers_lock = threading.Lock()
+
+
+def _straggling(name, delta):
+    with _stragglers_lock:
+        _stragglers[name] += delta
+        if _stragglers[name] <= 0:
+            del _stragglers[name]
+
+
+def _result(future):
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"Warning: ensemble engine failed, using the other one: {e}")
+        return None
+
+
+def matches_prior(text):
+    return any(p.match(text) for p in ID_PRIORS)
+
+
+def vote_line(primary, secondary, primary_conf, secondary_conf):
+    # Character vote between two readings of one line
+    opcodes = difflib.SequenceMatcher(None, primary, secondary, autojunk=False).get_opcodes()
+    pieces = []        # fixed strings, or (primary, secondary) choices
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            pieces.append(primary[i1:i2])
+        elif tag == "replace" and i2 - i1 == j2 - j1:
+            pieces.extend((a, b) for a, b in zip(primary[i1:i2], secondary[j1:j2]))
+        else:
+            # Insertions/deletions: trust the more confident engine's span
+            pieces.append(primary[i1:i2] if primary_conf >= secondary_conf else secondary[j1:j2])
+
+    choices = [p for p in pieces if isinstance(p, tuple)]
+    prefer_primary = primary_conf >= secondary_conf
+
+    def spell(picks):
+        out, k = [], 0
+        for p in pieces:
+            if isinstance(p, tuple):
+                out.append(p[0] if picks[k] else p[1])
+                k += 1
+            else:
+                out.append(p)
+        return "".join(out)
+
+    voted = spell([prefer_primary] * len(choices))
+    if matches_prior(voted.replace(" ", "")) or not choices or len(choices) > MAX_DISAGREEMENTS:
+        return voted
+
+    # Fewest flips away from the confidence vote first
+    for flips in range(1, len(choices) + 1):
+        for positions in itertools.combinations(range(len(choices)), flips):
+            picks = [prefer_primary] * len(choices)
+            for k in positions:
+                picks[k] = not prefer_primary
+            candidate = spell(picks)
+            if matches_prior(candidate.replace(" ", "")):
+                return re.sub(r"\s+", " ", candidate)
+    return voted
+
+
+def merge_reads(reads):
+    # reads: {engine: read_block-style result}; the more confident read drives line order
+    (p_name, primary), (s_name, secondary) = sorted(reads.items(), key=lambda kv: -kv[1]["conf"])
+    unused = list(secondary["lines"])
+    lines = []
+    for line in primary["lines"]:
+        best = max(unused, key=lambda other: fuzz.ratio(line["text"], other["text"]), default=None)
+        if best is None or fuzz.ratio(line["text"], best["text"]) < LINE_MATCH_MIN:
+            lines.append({"text": line["text"], "conf": line["conf"]})
+            continue
+        unused.remove(best)
+        text = vote_line(line["text"], best["text"], line["conf"], best["conf"])
+        lines.append({"text": text, "conf": max(line["conf"], best["conf"])})
+
+    confs = [line["conf"] for line in lines]
+    return {
+        "text": "\n".join(line["text"] for line in lines),
+        "conf": round(sum(confs) / len(confs), 1) if confs else 0.0,
+        "lines": lines,
+        "words": primary["words"],
+        "engines": {p_name: primary["text"], s_name: secondary["text"]},
+        "method": "vote",
+    }
+
+
+def ensemble_block(roi, config="--psm 6", deadline=None, engines=ENGINES):
+    deadline = ENSEMBLE_DEADLINE if deadline is None else deadline
+    with _stragglers_lock:
+        engines = ({name: func for name, func in engines.items() if _stragglers[name] < ENSEMBLE_MAX_STRAGGLERS}
+                   or dict([min(engines.items(), key=lambda kv: _stragglers[kv[0]])]))
+    pool = ThreadPoolExecutor(max_workers=len(engines), thread_name_prefix="ensemble")
+    futures = {pool.submit(func, roi, config): name for name, func in engines.items()}
+    done, pending = wait(futures, timeout=deadline)
+    if not done:
+        # Nobody made the deadline: take whoever finishes first
+        done, pending = wait(futures, return_when=FIRST_COMPLETED)
+    # Leave overrun reads behind, counted until they finish
+    for future in pending:
+        _straggling(futures[future], 1)
+        future.add_done_callback(lambda f, name=futures[future]: _straggling(name, -1))
+    pool.shutdown(wait=False)
+
+    reads = {}
+    for future in done:
+        result = _result(future)
+        if result is not None and result["text"]:
+            reads[futures[future]] = result
+
+    if len(reads) == len(engines) == 2:
+        return merge_reads(reads)
+    if reads:
+        name, result = max(reads.items(), key=lambda kv: kv[1]["conf"])
+        return dict(result, engines={n: r["text"] for n, r in reads.items()}, method=f"fallback:{name}")
+    return {"text": "", "conf": 0.0, "lines": [], "words": [], "engines": {}, "method": "empty"}
@@ -0,0 +1,192 @@
+import re
+
+from ocr_pipeline import rules
+from ocr_pipeline.id_numbers import best_id, format_id
+
+# -----------------------------
+# Geometry-aware field extraction
+# -----------------------------
+# Blocks are split into text lines, each with an estimated box (the block box
+# divided evenly between its lines) and its OCR confidence. For every field
+# we look for its label and score the value candidates around it:
+#
+#   "Name: RAHUL KUMAR"           value after the label on the same line   1.0
+#   "Name"   |   "RAHUL KUMAR"    next line to the right, same row         0.9
+#   "Name"                        the line directly below, overlapping     0.8
+#   "RAHUL KUMAR"
+#
+# Candidates that fail the field's validator are dropped, the rest are scaled
+# by OCR confidence and the single best one is kept. The result is a fixed
+# schema: every field is present, as {"value", "confidence"} or None.
+FIELD_SCHEMA = ["name", "father_name", "dob", "gender", "number", "issuing_authority"]
+
+FIELD_LABELS = {
+    "name": re.compile(r"\bNAME\b|\bNAAM\b"),
+    # The whole "Father's Name" label, or the "Name" in it cuts the value off
+    "father_name": re.compile(r"FATHER(?:['’]?S)?(?:\s*NAME)?|\bS/O\b|\bD/O\b|\bW/O\b|\bC/O\b"),
+    "dob": re.compile(r"\bDOB\b|D\.O\.B|DATE OF BIRTH|BIRTH|YEAR OF BIRTH|\bYOB\b"),
+}
+# A "Name" label that is really part of another label
+NAME_LABEL_EXCLUDE = re.compile(r"FATHER|MOTHER|HUSBAND|SPOUSE|PARENT")
+
+INLINE_SCORE = 1.0
+RIGHT_SCORE = 0.9
+BELOW_SCORE = 0.8
+UNLABELLED_DOB_SCORE = 0.6
+UNVALIDATED_NUMBER_SCORE = 0.3   # right shape, failed checksum/structure
+MAX_BELOW_GAP = 1.5          # in line heights
+
+GENDERS = {"MALE": "Male", "FEMALE": "Female", "TRANSGENDER": "Transgender"}
+AUTHORITIES = [
+    ("ELECTION COMMISSION OF INDIA", "Election Commission of India"),
+    ("INCOME TAX DEPARTMENT", "Income Tax Department"),
+    ("UNIQUE IDENTIFICATION AUTHORITY", "Unique Identification Authority of India"),
+    ("GOVERNMENT OF INDIA", "Government of India"),
+    ("REPUBLIC OF INDIA", "Republic of India"),
+]
+# Words that mark a line as header/label text rather than a person's name
+NOT_A_NAME = re.compile(
+    r"GOVERNMENT|INDIA|INCOME|DEPARTMENT|PERMANENT|ACCOUNT|NUMBER|ELECTION|COMMISSION|"
+    r"AADHAAR|CARD|SIGNATURE|BIRTH|DOB|MALE|FEMALE|ADDRESS|LICEN[CS]E|PASSPORT|REPUBLIC"
+)
+NUMBER_SHAPES = [rules.PAN_PATTERN, rules.AADHAR_PATTERN, rules.AADHAR_PATTERN_NOSPACE, rules.DL_NUMBER_PATTERN,
+                 rules.VOTER_PATTERN, rules.PASSPORT_PATTERN]
+NAME_VALUE = re.compile(r"^[A-Z][A-Z .']{2,40}$")
+YEAR_VALUE = re.compile(r"\b(19|20)\d{2}\b")
+
+# cleaned_summary key for father_name (flask_ui passes "Father's Name")
+FATHER_KEY = "Father’s Name"
+
+
+def text_lines(blocks, block_boxes, block_details=None):
+    # One item per OCR line: text, box (x, y, w, h), conf 0-100
+    items = []
+    for i, (text, (x, y, w, h)) in enumerate(zip(blocks, block_boxes)):
+        lines = [line for line in text.splitlines() if line.strip()]
+        if not lines:
+            continue
+        details = block_details[i] if block_details and i < len(block_details) else None
+        confs = [details["conf"] if details else 100.0] * len(lines)
+        if details and len(details["lines"]) == len(lines):
+            confs = [line["conf"] for line in details["lines"]]
+        line_h = h / len(lines)
+        for j, line in enumerate(lines):
+            items.append({
+                "text": line.strip(),
+                "box": (x, int(y + j * line_h), w, int(line_h)),
+                "conf": confs[j],
+            })
+    return items
+
+
+def clean_name(value):
+    value = re.sub(r"[^A-Za-z .']", " ", value)
+    value = " ".join(value.split()).strip(" .")
+    if not NAME_VALUE.match(value.upper()) or NOT_A_NAME.search(value.upper()):
+        return None
+    return value
+
+
+def clean_dob(value):
+    match = rules.DOB_PATTERN.search(value)
+    if match:
+        return match.group()
+    match = YEAR_VALUE.search(value)
+    return match.group() if match else None
+
+
+VALIDATORS = {"name": clean_name, "father_name": clean_name, "dob": clean_dob}
+
+
+def label_candidates(field, items):
+    label_re = FIELD_LABELS[field]
+    validate = VALIDATORS[field]
+    for i, item in enumerate(items):
+        upper = item["text"].upper()
+        match = label_re.search(upper)
+        if not match or (field == "name" and NAME_LABEL_EXCLUDE.search(upper)):
+            continue
+
+        # Value after the label on the same line ("Name : X", "DOB 01/01/1990"),
+        # up to the next label ("Name: X  DOB: Y")
+        rest = item["text"][match.end():]
+        for other_re in FIELD_LABELS.values():
+            next_label = other_re.search(rest.upper())
+            if next_label:
+                rest = rest[:next_label.start()]
+        rest = re.sub(r"^[\s:;.\-/]+", "", rest)
+        value = validate(rest) if rest else None
+        if value:
+            yield value, INLINE_SCORE * item["conf"] / 100
+            continue
+
+        x, y, w, h = item["box"]
+        for other in items[i + 1:] + items[:i]:
+            ox, oy, ow, oh = other["box"]
+            value = validate(other["text"])
+            if not value:
+                continue
+            same_row = abs((oy + oh / 2) - (y + h / 2)) < h / 2 and ox >= x + w
+            below = 0 <= oy - (y + h) <= MAX_BELOW_GAP * h and ox < x + w and ox + ow > x
+            if same_row:
+                yield value, RIGHT_SCORE * other["conf"] / 100
+            elif below:
+                yield value, BELOW_SCORE * other["conf"] / 100
+
+
+def best(candidates):
+    top = max(candidates, key=lambda c: c[1], default=None)
+    if top is None:
+        return None
+    return {"value": top[0], "confidence": round(top[1], 2)}
+
+
+def extract_fields(blocks, block_boxes, doc_type=None, block_details=None):
+    items = text_lines(blocks, block_boxes, block_details)
+    record = {field: None for field in FIELD_SCHEMA}
+
+    for field in FIELD_LABELS:
+        record[field] = best(label_candidates(field, items))
+
+    if record["dob"] is None:
+        dates = [(clean_dob(i["text"]), UNLABELLED_DOB_SCORE * i["conf"] / 100)
+                 for i in items if rules.DOB_PATTERN.search(i["text"])]
+        record["dob"] = best(dates)
+
+    record["gender"] = best(
+        (GENDERS[word], item["conf"] / 100)
+        for item in items for word in re.findall(r"[A-Z]+", item["text"].upper()) if word in GENDERS
+    )
+
+    id_number = best_id(blocks, doc_type)
+    if id_number is not None:
+        record["number"] = {
+            "value": format_id(id_number),
+            "confidence": round(max(0.5, 1.0 - 0.1 * id_number["substitutions"]), 2),
+        }
+    else:
+        shaped = [i["text"] for i in items if any(p.match(i["text"]) for p in NUMBER_SHAPES)]
+        if shaped:
+            record["number"] = {"value": shaped[0], "confidence": UNVALIDATED_NUMBER_SCORE}
+
+    all_text = " ".join(blocks).upper()
+    for marker, authority in AUTHORITIES:
+        if marker in all_text:
+            record["issuing_authority"] = {"value": authority, "confidence": 1.0}
+            break
+    return record, id_number
+
+
+def summary_from_fields(record, doc_type, father_key=FATHER_KEY):
+    # The cleaned_summary shape consumers already read, without "Other Details"
+    def value(field):
+        return record[field]["value"] if record[field] else None
+
+    return {
+        "Document": doc_type,
+        "Name": value("name"),
+        father_key: value("father_name"),
+        "DOB": value("dob"),
+        "Number": value("number"),
+        "Issuing Authority": value("issuing_authority"),
+    }
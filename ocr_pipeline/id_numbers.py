@@ -0,0 +1,177 @@
+import numpy as np
+
+# -----------------------------
+# ID number validation + OCR confusion correction
+# -----------------------------
+# Every ID we read has a fixed shape: which positions are letters and which
+# are digits. OCR mostly confuses look-alike characters across those classes
+# (O/0, I/1, S/5, B/8, Z/2, G/6), so a candidate is pushed through a per-
+# position lookup table (letters where a digit is expected become digits and
+# vice versa) and then validated: shape, PAN holder-type letter, and the
+# Verhoeff checksum for Aadhaar. Digit-for-digit misreads (8 read as 3) are
+# not guessed at: about one in ten single-digit edits also passes Verhoeff,
+# so such a number is rejected rather than "repaired" into someone else's.
+# For the same reason a token needs more than the right length to become an
+# ID. At most MAX_SUBSTITUTIONS characters are swapped, and every run of
+# letter positions must keep at least one letter as read. A phone number is
+# never "corrected" into a Voter ID or a passport number. When the document
+# type is known, only its own kind of number is accepted.
+# Everything runs on (n, length) uint8 arrays, one pass per ID kind for a
+# whole batch of blocks.
+#
+# Template characters: L letter, D digit, X letter or digit, anything else literal.
+ID_KINDS = {
+    "PAN": ("LLLLLDDDDL", "PAN Card"),
+    "Aadhaar": ("DDDDDDDDDDDD", "Aadhaar Card"),
+    "Voter ID": ("LLLDDDDDDD", "Voter ID Card"),
+    "Passport": ("LDDDDDDD", "Passport"),
+    "Driving License": ("LLDDDDDDDDDDDDD", "Driving License"),
+    "IFSC": ("LLLL0XXXXXX", "Bank Passbook"),
+}
+
+MAX_SUBSTITUTIONS = 2
+
+DOC_TYPES = {doc_type for _, doc_type in ID_KINDS.values()}
+
+# 4th PAN letter: holder type (P person, C company, H HUF, F firm, ...)
+PAN_HOLDER_TYPES = "ABCFGHJLPT"
+
+LETTER_TO_DIGIT = {"O": "0", "D": "0", "Q": "0", "U": "0", "I": "1", "L": "1", "J": "1", "|": "1",
+                   "Z": "2", "A": "4", "S": "5", "G": "6", "T": "7", "B": "8"}
+DIGIT_TO_LETTER = {"0": "O", "1": "I", "2": "Z", "4": "A", "5": "S", "6": "G", "7": "T", "8": "B"}
+
+# Verhoeff tables
+VERHOEFF_D = np.array([
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 2, 3, 4, 0, 6, 7, 8, 9, 5],
+    [2, 3, 4, 0, 1, 7, 8, 9, 5, 6], [3, 4, 0, 1, 2, 8, 9, 5, 6, 7],
+    [4, 0, 1, 2, 3, 9, 5, 6, 7, 8], [5, 9, 8, 7, 6, 0, 4, 3, 2, 1],
+    [6, 5, 9, 8, 7, 1, 0, 4, 3, 2], [7, 6, 5, 9, 8, 2, 1, 0, 4, 3],
+    [8, 7, 6, 5, 9, 3, 2, 1, 0, 4], [9, 8, 7, 6, 5, 4, 3, 2, 1, 0],
+])
+VERHOEFF_P = np.array([
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 5, 7, 6, 2, 8, 3, 0, 9, 4],
+    [5, 8, 0, 3, 7, 9, 6, 1, 4, 2], [8, 9, 1, 6, 0, 4, 3, 5, 2, 7],
+    [9, 4, 5, 3, 1, 2, 6, 8, 7, 0], [4, 2, 8, 6, 5, 7, 3, 9, 0, 1],
+    [2, 7, 9, 3, 8, 0, 6, 4, 1, 5], [7, 0, 4, 6, 9, 1, 3, 2, 5, 8],
+])
+
+
+def _lut(mapping):
+    table = np.arange(256, dtype=np.uint8)
+    for src, dst in mapping.items():
+        table[ord(src)] = ord(dst)
+    return table
+
+
+TO_DIGIT = _lut(LETTER_TO_DIGIT)
+TO_LETTER = _lut(DIGIT_TO_LETTER)
+_codes = np.arange(256)
+IS_DIGIT = (_codes >= ord("0")) & (_codes <= ord("9"))
+IS_LETTER = (_codes >= ord("A")) & (_codes <= ord("Z"))
+
+
+def verhoeff_valid(digits):
+    # digits: (n, length) ints 0-9 -> (n,) bool
+    digits = np.asarray(digits)
+    check = np.zeros(len(digits), dtype=np.int64)
+    for i in range(digits.shape[1]):
+        check = VERHOEFF_D[check, VERHOEFF_P[i % 8, digits[:, -1 - i]]]
+    return check == 0
+
+
+def letter_runs(template):
+    # (start, end) of every run of L positions
+    runs, start = [], None
+    for i, kind in enumerate(template + " "):
+        if kind == "L" and start is None:
+            start = i
+        elif kind != "L" and start is not None:
+            runs.append((start, i))
+            start = None
+    return runs
+
+
+def correct_kind(tokens, template, max_substitutions=MAX_SUBSTITUTIONS):
+    # tokens: equal-length ASCII strings matching len(template)
+    # Returns corrected strings, (n,) valid mask, (n,) substitution counts
+    length = len(template)
+    raw = np.frombuffer("".join(tokens).encode("ascii"), dtype=np.uint8).reshape(-1, length)
+    kinds = np.frombuffer(template.encode("ascii"), dtype=np.uint8)
+    want_digit = (kinds == ord("D")) | (kinds == ord("0"))
+    want_letter = kinds == ord("L")
+    literal = ~np.isin(kinds, [ord("L"), ord("D"), ord("X")])
+
+    fixed = np.where(want_digit, TO_DIGIT[raw], np.where(want_letter, TO_LETTER[raw], raw))
+    valid = np.all(
+        np.where(want_digit, IS_DIGIT[fixed], np.where(want_letter, IS_LETTER[fixed], IS_DIGIT[fixed] | IS_LETTER[fixed])),
+        axis=1,
+    )
+    valid &= np.all(~literal | (fixed == kinds), axis=1)
+    for start, end in letter_runs(template):
+        valid &= IS_LETTER[raw[:, start:end]].any(axis=1)
+    subs = (raw != fixed).sum(axis=1)
+    valid &= subs <= max_substitutions
+    return fixed, valid, subs
+
+
+def candidate_tokens(text):
+    # Each line with spaces removed, plus every whitespace-separated token
+    tokens = []
+    for line in text.upper().splitlines():
+        compact = "".join(line.split())
+        if compact:
+            tokens.append(compact)
+        tokens.extend(t for t in line.split() if t != compact)
+    return [t for t in dict.fromkeys(tokens) if t.isascii()]
+
+
+def correct_batch(texts):
+    # For every text, every valid ID found in it:
+    # [[{"kind", "value", "raw", "substitutions"}, ...], ...]
+    tokens, owners = [], []
+    for index, text in enumerate(texts):
+        for token in candidate_tokens(text):
+            tokens.append(token)
+            owners.append(index)
+    found = [[] for _ in texts]
+
+    for kind, (template, _) in ID_KINDS.items():
+        picked = [i for i, t in enumerate(tokens) if len(t) == len(template)]
+        if not picked:
+            continue
+        fixed, valid, subs = correct_kind([tokens[i] for i in picked], template)
+
+        if kind == "PAN":
+            valid &= np.isin(fixed[:, 3], np.frombuffer(PAN_HOLDER_TYPES.encode("ascii"), dtype=np.uint8))
+        if kind == "Aadhaar":
+            # Never starts with 0/1; non-digit rows are zeroed before the checksum
+            digits = np.where(valid[:, None], fixed - ord("0"), 0).astype(np.int64)
+            valid &= verhoeff_valid(digits) & (fixed[:, 0] >= ord("2"))
+
+        for row in np.flatnonzero(valid):
+            token = tokens[picked[row]]
+            found[owners[picked[row]]].append({
+                "kind": kind,
+                "value": fixed[row].tobytes().decode("ascii"),
+                "raw": token,
+                "substitutions": int(subs[row]),
+            })
+    return found
+
+
+def best_id(texts, doc_type=None):
+    # Best valid ID across a document's blocks, fewest substitutions first.
+    # A known document type only takes its own kind of number.
+    candidates = [c for found in correct_batch(texts) for c in found]
+    if doc_type in DOC_TYPES:
+        candidates = [c for c in candidates if ID_KINDS[c["kind"]][1] == doc_type]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda c: c["substitutions"])
+
+
+def format_id(candidate):
+    if candidate["kind"] == "Aadhaar":
+        value = candidate["value"]
+        return f"{value[:4]} {value[4:8]} {value[8:]}"
+    return candidate["value"]
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# -----------------------------
+# Processed-file manifest (SQLite)
+# -----------------------------
+# One row per input image: path, size, mtime and content hash at the time it
+# was processed. A rescan only stats files; the hash is computed only when
+# size/mtime changed, so an unchanged folder costs one scandir + one query.
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    status TEXT,
+    result_path TEXT,
+    processed_at REAL
+)
+"""
+
+
+def file_sha1(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def _rows(self):
+        with self._lock:
+            cur = self._conn.execute("SELECT path, size, mtime_ns, sha1 FROM files")
+            return {path: (size, mtime_ns, sha1) for path, size, mtime_ns, sha1 in cur}
+
+    def scan(self, folder, extensions=IMAGE_EXTENSIONS):
+        # Returns [(path, sha1)] for files that are new or whose content changed
+        known = self._rows()
+        changed = []
+        touched = []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(extensions):
+                    continue
+                path = os.path.abspath(entry.path)
+                st = entry.stat()
+                row = known.get(path)
+                if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                    continue
+                sha1 = file_sha1(path)
+                if row and row[2] == sha1:
+                    # Touched but identical - just refresh the stat fields
+                    touched.append((st.st_size, st.st_mtime_ns, path))
+                    continue
+                changed.append((path, sha1))
+
+        if touched:
+            with self._lock:
+                self._conn.executemany("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", touched)
+                self._conn.commit()
+        return sorted(changed)
+
+    def needs_processing(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, sha1 FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        st = os.stat(path)
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return None
+        sha1 = file_sha1(path)
+        if row and row[2] == sha1:
+            return None
+        return sha1
+
+    def mark_done(self, path, sha1=None, status="ok", result_path=None, commit=True):
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+            sha1 = sha1 or file_sha1(path)
+        except OSError:
+            # Gone or unreadable since it was processed: still recorded, so a
+            # resumed run doesn't trip over it again, and never "unchanged"
+            size, mtime_ns, sha1 = -1, -1, sha1 or ""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha1, status, result_path, processed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, sha1, status, result_path, time.time()),
+            )
+            if commit:
+                self._conn.commit()
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def is_done(self, path):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM files WHERE path = ?", (os.path.abspath(path),)
+            ).fetchone()
+        return row is not None
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
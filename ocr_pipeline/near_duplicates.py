@@ -0,0 +1,243 @@
+import argparse
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from ocr_pipeline.manifest import IMAGE_EXTENSIONS
+from ocr_pipeline.preprocessing import to_gray
+from ocr_pipeline.results_store import get_store
+
+# -----------------------------
+# Near-duplicate uploads (perceptual hashing)
+# -----------------------------
+# Every image gets two 64-bit hashes from a 32x32 grayscale thumbnail:
+#
+#   pHash  low 8x8 DCT coefficients above / below their median (robust to
+#          recompression, resizing, brightness)
+#   dHash  sign of horizontal gradients on a 9x8 downsample (catches what
+#          pHash lets through when the layout differs)
+#
+# Hashes of processed images live next to their results in the results store
+# and in memory in a multi-index hash table: the 64 pHash bits are split into
+# four 16-bit words, each kept as a sorted array. Two hashes within Hamming
+# distance r agree to within r // 4 bits in at least one word, so a lookup
+# probes every word value that close (137 probes per table for r <= 11),
+# gathers the candidates with searchsorted and checks their full distance.
+# Memory is ~50 bytes per image, so millions of hashes fit comfortably.
+#
+#   python -m ocr_pipeline.near_duplicates scan images1 multiimage_extraction/images1
+PHASH_RADIUS = int(os.environ.get("NEAR_DUPLICATE_RADIUS", 8))
+DHASH_RADIUS = 12
+THUMB_SIZE = 32
+WORDS = 4                    # 16-bit words per 64-bit hash
+MERGE_MIN = 4096             # new hashes are searched linearly until merged
+
+POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+_n = np.arange(THUMB_SIZE)
+DCT = np.cos(np.pi * (2 * _n[None, :] + 1) * _n[:, None] / (2 * THUMB_SIZE))
+
+
+def _flip_masks(max_bits):
+    # Every 16-bit mask with at most max_bits bits set
+    masks = np.arange(1 << 16, dtype=np.uint32)
+    counts = POPCOUNT8[masks & 0xFF] + POPCOUNT8[masks >> 8]
+    return masks[counts <= max_bits].astype(np.uint16)
+
+
+# -----------------------------
+# Hashes
+# -----------------------------
+def thumbnail(image):
+    return cv2.resize(to_gray(image), (THUMB_SIZE, THUMB_SIZE), interpolation=cv2.INTER_AREA).astype(np.float64)
+
+
+def _pack(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def phash(thumb):
+    low = (DCT @ thumb @ DCT.T)[:8, :8].ravel()
+    return _pack(low > np.median(low[1:]))
+
+
+def dhash(thumb):
+    small = cv2.resize(thumb, (9, 8), interpolation=cv2.INTER_AREA)
+    return _pack(small[:, 1:] > small[:, :-1])
+
+
+def image_hashes(image):
+    thumb = thumbnail(image)
+    return phash(thumb), dhash(thumb)
+
+
+def hamming(a, b):
+    # a: uint64 array, b: uint64 scalar -> per-element bit distance
+    x = np.bitwise_xor(a, np.uint64(b))
+    return POPCOUNT8[x.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+# -----------------------------
+# Multi-index hash table
+# -----------------------------
+class HashIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ids = np.empty(0, dtype=np.int64)
+        self.phashes = np.empty(0, dtype=np.uint64)
+        self.dhashes = np.empty(0, dtype=np.uint64)
+        self._words = []         # per word: (sorted word values, positions into the arrays)
+        self._merged = 0         # entries covered by self._words
+        self._masks = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add_many(self, ids, phashes, dhashes):
+        with self._lock:
+            self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+            self.phashes = np.concatenate([self.phashes, np.asarray(phashes, dtype=np.uint64)])
+            self.dhashes = np.concatenate([self.dhashes, np.asarray(dhashes, dtype=np.uint64)])
+            if len(self.ids) - self._merged >= max(MERGE_MIN, self._merged // 8):
+                self._merge()
+
+    def add(self, item_id, p, d):
+        self.add_many([item_id], [p], [d])
+
+    def _merge(self):
+        self._words = []
+        for w in range(WORDS):
+            values = ((self.phashes >> np.uint64(16 * w)) & np.uint64(0xFFFF)).astype(np.uint16)
+            order = np.argsort(values, kind="stable").astype(np.uint32)
+            self._words.append((values[order], order))
+        self._merged = len(self.ids)
+
+    def _candidates(self, p, radius):
+        masks = self._masks.get(radius // WORDS)
+        if masks is None:
+            masks = self._masks[radius // WORDS] = _flip_masks(radius // WORDS)
+        found = [np.arange(self._merged, len(self.ids))]
+        for w, (values, order) in enumerate(self._words):
+            probes = np.uint16((p >> (16 * w)) & 0xFFFF) ^ masks
+            lo = np.searchsorted(values, probes, "left")
+            hi = np.searchsorted(values, probes, "right")
+            for a, b in zip(lo[hi > lo], hi[hi > lo]):
+                found.append(order[a:b])
+        return np.unique(np.concatenate(found))
+
+    def query(self, p, d=None, radius=PHASH_RADIUS, dhash_radius=DHASH_RADIUS):
+        # [(id, phash distance)], closest first
+        with self._lock:
+            candidates = self._candidates(p, radius)
+            if not len(candidates):
+                return []
+            distances = hamming(self.phashes[candidates], p)
+            keep = distances <= radius
+            if d is not None:
+                keep &= hamming(self.dhashes[candidates], d) <= dhash_radius
+            hits = sorted(zip(distances[keep].tolist(), self.ids[candidates[keep]].tolist()))
+        return [(item_id, distance) for distance, item_id in hits]
+
+
+# -----------------------------
+# Index over the results store
+# -----------------------------
+class DuplicateIndex:
+    # Results-store backed HashIndex per result source (an app only gets its
+    # own results back); picks up hashes added by other processes
+    def __init__(self, store):
+        self.store = store
+        self.indexes = {}
+        self._last_id = 0
+        self._sync_lock = threading.Lock()
+
+    def sync(self):
+        with self._sync_lock:
+            rows = self.store.hashes_since(self._last_id)
+            by_source = {}
+            for result_id, p, d, source in rows:
+                by_source.setdefault(source, []).append((result_id, _unsigned(p), _unsigned(d)))
+            for source, entries in by_source.items():
+                ids, p, d = zip(*entries)
+                self.indexes.setdefault(source, HashIndex()).add_many(ids, p, d)
+            if rows:
+                self._last_id = rows[-1][0]
+
+    def find(self, hashes, radius=PHASH_RADIUS, source=None):
+        # Closest stored result within radius: {"result_id", "distance"} or
+        # None. source: only results stored under it (None: any source)
+        self.sync()
+        indexes = list(self.indexes.values()) if source is None else [self.indexes.get(source)]
+        hits = sorted(
+            (distance, result_id)
+            for index in indexes if index is not None
+            for result_id, distance in index.query(*hashes, radius=radius)
+        )
+        if not hits:
+            return None
+        return {"result_id": hits[0][1], "distance": hits[0][0]}
+
+    def add(self, result_id, hashes):
+        self.store.add_hashes(result_id, _signed(hashes[0]), _signed(hashes[1]))
+
+
+def _signed(h):
+    # SQLite integers are signed 64-bit
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+
+def _unsigned(h):
+    return h + (1 << 64) if h < 0 else h
+
+
+_default_index = None
+_default_index_pid = None
+_default_index_lock = threading.Lock()
+
+
+def get_duplicate_index():
+    # Per process, like get_store(): the index holds the store's connection
+    global _default_index, _default_index_pid
+    with _default_index_lock:
+        if _default_index is None or _default_index_pid != os.getpid():
+            _default_index = DuplicateIndex(get_store())
+            _default_index_pid = os.getpid()
+    return _default_index
+
+
+# -----------------------------
+# Scan folders for near-duplicate groups
+# -----------------------------
+def scan(folders, radius=PHASH_RADIUS):
+    index = HashIndex()
+    paths, groups = [], {}
+    for folder in folders:
+        for root, _, files in os.walk(folder):
+            for name in sorted(files):
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                image = cv2.imread(path)
+                if image is None:
+                    continue
+                hashes = image_hashes(image)
+                hits = index.query(*hashes, radius=radius)
+                if hits:
+                    groups.setdefault(hits[0][0], [paths[hits[0][0]]]).append(path)
+                else:
+                    index.add(len(paths), *hashes)
+                paths.append(path)
+    return list(groups.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Near-duplicate image tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    scan_parser = sub.add_parser("scan", help="List groups of near-duplicate images")
+    scan_parser.add_argument("folders", nargs="+")
+    scan_parser.add_argument("--radius", type=int, default=PHASH_RADIUS)
+    args = parser.parse_args()
+
+    for group in scan(args.folders, args.radius):
+        print("\n  ".join(group))
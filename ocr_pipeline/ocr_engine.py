@@ -0,0 +1,164 @@
+import re
+import threading
+
+import cv2
+
+from ocr_pipeline.fields import FIELD_LABELS, NAME_VALUE, NOT_A_NAME
+
+# -----------------------------
+# Confidence-aware block OCR
+# -----------------------------
+# Blocks are read with image_to_data, which gives a confidence (0-100) per
+# word; lines and the block get the mean of their words. A block only gets a
+# second look when one of its lines looks like an ID number or a name (the
+# fields that decide type, side and the summary) *and* that line was read
+# below REOCR_THRESHOLD. Retries run cheapest first and stop once the weakest
+# such line clears the threshold; the read with the best weakest line wins.
+REOCR_THRESHOLD = 60
+REOCR_UPSCALE = 2.0
+REOCR_ATTEMPTS = ["upscale", "single_line", "easyocr"]
+
+ID_LIKE = re.compile(r"^(?=.*\d)[A-Z0-9 /-]{6,20}$")
+NAME_LIKE = re.compile(r"^[A-Za-z][A-Za-z .']{3,40}$")
+
+# Tesseract "-l" codes -> EasyOCR language codes; one EasyOCR reader (model
+# weights and all) is kept per language set
+LANG_OPTION = re.compile(r"(?:^|\s)-l\s+(\S+)")
+EASYOCR_LANGS = {"eng": "en", "hin": "hi"}
+
+_easyocr_readers = {}
+_easyocr_missing = False
+_easyocr_lock = threading.Lock()
+
+
+def read_block(roi, config="--psm 6"):
+    # Returns {"text", "conf", "lines": [{"text", "conf"}], "words": [{"text", "conf"}]}
+    import pytesseract  # imported on first OCR, not when the app starts (see engines.py)
+
+    data = pytesseract.image_to_data(roi, config=config, output_type=pytesseract.Output.DICT)
+    lines = {}
+    words = []
+    for i, word in enumerate(data["text"]):
+        conf = float(data["conf"][i])
+        if not word.strip() or conf < 0:
+            continue
+        words.append({"text": word, "conf": conf})
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append((word, conf))
+
+    line_list = [
+        {"text": " ".join(w for w, _ in ws), "conf": round(sum(c for _, c in ws) / len(ws), 1)}
+        for _, ws in sorted(lines.items())
+    ]
+    return {
+        "text": "\n".join(line["text"] for line in line_list),
+        "conf": round(sum(w["conf"] for w in words) / len(words), 1) if words else 0.0,
+        "lines": line_list,
+        "words": words,
+    }
+
+
+def is_name_label(text):
+    upper = text.upper()
+    return bool(FIELD_LABELS["name"].search(upper) or FIELD_LABELS["father_name"].search(upper))
+
+
+def is_reocr_target(text, after_label=False):
+    # ID numbers (PAN, Aadhaar, DL, EPIC, passport) and name lines: a line with
+    # a name label, a name-like line right after one, or an all-caps value of
+    # two or more words that isn't header vocabulary ("INCOME TAX DEPARTMENT")
+    line = text.strip()
+    if ID_LIKE.match(line.upper()) or is_name_label(line):
+        return True
+    if after_label and NAME_LIKE.match(line):
+        return True
+    return bool(NAME_VALUE.match(line) and len(line.split()) >= 2 and not NOT_A_NAME.search(line))
+
+
+def weakest_target_conf(result, after_label=False):
+    # Lowest confidence among the ID/name lines of a read, None if it has none.
+    # after_label: the line before this block was a name label
+    confs = []
+    for line in result["lines"]:
+        if is_reocr_target(line["text"], after_label):
+            confs.append(line["conf"])
+        after_label = is_name_label(line["text"])
+    return min(confs) if confs else None
+
+
+def config_languages(config):
+    # Tesseract languages named in a config string ("--psm 6 -l eng+hin"), eng by default
+    match = LANG_OPTION.search(config or "")
+    return tuple(match.group(1).split("+")) if match else ("eng",)
+
+
+def easyocr_languages(config):
+    return tuple(sorted({EASYOCR_LANGS[lang] for lang in config_languages(config) if lang in EASYOCR_LANGS})) or ("en",)
+
+
+def get_easyocr_reader(languages=("en",)):
+    # Second engine for weak blocks, if installed. easyocr pulls in torch
+    # (seconds to import), so nothing touches it until a block needs it.
+    global _easyocr_missing
+    if _easyocr_missing:
+        return None
+    languages = tuple(languages)
+    with _easyocr_lock:
+        if languages not in _easyocr_readers and not _easyocr_missing:
+            try:
+                import easyocr
+            except ImportError:
+                _easyocr_missing = True
+                return None
+            _easyocr_readers[languages] = easyocr.Reader(list(languages), gpu=False)
+    return _easyocr_readers.get(languages)
+
+
+def read_block_easyocr(roi, config=None):
+    # Only the -l part of a Tesseract config is used, to pick the reader
+    reader = get_easyocr_reader(easyocr_languages(config))
+    if reader is None:
+        return None
+    results = reader.readtext(roi)
+    if not results:
+        return None
+    lines = [{"text": text, "conf": round(conf * 100, 1)} for _, text, conf in results]
+    return {
+        "text": "\n".join(line["text"] for line in lines),
+        "conf": round(sum(line["conf"] for line in lines) / len(lines), 1),
+        "lines": lines,
+        "words": [{"text": w, "conf": line["conf"]} for line in lines for w in line["text"].split()],
+    }
+
+
+def reocr_attempt(method, roi, config):
+    if method == "upscale":
+        big = cv2.resize(roi, None, fx=REOCR_UPSCALE, fy=REOCR_UPSCALE, interpolation=cv2.INTER_CUBIC)
+        return read_block(big, config)
+    if method == "single_line":
+        # Same languages as the first pass, one line
+        return read_block(roi, "--psm 7 -l " + "+".join(config_languages(config)))
+    if method == "easyocr":
+        return read_block_easyocr(roi, config)
+    raise ValueError(f"Unknown re-OCR method: {method}")
+
+
+def ocr_block(roi, config="--psm 6", reocr=True, threshold=REOCR_THRESHOLD, attempts=REOCR_ATTEMPTS,
+              after_label=False):
+    # First pass, then re-OCR only weak ID/name lines; result["reocr"] names the winning retry
+    best = read_block(roi, config)
+    best["reocr"] = None
+    weakest = weakest_target_conf(best, after_label)
+    if not reocr or weakest is None or weakest >= threshold:
+        return best
+
+    for method in attempts:
+        result = reocr_attempt(method, roi, config)
+        if result is None or not result["text"]:
+            continue
+        candidate = weakest_target_conf(result, after_label)
+        if candidate is not None and candidate > weakest:
+            best, weakest = dict(result, reocr=method), candidate
+        if weakest >= threshold:
+            break
+    return best
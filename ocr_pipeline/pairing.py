@@ -0,0 +1,191 @@
+# Front/back pairing across a batch of process_document results.
+#
+#   python -m ocr_pipeline.pairing fuzzy_front_back/outputs [more dirs/files] --out pairs.json
+#
+# Every result is indexed under a few cheap blocking keys (ID number, Aadhaar
+# last-4, DOB, name initials). Only fronts and backs that share a key are
+# scored with rapidfuzz, so the work grows with the batch size instead of
+# with its square. Pairs are then picked greedily by score.
+import argparse
+import json
+import os
+import re
+from collections import defaultdict
+
+from rapidfuzz import fuzz
+
+PAIR_THRESHOLD = 60        # minimum score for a front/back pair
+NAME_MATCH = 70            # name ratio that identifies a pair when there are no ID numbers
+MAX_BLOCK_SIZE = 500       # skip keys shared by too many results (e.g. a common DOB)
+
+NUMBER_PATTERNS = {
+    "PAN Card": re.compile(r"\b([A-Z]{5}[0-9]{4}[A-Z])\b"),
+    "Aadhaar Card": re.compile(r"\b(\d{4}\s?\d{4}\s?\d{4})\b"),
+    "Voter ID Card": re.compile(r"\b([A-Z]{3}[0-9]{7})\b"),
+    "Passport": re.compile(r"\b([A-Z][0-9]{7})\b"),
+    "Driving License": re.compile(r"\b([A-Z]{2}\d{2}[0-9A-Z]{11,})\b"),
+}
+DOB_PATTERN = re.compile(r"\d{2}[-/]\d{2}[-/]\d{4}")
+
+
+# -----------------------------
+# Loading results
+# -----------------------------
+def load_results(paths):
+    results = []
+    for path in paths:
+        files = [path]
+        if os.path.isdir(path):
+            files = [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith(".json")]
+        for file_path in files:
+            with open(file_path, encoding="utf-8") as f:
+                data = json.load(f)
+            # Accept single results, lists, and the /process-all {"results": [...]} shape
+            if isinstance(data, dict) and "results" in data:
+                data = data["results"]
+            results.extend(data if isinstance(data, list) else [data])
+    return [r for r in results if r.get("document_type") and not r.get("error")]
+
+
+# -----------------------------
+# Normalised fields
+# -----------------------------
+def normalize_name(name):
+    if not name:
+        return ""
+    return " ".join(re.sub(r"[^A-Z ]", " ", name.upper()).split())
+
+
+def record_fields(result):
+    summary = result.get("cleaned_summary") or {}
+    doc_type = result.get("document_type")
+    text = " ".join([summary.get("Number") or ""] + result.get("raw_detected_text", []))
+
+    number = None
+    pattern = NUMBER_PATTERNS.get(doc_type)
+    if pattern:
+        match = pattern.search(text.upper())
+        if match:
+            number = match.group(1).replace(" ", "")
+
+    dob = summary.get("DOB")
+    if not dob:
+        dob_match = DOB_PATTERN.search(text)
+        dob = dob_match.group() if dob_match else None
+
+    return {
+        "filename": result.get("filename"),
+        "document_type": doc_type,
+        "side": result.get("side") or result.get("document_side"),
+        "name": normalize_name(summary.get("Name")),
+        "father": normalize_name(summary.get("Father’s Name") or summary.get("Father's Name")),
+        "dob": dob.replace("-", "/") if dob else None,
+        "number": number,
+    }
+
+
+def blocking_keys(rec):
+    doc = rec["document_type"]
+    keys = []
+    if rec["number"]:
+        keys.append((doc, "num", rec["number"]))
+        if doc == "Aadhaar Card":
+            keys.append((doc, "last4", rec["number"][-4:]))
+    if rec["dob"]:
+        keys.append((doc, "dob", rec["dob"]))
+    if rec["name"]:
+        parts = rec["name"].split()
+        keys.append((doc, "initials", parts[0][:3] + parts[-1][:1]))
+    return keys
+
+
+# -----------------------------
+# Scoring
+# -----------------------------
+def pair_score(front, back):
+    if front["number"] and back["number"]:
+        if front["number"] == back["number"]:
+            return 100.0
+        if front["document_type"] != "Aadhaar Card" or front["number"][-4:] != back["number"][-4:]:
+            return 0.0
+
+    score, weight = 0.0, 0.0
+    identified = False
+    if front["number"] and back["number"]:
+        # Same Aadhaar last-4 but a digit misread elsewhere
+        score += 90 * 2
+        weight += 2
+        identified = True
+    if front["name"] and back["name"]:
+        name_ratio = fuzz.token_sort_ratio(front["name"], back["name"])
+        score += name_ratio * 2
+        weight += 2
+        identified = identified or name_ratio >= NAME_MATCH
+    if front["father"] and back["father"]:
+        score += fuzz.token_sort_ratio(front["father"], back["father"])
+        weight += 1
+    if front["dob"] and back["dob"]:
+        score += 100 if front["dob"] == back["dob"] else 0
+        weight += 1
+    # DOB and father's name only corroborate: on their own, two people born on
+    # the same day (DOB is also a blocking key) would pair at full score
+    if not identified:
+        return 0.0
+    return score / weight
+
+
+def pair_sides(results, threshold=PAIR_THRESHOLD):
+    records = [record_fields(r) for r in results]
+
+    index = defaultdict(lambda: ([], []))
+    for i, rec in enumerate(records):
+        if rec["side"] not in ("Front", "Back"):
+            continue
+        for key in blocking_keys(rec):
+            index[key][0 if rec["side"] == "Front" else 1].append(i)
+
+    candidates = {}
+    for fronts, backs in index.values():
+        if not fronts or not backs or len(fronts) + len(backs) > MAX_BLOCK_SIZE:
+            continue
+        for f in fronts:
+            for b in backs:
+                if (f, b) not in candidates:
+                    candidates[(f, b)] = pair_score(records[f], records[b])
+
+    used = set()
+    persons = []
+    for (f, b), score in sorted(candidates.items(), key=lambda kv: kv[1], reverse=True):
+        if score < threshold or f in used or b in used:
+            continue
+        used.update((f, b))
+        front, back = records[f], records[b]
+        persons.append({
+            "document_type": front["document_type"],
+            "name": front["name"] or back["name"] or None,
+            "father_name": front["father"] or back["father"] or None,
+            "dob": front["dob"] or back["dob"],
+            "number": front["number"] or back["number"],
+            "front": front["filename"],
+            "back": back["filename"],
+            "score": round(score, 1),
+        })
+
+    unpaired = [records[i]["filename"] for i in range(len(records)) if i not in used]
+    return {"pairs": persons, "unpaired": unpaired, "candidates_scored": len(candidates)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pair front/back results of the same document")
+    parser.add_argument("paths", nargs="+", help="Result JSON files or directories of them")
+    parser.add_argument("--threshold", type=float, default=PAIR_THRESHOLD)
+    parser.add_argument("--out", help="Write merged records here instead of stdout")
+    args = parser.parse_args()
+
+    merged = pair_sides(load_results(args.paths), args.threshold)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(merged, f, indent=4, ensure_ascii=False)
+        print(f"{len(merged['pairs'])} pairs, {len(merged['unpaired'])} unpaired -> {args.out}")
+    else:
+        print(json.dumps(merged, indent=4, ensure_ascii=False))
@@ -0,0 +1,241 @@
+import argparse
+import json
+import re
+import sys
+
+import cv2
+import numpy as np
+
+from ocr_pipeline.preprocessing import preprocess
+
+# -----------------------------
+# Bank passbook transaction tables
+# -----------------------------
+# Ruling lines are found with a morphological opening of the threshold image
+# (long horizontal / vertical kernels). Passbooks printed without column
+# rules get their columns from white gaps in the vertical ink projection,
+# and rows come from blank bands when there are no row rules. Each cell is
+# OCR'd with its column's Tesseract config (digit whitelists for dates and
+# amounts) and rows are yielded as soon as they are read, as typed records:
+#
+#   {"date", "narration", "debit", "credit", "balance", "page", "row", "balance_ok"}
+#
+# balance_ok checks previous balance + credit - debit == balance, carried
+# across pages, so a misread amount is flagged on the row where it happened.
+#
+#   python -m ocr_pipeline.passbook page1.jpg page2.jpg [--out rows.jsonl]
+HLINE_FRACTION = 3       # a row rule spans at least 1/3 of the page width
+VLINE_FRACTION = 4       # a column rule spans at least 1/4 of the table height
+MIN_COLUMN_GAP = 12      # px of blank space that separates unruled columns
+MIN_CELL_INK = 15        # fewer text pixels than this -> empty cell
+BALANCE_TOLERANCE = 0.01
+
+AMOUNT_CONFIG = "--psm 7 -c tessedit_char_whitelist=0123456789.,"
+COLUMN_CONFIG = {
+    "date": "--psm 7 -c tessedit_char_whitelist=0123456789/-.",
+    "debit": AMOUNT_CONFIG,
+    "credit": AMOUNT_CONFIG,
+    "balance": "--psm 7 -c tessedit_char_whitelist=0123456789.,CRDcrd",
+    "narration": "--psm 7",
+    "cheque": "--psm 7",
+}
+
+ROLE_KEYWORDS = {
+    "date": ["DATE"],
+    "narration": ["PARTICULARS", "NARRATION", "DESCRIPTION", "DETAILS", "REMARKS"],
+    "cheque": ["CHQ", "CHEQUE", "REF"],
+    "debit": ["WITHDRAWAL", "DEBIT", "DR"],
+    "credit": ["DEPOSIT", "CREDIT", "CR"],
+    "balance": ["BALANCE", "BAL"],
+}
+
+DATE_VALUE = re.compile(r"\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}")
+AMOUNT_VALUE = re.compile(r"\d+(?:\.\d{1,2})?")
+
+
+# -----------------------------
+# Table geometry
+# -----------------------------
+def _runs(mask):
+    # Start/end of every run of True values in a 1D mask
+    padded = np.concatenate([[False], mask, [False]])
+    edges = np.flatnonzero(padded[1:] != padded[:-1]).tolist()
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def ruling_mask(binary, axis):
+    # Rows (axis=0) or columns (axis=1) of a text-white binary crossed by a rule
+    h, w = binary.shape
+    if axis == 0:
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(w // HLINE_FRACTION, 10), 1))
+    else:
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(h // VLINE_FRACTION, 10)))
+    return cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel).any(axis=1 - axis)
+
+
+def ruling_lines(binary, axis):
+    # Centres of horizontal (axis=0) or vertical (axis=1) rules
+    return [(a + b) // 2 for a, b in _runs(ruling_mask(binary, axis))]
+
+
+def text_bands(binary, axis, min_gap=1):
+    # Ink runs along an axis, merging runs separated by less than min_gap
+    runs = _runs(binary.any(axis=1 - axis))
+    merged = []
+    for a, b in runs:
+        if merged and a - merged[-1][1] < min_gap:
+            merged[-1] = (merged[-1][0], b)
+        else:
+            merged.append((a, b))
+    return merged
+
+
+def table_grid(binary):
+    # Returns row bands [(y0, y1)] and column bands [(x0, x1)]
+    h, w = binary.shape
+    rules = ruling_lines(binary, 0)
+    top, bottom = (rules[0], rules[-1]) if len(rules) >= 2 else (0, h)
+    region = binary[top:bottom]
+
+    # Blank the rules themselves before looking at text
+    text = region.copy()
+    text[ruling_mask(binary, 0)[top:bottom]] = 0
+
+    v_rules = ruling_lines(region, 1) if len(region) else []
+    if len(v_rules) >= 3:
+        columns = list(zip(v_rules[:-1], v_rules[1:]))
+    else:
+        columns = text_bands(text, 1, MIN_COLUMN_GAP)
+
+    if len(rules) >= 3:
+        rows = [(a - top, b - top) for a, b in zip(rules[:-1], rules[1:])]
+    else:
+        rows = text_bands(text, 0)
+    rows = [(a + top, b + top) for a, b in rows if b - a > 4]
+    return rows, columns
+
+
+# -----------------------------
+# Cells and rows
+# -----------------------------
+def column_roles(header_cells, n_columns):
+    roles = [None] * n_columns
+    for i, text in enumerate(header_cells):
+        upper = text.upper()
+        for role, keywords in ROLE_KEYWORDS.items():
+            if role not in roles and any(k in upper for k in keywords):
+                roles[i] = role
+                break
+    if sum(r is not None for r in roles) >= 2:
+        return roles
+
+    # No readable header: date first, amounts last, narration in between
+    roles = ["narration"] * n_columns
+    if n_columns >= 5:
+        roles[0] = "date"
+        roles[-3:] = ["debit", "credit", "balance"]
+    return roles
+
+
+def parse_amount(text):
+    text = text.replace(",", "").strip()
+    match = AMOUNT_VALUE.search(text)
+    if not match:
+        return None
+    value = round(float(match.group()), 2)
+    return -value if text.upper().endswith("DR") else value
+
+
+def read_cell(gray, box, role):
+    x0, y0, x1, y1 = box
+    cell = gray[y0:y1, x0:x1]
+    if cell.size == 0:
+        return ""
+    ink = cv2.threshold(cell, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    if cv2.countNonZero(ink) < MIN_CELL_INK:
+        return ""
+    import pytesseract  # lazy, like ocr_engine.read_block
+
+    return pytesseract.image_to_string(cell, config=COLUMN_CONFIG.get(role, "--psm 7")).strip()
+
+
+def typed_row(cells):
+    date = DATE_VALUE.search(cells.get("date", ""))
+    return {
+        "date": date.group() if date else None,
+        "narration": " ".join(cells.get(k, "") for k in ("narration", "cheque")).strip() or None,
+        "debit": parse_amount(cells.get("debit", "")),
+        "credit": parse_amount(cells.get("credit", "")),
+        "balance": parse_amount(cells.get("balance", "")),
+    }
+
+
+def iter_rows(image, binary=None, scale=1.0, page=1, state=None):
+    # Yields typed rows of one page. state carries the running balance and
+    # row counter between pages; binary/scale is the pipeline's threshold image
+    state = state if state is not None else {"balance": None, "row": 0}
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    if binary is None:
+        prep = preprocess(image, "fast")
+        binary, scale = prep["binary"], prep["scale"]
+
+    rows, columns = table_grid(binary)
+    if len(columns) < 3:
+        return
+    to_image = lambda v: int(round(v / scale))
+    pad = 2
+
+    roles = None
+    for y0, y1 in rows:
+        def box(c):
+            return (to_image(c[0]) + pad, to_image(y0) + pad, to_image(c[1]) - pad, to_image(y1) - pad)
+
+        if roles is None:
+            header = [read_cell(gray, box(c), "narration") for c in columns]
+            roles = column_roles(header, len(columns))
+            if any(any(k in h.upper() for ks in ROLE_KEYWORDS.values() for k in ks) for h in header):
+                continue
+
+        cells = {}
+        for column, role in zip(columns, roles):
+            text = read_cell(gray, box(column), role)
+            cells[role] = f"{cells[role]} {text}".strip() if role in cells else text
+        row = typed_row(cells)
+        if row["date"] is None and row["debit"] is None and row["credit"] is None and row["balance"] is None:
+            continue
+
+        balance_ok = None
+        if state["balance"] is not None and row["balance"] is not None:
+            expected = state["balance"] + (row["credit"] or 0) - (row["debit"] or 0)
+            balance_ok = abs(expected - row["balance"]) <= BALANCE_TOLERANCE
+        if row["balance"] is not None:
+            state["balance"] = row["balance"]
+        state["row"] += 1
+        yield dict(row, page=page, row=state["row"], balance_ok=balance_ok)
+
+
+def iter_pages(paths):
+    # Multi-page passbooks: one page in memory at a time, balance carried over
+    state = {"balance": None, "row": 0}
+    for page, path in enumerate(paths, start=1):
+        image = cv2.imread(path)
+        if image is None:
+            raise ValueError(f"Could not read image: {path}")
+        yield from iter_rows(image, page=page, state=state)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream passbook transactions as JSON lines")
+    parser.add_argument("pages", nargs="+")
+    parser.add_argument("--out", help="JSONL output file (default: stdout)")
+    args = parser.parse_args()
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    mismatches = 0
+    for row in iter_pages(args.pages):
+        mismatches += row["balance_ok"] is False
+        out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        out.flush()
+    if args.out:
+        out.close()
+    print(f"{mismatches} balance mismatches", file=sys.stderr)
@@ -0,0 +1,160 @@
+import functools
+import inspect
+import os
+import time
+
+from ocr_pipeline import profiling
+from ocr_pipeline.artifacts import artifact_from_ctx, artifact_key, restore_artifact
+from ocr_pipeline.manifest import file_sha1
+
+# -----------------------------
+# Composable document pipeline
+# -----------------------------
+# A pipeline is an ordered list of named stages. Every stage is a function
+# stage(ctx, **config) that reads and writes keys on a shared context dict:
+#
+#   ingest     -> ctx["image"]
+#   dedupe     -> ctx["image_hashes"], ctx["near_duplicate"] (optional stage)
+#   preprocess -> ctx["prep"]
+#   segment    -> ctx["regions"] (N x 5 array, see regions.py), ctx["boxes"]
+#   layout     -> ctx["line_regions"], ctx["line_members"]; ctx["boxes"] become
+#                 whole line segments when OCR'ing by line
+#   script     -> ctx["scripts"] (latin / devanagari / mixed / none per box),
+#                 ctx["skipped_boxes"] (Hindi-only boxes dropped, if asked to)
+#   ocr        -> ctx["blocks"], ctx["block_boxes"]
+#   classify   -> ctx["doc_type"], ctx["scores"], ctx["side"]
+#   extract    -> ctx["fields"], ctx["summary"], ctx["output_data"]
+#   table      -> ctx["transactions"] (passbook pages only)
+#   persist    -> writes files / stores, may add keys to ctx["output_data"]
+#
+# Stages are timed into ctx["timings"] (ms) and can emit progress events
+# through ctx["emit"](event, data). A stage that sets ctx["done"] (with
+# ctx["output_data"] filled in) ends the run early.
+#
+# With an ArtifactCache attached, the output of everything up to and
+# including "ocr" is looked up by image sha1 + those stages' config, and the
+# cached stages are skipped on a hit (ctx["cache_hit"] is True). The config
+# is the effective one: the stage function's defaults (several come from env
+# vars) under its explicit config, plus whatever else its output depends on,
+# returned by an optional stage.artifact_inputs() (e.g. installed models).
+#
+# While a request is being profiled (ocr_pipeline.profiling), each run
+# reports its image size, contour count and timings to the profile and the
+# result gets a "profile" reference before it is persisted.
+STAGE_ORDER = ["ingest", "dedupe", "preprocess", "segment", "layout", "script", "ocr", "classify", "extract",
+               "table", "persist"]
+CACHEABLE_STAGES = ("ingest", "preprocess", "segment", "layout", "script", "ocr")
+
+
+class PipelineError(Exception):
+    pass
+
+
+class PipelineCancelled(PipelineError):
+    # Raised from a run's emit callback when nobody wants the result any more
+    pass
+
+
+def _no_emit(event, data):
+    pass
+
+
+def stage_config(func):
+    # func: the partial a Pipeline holds
+    defaults = {
+        name: param.default for name, param in inspect.signature(func.func).parameters.items()
+        if param.default is not inspect.Parameter.empty
+    }
+    config = dict(defaults, **func.keywords, func=f"{func.func.__module__}.{func.func.__name__}")
+    inputs = getattr(func.func, "artifact_inputs", None)
+    if inputs is not None:
+        config["inputs"] = inputs()
+    return config
+
+
+class Pipeline:
+    def __init__(self, stages, cache=None):
+        # stages: list of (name, func) or (name, func, config_dict)
+        # cache: an ArtifactCache, or a function returning one (or None) at run time
+        self.cache = cache
+        self.stages = []
+        for stage in stages:
+            name, func = stage[0], stage[1]
+            config = stage[2] if len(stage) > 2 else {}
+            self.stages.append((name, functools.partial(func, **config)))
+
+    def names(self):
+        return [name for name, _ in self.stages]
+
+    def replace(self, name, func, **config):
+        # Returns a copy with one stage swapped, e.g. pipeline.replace("persist", no_persist)
+        stages = [(n, func, config) if n == name else (n, f) for n, f in self.stages]
+        if name not in self.names():
+            raise KeyError(f"No stage named {name}")
+        return Pipeline(stages, cache=self.cache)
+
+    def without(self, *names):
+        return Pipeline([(n, f) for n, f in self.stages if n not in names], cache=self.cache)
+
+    def with_cache(self, cache):
+        return Pipeline(list(self.stages), cache=cache)
+
+    def stage_configs(self, names=CACHEABLE_STAGES):
+        return {name: stage_config(func) for name, func in self.stages if name in names}
+
+    def _resolve_cache(self):
+        return self.cache() if callable(self.cache) else self.cache
+
+    def _artifact_key(self, ctx, cache, only):
+        if cache is None or only is not None or "ocr" not in self.names():
+            return None
+        image_path = ctx.get("image_path")
+        if not image_path or not os.path.isfile(image_path):
+            return None
+        return artifact_key(ctx.get("sha1") or file_sha1(image_path), self.stage_configs())
+
+    def run_ctx(self, ctx, only=None):
+        ctx.setdefault("timings", {})
+        ctx.setdefault("emit", _no_emit)
+        ctx["cache_hit"] = False
+        ctx["done"] = False
+
+        cache = self._resolve_cache()
+        key = self._artifact_key(ctx, cache, only)
+        if key is not None:
+            start = time.perf_counter()
+            artifact = cache.get(key)
+            if artifact is not None:
+                restore_artifact(ctx, artifact)
+                ctx["cache_hit"] = True
+            ctx["timings"]["artifact_cache"] = round((time.perf_counter() - start) * 1000, 2)
+
+        for name, func in self.stages:
+            if only is not None and name not in only:
+                continue
+            if ctx["cache_hit"] and name in CACHEABLE_STAGES:
+                continue
+            if name == "persist":
+                profiling.note(ctx)
+            start = time.perf_counter()
+            func(ctx)
+            ctx["timings"][name] = round((time.perf_counter() - start) * 1000, 2)
+            if name == "ocr" and key is not None:
+                cache.put(key, artifact_from_ctx(ctx))
+            if ctx.get("done"):
+                break
+        profiling.note(ctx)
+        return ctx
+
+    def run(self, image_path, emit=None, **extra):
+        ctx = {"image_path": image_path, "emit": emit or _no_emit}
+        ctx.update(extra)
+        self.run_ctx(ctx)
+        return ctx["output_data"]
+
+    def run_image(self, image, only=("preprocess", "segment", "layout", "script", "ocr", "classify", "extract",
+                                     "table"), **extra):
+        # Run on an in-memory image (e.g. one card cropped from a page)
+        ctx = {"image": image, "image_path": None}
+        ctx.update(extra)
+        return self.run_ctx(ctx, only=only)
@@ -0,0 +1,151 @@
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# -----------------------------
+# Preprocessing profiles
+# -----------------------------
+# "fast"     -> global Otsu + dilate, the path process_document has always used
+# "balanced" -> light resize + median blur + adaptive threshold
+# "heavy"    -> resize to 1024 + fastNlMeansDenoising(h=30) + adaptive threshold,
+#               the path ocr_accuracy/app.py uses. Only worth it on noisy scans.
+PROFILES = {
+    "fast": {"max_dim": None, "denoise": None, "threshold": "otsu"},
+    "balanced": {"max_dim": 1600, "denoise": "median", "threshold": "adaptive"},
+    "heavy": {"max_dim": 1024, "denoise": "nlmeans", "threshold": "adaptive"},
+}
+DEFAULT_PROFILE = "fast"
+
+# Auto-selection thresholds (noise is an estimated sigma in grey levels,
+# contrast is the standard deviation of the grey image)
+NOISE_HEAVY = 8.0
+NOISE_FAST = 3.0
+CONTRAST_FAST = 50.0
+STATS_MAX_DIM = 512
+
+# Chosen profile per image, keyed by image_cache_key()
+PROFILE_CACHE_SIZE = 4096
+_profile_cache = OrderedDict()
+_profile_cache_lock = threading.Lock()
+
+_NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
+
+def image_cache_key(image_path):
+    # Path + size + mtime is enough to notice a replaced file without hashing it
+    st = os.stat(image_path)
+    return (os.path.abspath(image_path), st.st_size, st.st_mtime_ns)
+
+
+def to_gray(image):
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def resize_max_dim(image, max_dim):
+    h, w = image.shape[:2]
+    if not max_dim or max(h, w) <= max_dim:
+        return image, 1.0
+    scale = max_dim / max(h, w)
+    resized = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    return resized, scale
+
+
+# -----------------------------
+# Cheap image statistics
+# -----------------------------
+def image_stats(image):
+    # Stats are computed on a small thumbnail so they cost ~1 ms per image
+    gray, _ = resize_max_dim(to_gray(image), STATS_MAX_DIM)
+    h, w = gray.shape[:2]
+
+    # Immerkaer fast noise variance estimate
+    response = cv2.filter2D(gray.astype(np.float32), -1, _NOISE_KERNEL)
+    interior = np.abs(response[1:-1, 1:-1])
+    noise = float(np.sqrt(np.pi / 2.0) * interior.sum() / (6.0 * max(w - 2, 1) * max(h - 2, 1)))
+
+    contrast = float(gray.std())
+    p5, p95 = np.percentile(gray, [5, 95])
+    return {
+        "noise": round(noise, 2),
+        "contrast": round(contrast, 2),
+        "dynamic_range": float(p95 - p5),
+    }
+
+
+def choose_profile(stats):
+    if stats["noise"] >= NOISE_HEAVY:
+        return "heavy"
+    if stats["noise"] <= NOISE_FAST and stats["contrast"] >= CONTRAST_FAST:
+        return "fast"
+    return "balanced"
+
+
+def select_profile(image, cache_key=None):
+    if cache_key is not None:
+        with _profile_cache_lock:
+            if cache_key in _profile_cache:
+                _profile_cache.move_to_end(cache_key)
+                return _profile_cache[cache_key], None
+
+    stats = image_stats(image)
+    profile = choose_profile(stats)
+
+    if cache_key is not None:
+        with _profile_cache_lock:
+            _profile_cache[cache_key] = profile
+            if len(_profile_cache) > PROFILE_CACHE_SIZE:
+                _profile_cache.popitem(last=False)
+    return profile, stats
+
+
+# -----------------------------
+# Apply a profile
+# -----------------------------
+def preprocess(image, profile="auto", cache_key=None):
+    stats = None
+    if profile == "auto":
+        profile, stats = select_profile(image, cache_key)
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown preprocessing profile: {profile}")
+    settings = PROFILES[profile]
+
+    gray = to_gray(image)
+    gray, scale = resize_max_dim(gray, settings["max_dim"])
+
+    if settings["denoise"] == "median":
+        gray = cv2.medianBlur(gray, 3)
+    elif settings["denoise"] == "nlmeans":
+        gray = cv2.fastNlMeansDenoising(gray, h=30)
+
+    # binary always has text white on black, ready for findContours
+    if settings["threshold"] == "otsu":
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    else:
+        binary = cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 31, 2
+        )
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+    dilated = cv2.dilate(binary, kernel, iterations=2)
+
+    return {
+        "profile": profile,
+        "stats": stats,
+        "scale": scale,
+        "gray": gray,
+        "binary": binary,
+        "dilated": dilated,
+    }
+
+
+def scale_box(box, scale):
+    # Map an (x, y, w, h) box found on the preprocessed image back to the original
+    if scale == 1.0:
+        return box
+    x, y, w, h = box
+    return (int(x / scale), int(y / scale), int(round(w / scale)), int(round(h / scale)))
@@ -0,0 +1,510 @@
+import argparse
+import cProfile
+import functools
+import hmac
+import itertools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import Response, abort, g, jsonify, request, send_file
+
+from ocr_pipeline.storage import FileStore, env_quota
+
+# -----------------------------
+# Per-request profiling
+# -----------------------------
+# Off unless PROFILING=on. Then a request opts in with
+#
+#   X-Profile: cprofile | sample       (header)
+#   ?profile=cprofile | sample         (query)
+#
+# plus the PROFILE_TOKEN secret (X-Profile-Token header or ?profile_token=).
+# The same token is needed for the /profiles routes, which show request paths
+# and uploaded file names. Without a token set, nobody can trigger a profile
+# or read one over HTTP.
+#
+# PROFILE_SAMPLE_EVERY=N (with PROFILING=on) also profiles every Nth request
+# per worker with PROFILE_SAMPLE_MODE (default "sample"), no token involved.
+# "cprofile" is deterministic (every
+# call, ~2x slower); "sample" walks the request thread's stack every
+# PROFILE_INTERVAL_MS from a background thread, which costs little enough to
+# leave on in production.
+#
+# Work the request hands to other threads (the SSE pipeline thread, the
+# multi-document pool) is covered when it is submitted through propagate():
+# the worker runs under the request's session, so its documents are noted
+# and, in "sample" mode, its stack is sampled too. cProfile only ever sees
+# the request thread.
+#
+# The profile covers the whole request, streamed bodies included, and is
+# saved under PROFILE_DIR along with what the pipeline saw for each document
+# (image size, contour and block counts, stage timings). Results carry
+# {"profile": {"id", "url"}} and the response an X-Profile-Id header.
+#
+#   GET /profiles                              recent profiles
+#   GET /profiles/<id>                         summary + documents + hottest frames
+#   GET /profiles/<id>?format=speedscope       open in https://www.speedscope.app
+#   GET /profiles/<id>?format=collapsed        flamegraph.pl / inferno input
+#   GET /profiles/<id>?format=pstats           raw cProfile stats (snakeviz)
+#
+#   python -m ocr_pipeline.profiling run scan.jpg --mode cprofile -o scan.speedscope.json
+#   python -m ocr_pipeline.profiling export <id> --format collapsed
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(ROOT, "profiles"))
+PROFILING = os.environ.get("PROFILING", "off") == "on"
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+SAMPLE_EVERY = int(os.environ.get("PROFILE_SAMPLE_EVERY", 0))          # 0 = only on request
+SAMPLE_MODE = os.environ.get("PROFILE_SAMPLE_MODE", "sample")
+INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", 5)) / 1000
+MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", 300))        # sampler gives up after this
+MODES = ("cprofile", "sample")
+EXPORT_FORMATS = ("speedscope", "collapsed", "pstats")
+SKIP_ENDPOINTS = {None, "static", "hashed_image", "profiles", "profile"}
+TOP_FRAMES = 25
+MAX_DEPTH = 128
+MIN_WEIGHT = 1e-6                      # seconds; cProfile call paths below this are dropped
+
+_local = threading.local()
+_request_count = itertools.count(1)
+# cProfile (sys.monitoring on 3.12+) allows one active profiler per process
+_cprofile_lock = threading.Lock()
+
+
+def current():
+    return getattr(_local, "session", None)
+
+
+def frame_key(code):
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+# -----------------------------
+# Samplers
+# -----------------------------
+class StackSampler:
+    # Wall-clock sampling of a thread, plus any worker threads added while it
+    # runs: {stack (root first): seconds}, summed over the threads
+    def __init__(self, thread_id, interval=INTERVAL, max_seconds=MAX_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks = Counter()
+        self._workers = Counter()           # thread id -> sessions entered (a pool thread can nest)
+        self._workers_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def add_thread(self, thread_id):
+        with self._workers_lock:
+            self._workers[thread_id] += 1
+
+    def remove_thread(self, thread_id):
+        with self._workers_lock:
+            self._workers[thread_id] -= 1
+            if self._workers[thread_id] <= 0:
+                del self._workers[thread_id]
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        started = last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            frames = sys._current_frames()
+            if self.thread_id not in frames or now - started > self.max_seconds:
+                break
+            with self._workers_lock:
+                thread_ids = [self.thread_id, *(t for t in self._workers if t != self.thread_id)]
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(frame_key(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[tuple(reversed(stack))] += now - last
+            last = now
+
+
+def pstats_stacks(stats):
+    # cProfile keeps caller -> callee edges, not stacks. Rebuild call paths
+    # from the roots down, splitting each function's time over its callers
+    # by their share of its cumulative time (as flameprof does).
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, entry in stats.items() if not entry[4]]
+
+    stacks = Counter()
+
+    def walk(func, path, share):
+        _, _, self_time, cumulative, _ = stats[func]
+        path = path + (func,)
+        if self_time * share >= MIN_WEIGHT:
+            stacks[path] += self_time * share
+        if len(path) >= MAX_DEPTH:
+            return
+        for callee, edge_time in callees.get(func, ()):
+            if callee in path or not stats[callee][3]:
+                continue
+            child_share = share * min(1.0, edge_time / stats[callee][3])
+            if edge_time * share >= MIN_WEIGHT:
+                walk(callee, path, child_share)
+
+    for root in roots:
+        walk(root, (), 1.0)
+    return stacks
+
+
+def top_frames(stacks, limit=TOP_FRAMES):
+    # Hottest functions by self and by total (inclusive) time
+    self_time, total_time = Counter(), Counter()
+    for stack, weight in stacks.items():
+        self_time[stack[-1]] += weight
+        for frame in set(stack):
+            total_time[frame] += weight
+    return [
+        {"function": name, "file": path, "line": line,
+         "self_ms": round(self_time[key] * 1000, 2), "total_ms": round(total_time[key] * 1000, 2)}
+        for key in sorted(self_time, key=self_time.get, reverse=True)[:limit]
+        for path, line, name in [key]
+    ]
+
+
+# -----------------------------
+# Export formats
+# -----------------------------
+def frame_label(key):
+    path, line, name = key
+    return f"{name} ({os.path.basename(path)}:{line})"
+
+
+def to_collapsed(stacks):
+    # "root;child;leaf <microseconds>" per line
+    return "".join(
+        ";".join(frame_label(f).replace(";", ":") for f in stack) + f" {round(weight * 1e6)}\n"
+        for stack, weight in stacks.items() if round(weight * 1e6) > 0
+    )
+
+
+def to_speedscope(stacks, name):
+    index, frames, samples, weights = {}, [], [], []
+    for stack, weight in stacks.items():
+        for key in stack:
+            if key not in index:
+                index[key] = len(frames)
+                frames.append({"name": key[2], "file": key[0], "line": key[1]})
+        samples.append([index[key] for key in stack])
+        weights.append(round(weight * 1000, 3))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "exporter": "ocr_pipeline.profiling",
+        "name": name,
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled", "name": name, "unit": "milliseconds",
+            "startValue": 0, "endValue": round(sum(weights), 3),
+            "samples": samples, "weights": weights,
+        }],
+    }
+
+
+# -----------------------------
+# Sessions
+# -----------------------------
+class ProfileSession:
+    def __init__(self, mode, label, sampled=False):
+        self.id = time.strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        self.mode = mode
+        self.label = label
+        self.sampled = sampled
+        self.documents = []
+        self.stacks = Counter()
+        self.profiler = None
+        self._sampler = None
+        self._lock = threading.Lock()
+        self._finished = False
+
+    def ref(self):
+        return {"id": self.id, "url": f"/profiles/{self.id}"}
+
+    def start(self):
+        if self.mode == "cprofile" and not _cprofile_lock.acquire(blocking=False):
+            self.mode = "sample"                    # another request holds the profiler
+        if self.mode == "cprofile":
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident())
+            self._sampler.start()
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        _local.session = self
+        return self
+
+    def stop(self):
+        # Idempotent; returns False if it was already stopped
+        with self._lock:
+            if self._finished:
+                return False
+            self._finished = True
+        self.duration = time.perf_counter() - self._t0
+        if self.profiler is not None:
+            self.profiler.disable()
+            _cprofile_lock.release()
+            self.stacks = pstats_stacks(pstats.Stats(self.profiler).stats)
+        else:
+            self.stacks = self._sampler.stop()
+        if current() is self:
+            _local.session = None
+        return True
+
+    def enter_thread(self):
+        # Make this the current thread's session (see propagate)
+        previous = current()
+        _local.session = self
+        if self._sampler is not None:
+            self._sampler.add_thread(threading.get_ident())
+        return previous
+
+    def leave_thread(self, previous=None):
+        if self._sampler is not None:
+            self._sampler.remove_thread(threading.get_ident())
+        _local.session = previous
+
+    def note(self, ctx):
+        # Called by Pipeline.run_ctx: what this document looked like to the pipeline
+        doc = ctx.get("profile_document")
+        if doc is None:
+            doc = ctx["profile_document"] = {"image_path": ctx.get("image_path")}
+            self.documents.append(doc)
+        image = ctx.get("image")
+        width, height = (image.shape[1], image.shape[0]) if image is not None else ctx.get("image_size", (None, None))
+        doc.update({
+            "width": width, "height": height,
+            "contours": len(ctx["boxes"]) if "boxes" in ctx else None,
+            "blocks": len(ctx["blocks"]) if "blocks" in ctx else None,
+            "cache_hit": ctx.get("cache_hit", False),
+            "timings_ms": dict(ctx.get("timings", {})),
+        })
+        if isinstance(ctx.get("output_data"), dict):
+            ctx["output_data"]["profile"] = self.ref()
+
+    def summary(self):
+        return {
+            "id": self.id, "mode": self.mode, "label": self.label, "sampled": self.sampled,
+            "started_at": self.started_at, "duration_ms": round(self.duration * 1000, 2),
+            "profiled_ms": round(sum(self.stacks.values()) * 1000, 2),
+            "documents": self.documents,
+        }
+
+    def save(self, store, **extra):
+        # <id>.json (summary + stacks) and, for cProfile, <id>.prof
+        summary = dict(self.summary(), **extra)
+        frames = sorted({f for stack in self.stacks for f in stack})
+        index = {f: i for i, f in enumerate(frames)}
+        data = dict(summary, top=top_frames(self.stacks), frames=frames,
+                    stacks=[[[index[f] for f in stack], weight] for stack, weight in self.stacks.items()])
+        with open(store.path_for(f"{self.id}.json", self.id), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        store.add(f"{self.id}.json", self.id)
+        if self.profiler is not None:
+            self.profiler.dump_stats(store.path_for(f"{self.id}.prof", self.id))
+            store.add(f"{self.id}.prof", self.id)
+        return summary
+
+
+def note(ctx):
+    session = current()
+    if session is not None:
+        session.note(ctx)
+
+
+def propagate(func):
+    # Wrap func to run under the calling thread's session in whatever thread
+    # ends up calling it; func itself when no session is active
+    session = current()
+    if session is None:
+        return func
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        previous = session.enter_thread()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            session.leave_thread(previous)
+    return run
+
+
+def load_profile(store, profile_id):
+    path = store.lookup(f"{profile_id}.json")
+    if path is None or not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    frames = [tuple(f) for f in data.pop("frames")]
+    data["stacks"] = Counter({tuple(frames[i] for i in stack): weight for stack, weight in data["stacks"]})
+    return data
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FileStore(PROFILE_DIR, *env_quota("PROFILES"))
+    return _store
+
+
+# -----------------------------
+# Flask hooks
+# -----------------------------
+def authorized():
+    # The caller presented PROFILE_TOKEN; always False when none is configured
+    given = request.headers.get("X-Profile-Token") or request.args.get("profile_token") or ""
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(given.encode("utf-8"), PROFILE_TOKEN.encode("utf-8"))
+
+
+def requested_mode():
+    if not authorized():
+        return None
+    mode = (request.headers.get("X-Profile") or request.args.get("profile") or "").lower()
+    if mode in ("1", "true", "on"):
+        return "cprofile"
+    return mode if mode in MODES else None
+
+
+def start_request():
+    _local.session = None
+    if not PROFILING or request.endpoint in SKIP_ENDPOINTS:
+        return
+    mode, sampled = requested_mode(), False
+    if mode is None and SAMPLE_EVERY > 0 and next(_request_count) % SAMPLE_EVERY == 0:
+        mode, sampled = SAMPLE_MODE, True
+    if mode is not None:
+        g.profile_session = ProfileSession(mode, f"{request.method} {request.full_path.rstrip('?')}", sampled).start()
+
+
+def finish_request(response):
+    session = g.pop("profile_session", None)
+    if session is None:
+        return response
+    response.headers["X-Profile-Id"] = session.id
+
+    def finish():
+        if session.stop():
+            try:
+                session.save(get_profile_store(), status=response.status_code)
+            except Exception as e:
+                print(f"Could not save profile {session.id}: {e}")
+
+    # Closed once the body has been sent, so streamed responses are covered
+    response.call_on_close(finish)
+    return response
+
+
+def list_profiles():
+    if not authorized():
+        abort(404)
+    return jsonify({"profiles": [name[:-len(".json")] for name in get_profile_store().names(limit=200)
+                                 if name.endswith(".json")]})
+
+
+def serve_profile(profile_id):
+    if not authorized():
+        abort(404)
+    store = get_profile_store()
+    fmt = request.args.get("format")
+    if fmt == "pstats":
+        path = store.lookup(f"{profile_id}.prof")
+        if path is None:
+            abort(404)
+        return send_file(path, mimetype="application/octet-stream", as_attachment=True,
+                         download_name=f"{profile_id}.prof")
+    data = load_profile(store, profile_id)
+    if data is None:
+        abort(404)
+    if fmt == "speedscope":
+        response = jsonify(to_speedscope(data["stacks"], data["label"]))
+        response.headers["Content-Disposition"] = f"attachment; filename={profile_id}.speedscope.json"
+        return response
+    if fmt == "collapsed":
+        return Response(to_collapsed(data["stacks"]), mimetype="text/plain")
+    data.pop("stacks")
+    return jsonify(data)
+
+
+def install(app):
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.add_url_rule("/profiles", "profiles", list_profiles)
+    app.add_url_rule("/profiles/<profile_id>", "profile", serve_profile)
+    return app
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def write_export(stacks, name, fmt, output):
+    if fmt == "speedscope":
+        body = json.dumps(to_speedscope(stacks, name))
+    else:
+        body = to_collapsed(stacks)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(body)
+        print(f"Wrote {output}")
+    else:
+        sys.stdout.write(body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile the OCR pipeline / export stored profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="profile one pipeline run on an image")
+    run.add_argument("image")
+    run.add_argument("--mode", choices=MODES, default="cprofile")
+    run.add_argument("--format", choices=EXPORT_FORMATS[:2], default="speedscope")
+    run.add_argument("-o", "--output")
+    export = sub.add_parser("export", help="export a stored profile")
+    export.add_argument("profile_id")
+    export.add_argument("--format", choices=EXPORT_FORMATS[:2], default="speedscope")
+    export.add_argument("-o", "--output")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        # The pipeline reports documents to the imported module, not __main__
+        from ocr_pipeline import profiling
+        from ocr_pipeline.stages import build_pipeline
+
+        pipeline = build_pipeline()
+        session = profiling.ProfileSession(args.mode, f"run {os.path.basename(args.image)}").start()
+        try:
+            pipeline.run(args.image)
+        finally:
+            session.stop()
+        print(json.dumps(dict(session.summary(), top=top_frames(session.stacks, 10)), indent=2), file=sys.stderr)
+        write_export(session.stacks, session.label, args.format, args.output)
+    else:
+        data = load_profile(get_profile_store(), args.profile_id)
+        if data is None:
+            sys.exit(f"No profile {args.profile_id} in {PROFILE_DIR}")
+        write_export(data["stacks"], data["label"], args.format, args.output)
@@ -0,0 +1,258 @@
+import heapq
+
+import cv2
+import numpy as np
+
+# -----------------------------
+# Region analysis on the dilated mask
+# -----------------------------
+# Every text blob becomes a row of an N x 5 int array
+#
+#   [x, y, w, h, area]
+#
+# and everything after that (filtering, merging, line layout, scaling back
+# to the original image) works on whole columns, so a noisy scan with
+# thousands of blobs costs a few array ops instead of thousands of
+# boundingRect calls, sort keys and Python tuples.
+#
+# Two ways to get the array, same boxes:
+#   "contours"   findContours(RETR_EXTERNAL) once, then the bounds and
+#                polygon areas of all contours in one reduceat pass. Default:
+#                the contour scan skips background, so on our mostly empty
+#                page masks it is ~10-20x cheaper than labelling every pixel.
+#   "components" connectedComponentsWithStats on the hole-filled mask (blobs
+#                inside another blob's hole are not separate blocks, as with
+#                RETR_EXTERNAL); area is the pixel count. Better on dense masks.
+X, Y, W, H, AREA = range(5)
+METHODS = ("contours", "components")
+MIN_REGION_SIDE = 10        # px on the mask; the 2 x 5x5 dilation makes any real ink >= 9 px
+LINE_OVERLAP = 0.5          # share of the smaller height a box must share with a line's band
+TALL_LINE_FACTOR = 2.5      # boxes taller than this many median heights are lines of their own
+COLUMN_GAP = 3.0            # horizontal gap, in line heights, that splits a line into columns
+CHUNK_ELEMENTS = 1 << 22    # pairwise comparisons done at most this many at a time
+
+
+def fill_holes(mask):
+    # Background not reachable from the border (4-connected) becomes foreground
+    padded = cv2.copyMakeBorder(mask, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    outside = padded.copy()
+    cv2.floodFill(outside, None, (0, 0), 255)
+    return (padded | cv2.bitwise_not(outside))[1:-1, 1:-1]
+
+
+def component_stats(mask):
+    _, _, stats, _ = cv2.connectedComponentsWithStats(fill_holes(mask), connectivity=8, ltype=cv2.CV_32S)
+    return stats[1:].copy()
+
+
+def contour_stats(mask):
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return np.zeros((0, 5), dtype=np.int32)
+    lengths = np.fromiter(map(len, contours), dtype=np.int64, count=len(contours))
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+    px, py = points[:, 0], points[:, 1]
+    x0, y0 = np.minimum.reduceat(px, starts), np.minimum.reduceat(py, starts)
+    x1, y1 = np.maximum.reduceat(px, starts), np.maximum.reduceat(py, starts)
+    # Shoelace over each closed polygon: next point, wrapping to the contour's first
+    following = np.arange(1, len(points) + 1)
+    following[starts + lengths - 1] = starts
+    cross = px * py[following] - px[following] * py
+    area = np.abs(np.add.reduceat(cross, starts)) // 2
+    return np.stack([x0, y0, x1 - x0 + 1, y1 - y0 + 1, area], axis=1).astype(np.int32)
+
+
+def region_stats(mask, method="contours"):
+    # Blobs of a binary mask as N x 5 [x, y, w, h, area], in no particular order
+    if method == "contours":
+        return contour_stats(mask)
+    if method == "components":
+        return component_stats(mask)
+    raise ValueError(f"Unknown region method: {method}")
+
+
+def corners(regions):
+    # x0, y0, x1, y1 (exclusive) as int64 columns
+    r = regions.astype(np.int64)
+    return r[:, X], r[:, Y], r[:, X] + r[:, W], r[:, Y] + r[:, H]
+
+
+# -----------------------------
+# Filtering
+# -----------------------------
+def filter_regions(regions, min_side=MIN_REGION_SIDE, min_area=0, max_area_fraction=None, shape=None):
+    keep = (regions[:, W] >= min_side) & (regions[:, H] >= min_side) & (regions[:, AREA] >= min_area)
+    if max_area_fraction is not None and shape is not None:
+        keep &= regions[:, W].astype(np.int64) * regions[:, H] <= max_area_fraction * shape[0] * shape[1]
+    return regions[keep]
+
+
+def drop_contained(regions):
+    # Blobs whose box lies entirely inside another blob's box (not only in a
+    # hole of it), so their pixels are OCR'd twice. Identical boxes keep the first.
+    n = len(regions)
+    if n < 2:
+        return regions
+    x0, y0, x1, y1 = corners(regions)
+    box_area = (x1 - x0) * (y1 - y0)
+    index = np.arange(n)
+    contained = np.zeros(n, dtype=bool)
+    step = max(1, CHUNK_ELEMENTS // n)
+    for start in range(0, n, step):
+        i = slice(start, start + step)
+        inside = ((x0[i, None] >= x0) & (y0[i, None] >= y0) & (x1[i, None] <= x1) & (y1[i, None] <= y1)
+                  & ((box_area > box_area[i, None]) | (index < index[i, None])))
+        contained[i] = inside.any(axis=1)
+    return regions[~contained]
+
+
+# -----------------------------
+# Merging
+# -----------------------------
+def merge_regions(regions, gap, shape):
+    # Union of boxes that overlap once grown by gap px. The grown boxes are
+    # painted with a 2D difference array (no per-box loop), labelled once,
+    # and each group's bounds come from ufunc.at reductions.
+    if len(regions) < 2:
+        return regions
+    height, width = shape[:2]
+    x0, y0, x1, y1 = corners(regions)
+    gx0, gy0 = np.clip(x0 - gap, 0, width), np.clip(y0 - gap, 0, height)
+    gx1, gy1 = np.clip(x1 + gap, 0, width), np.clip(y1 + gap, 0, height)
+
+    diff = np.zeros((height + 1, width + 1), dtype=np.int32)
+    np.add.at(diff, (gy0, gx0), 1)
+    np.add.at(diff, (gy0, gx1), -1)
+    np.add.at(diff, (gy1, gx0), -1)
+    np.add.at(diff, (gy1, gx1), 1)
+    covered = (diff.cumsum(axis=0).cumsum(axis=1)[:height, :width] > 0).astype(np.uint8)
+    _, labels = cv2.connectedComponents(covered, connectivity=4)
+
+    _, group = np.unique(labels[gy0, gx0], return_inverse=True)
+    return group_bounds(regions, group)
+
+
+def group_bounds(regions, group):
+    # One N x 5 row per group id (0..max): union box, summed area
+    count = int(group.max()) + 1 if len(group) else 0
+    x0, y0, x1, y1 = corners(regions)
+    big = np.iinfo(np.int64).max
+    gx0, gy0 = np.full(count, big), np.full(count, big)
+    gx1, gy1 = np.zeros(count, dtype=np.int64), np.zeros(count, dtype=np.int64)
+    np.minimum.at(gx0, group, x0)
+    np.minimum.at(gy0, group, y0)
+    np.maximum.at(gx1, group, x1)
+    np.maximum.at(gy1, group, y1)
+    area = np.bincount(group, weights=regions[:, AREA], minlength=count)
+    return np.stack([gx0, gy0, gx1 - gx0, gy1 - gy0, area], axis=1).astype(regions.dtype)
+
+
+# -----------------------------
+# Layout: lines and columns
+# -----------------------------
+# Boxes are swept top to bottom against an interval index of the lines still
+# open at that height (a heap keyed by each line's band bottom; lines that
+# end above the current box are retired). A box joins the open line whose
+# band (mean top / bottom of its boxes) overlaps it by at least
+# LINE_OVERLAP of the smaller height, so a slightly taller or lower word
+# stays on its line where sorting by top y alone interleaved lines. Boxes
+# taller than TALL_LINE_FACTOR lines (photos, logos) are lines of their own.
+#
+# Within a line, a horizontal gap wider than COLUMN_GAP band heights starts
+# a new segment, so side-by-side columns (photo | details, label | far-away
+# value on wide forms) don't run together. "Name" and "RAHUL" a few spaces
+# apart stay in one segment, which is what the OCR then reads as one line.
+def line_ids(regions, overlap=LINE_OVERLAP, tall=TALL_LINE_FACTOR):
+    # Line number per box, numbered top to bottom
+    n = len(regions)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    top = regions[:, Y].astype(np.float64)
+    bottom = top + regions[:, H]
+    tall_height = tall * max(float(np.median(regions[:, H])), 1.0)
+
+    lines = np.empty(n, dtype=np.int64)
+    bands = []          # per line: [sum of tops, sum of bottoms, count]
+    open_lines = []     # heap of (band bottom when pushed, line)
+    for i in np.argsort(top, kind="stable"):
+        while open_lines and open_lines[0][0] < top[i]:
+            _, line = heapq.heappop(open_lines)
+            band_bottom = bands[line][1] / bands[line][2]
+            if band_bottom >= top[i]:                   # band grew since it was pushed
+                heapq.heappush(open_lines, (band_bottom, line))
+        best, best_overlap = None, 0.0
+        if bottom[i] - top[i] <= tall_height:
+            for _, line in open_lines:
+                b0, b1, count = bands[line]
+                b0, b1 = b0 / count, b1 / count
+                shared = min(bottom[i], b1) - max(top[i], b0)
+                needed = overlap * min(bottom[i] - top[i], b1 - b0)
+                if shared >= needed and shared > best_overlap:
+                    best, best_overlap = line, shared
+        if best is None:
+            best = len(bands)
+            bands.append([0.0, 0.0, 0])
+            if bottom[i] - top[i] <= tall_height:
+                heapq.heappush(open_lines, (bottom[i], best))
+        band = bands[best]
+        band[0] += top[i]
+        band[1] += bottom[i]
+        band[2] += 1
+        lines[i] = best
+
+    bands = np.array(bands)
+    centers = (bands[:, 0] + bands[:, 1]) / (2 * bands[:, 2])
+    rank = np.empty(len(bands), dtype=np.int64)
+    rank[np.argsort(centers, kind="stable")] = np.arange(len(bands))
+    return rank[lines]
+
+
+def line_segments(regions, lines, column_gap=COLUMN_GAP):
+    # Segment id per box (numbered in reading order) after splitting each line
+    # at wide horizontal gaps, and the N x 5 union box of every segment
+    if len(regions) == 0:
+        return np.zeros(0, dtype=np.int64), regions[:0]
+    order = np.lexsort((regions[:, X], lines))
+    x0, y0, x1, y1 = (c[order] for c in corners(regions))
+    line = lines[order]
+    band = np.bincount(line, weights=y1 - y0) / np.maximum(np.bincount(line), 1)
+    # Rightmost edge so far within the line (offset per line so the running max resets)
+    offset = line * (int(x1.max()) + 1)
+    reach = np.maximum.accumulate(x1 + offset) - offset
+    new_line = np.concatenate([[True], line[1:] != line[:-1]])
+    wide_gap = np.concatenate([[False], x0[1:] - reach[:-1] > column_gap * band[line[1:]]])
+    segment = np.empty(len(regions), dtype=np.int64)
+    segment[order] = np.cumsum(new_line | wide_gap) - 1
+    return segment, group_bounds(regions, segment)
+
+
+def reading_order(regions, order="lines"):
+    # "lines": top to bottom by line, left to right within a line
+    # "top":   by top edge only (the old contour order)
+    if order == "top":
+        return regions[np.argsort(regions[:, Y], kind="stable")]
+    if order != "lines":
+        raise ValueError(f"Unknown reading order: {order}")
+    return regions[np.lexsort((regions[:, X], line_ids(regions)))]
+
+
+def scale_regions(regions, scale):
+    # Vector form of preprocessing.scale_box: mask coordinates -> original image
+    if scale == 1.0:
+        return regions[:, :4]
+    boxes = np.empty((len(regions), 4), dtype=np.int64)
+    boxes[:, :2] = (regions[:, :2] / scale).astype(np.int64)
+    boxes[:, 2:] = np.round(regions[:, 2:4] / scale).astype(np.int64)
+    return boxes
+
+
+def find_regions(mask, method="contours", min_side=MIN_REGION_SIDE, min_area=0, drop_nested=False,
+                 merge_gap=None, order="lines"):
+    # Text blocks of a dilated mask as N x 5 [x, y, w, h, area], in reading order
+    regions = filter_regions(region_stats(mask, method), min_side, min_area)
+    if drop_nested:
+        regions = drop_contained(regions)
+    if merge_gap is not None:
+        regions = merge_regions(regions, merge_gap, mask.shape)
+    return reading_order(regions, order)
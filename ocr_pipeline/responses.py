@@ -0,0 +1,195 @@
+import base64
+import gzip
+import os
+import shutil
+
+from flask import Response, abort, jsonify, request, send_file, send_from_directory
+from werkzeug.security import safe_join
+
+from ocr_pipeline import annotations
+from ocr_pipeline.manifest import file_sha1
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only without it
+    brotli = None
+
+# -----------------------------
+# Response shaping
+# -----------------------------
+# Shared by the Flask apps:
+#
+#   ?fields=document_type,cleaned_summary.Name   keep only these (dotted) keys
+#   ?images=ref|inline|none                      image as a hash-addressed URL
+#                                                (default), inline base64, or dropped
+#   Accept-Encoding: br / gzip                   JSON bodies compressed per request
+#
+# Referenced images are copied once into a content-addressed folder
+# (IMAGE_BLOB_DIR/<sha1[:2]>/<sha1><ext>) and served from /images/<sha1>
+# with an immutable Cache-Control, so any worker can serve them and clients
+# fetch each image at most once. Annotated outputs are rendered on request
+# (ocr_pipeline.annotations) with ?w= thumbnails, WebP and conditional GET.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+IMAGE_BLOB_DIR = os.environ.get("IMAGE_BLOB_DIR", os.path.join(ROOT, "image_blobs"))
+COMPRESS_MIN_BYTES = 1024
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+IMAGE_MODES = ("ref", "inline", "none")
+OUTPUT_IMAGE_MAX_AGE = 3600
+
+
+# -----------------------------
+# Field selection
+# -----------------------------
+def select_fields(data, fields):
+    # fields: "a,b.c" or a list of dotted paths. Lists are filtered item by
+    # item, so "results.document_type" works on a list of results too.
+    if not fields:
+        return data
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+    if isinstance(data, list):
+        return [select_fields(item, fields) for item in data]
+    if not isinstance(data, dict):
+        return data
+
+    wanted = {}
+    for field in fields:
+        head, _, rest = field.partition(".")
+        wanted.setdefault(head, []).append(rest)
+    return {
+        head: data[head] if "" in rest else select_fields(data[head], rest)
+        for head, rest in wanted.items() if head in data
+    }
+
+
+def shaped_json(data):
+    # jsonify() with ?fields= applied
+    return jsonify(select_fields(data, request.args.get("fields")))
+
+
+# -----------------------------
+# Hash-addressed images
+# -----------------------------
+def blob_path(sha1, ext=""):
+    return os.path.join(IMAGE_BLOB_DIR, sha1[:2], sha1 + ext)
+
+
+def find_blob(sha1):
+    folder = os.path.join(IMAGE_BLOB_DIR, sha1[:2])
+    if len(sha1) != 40 or not all(c in "0123456789abcdef" for c in sha1) or not os.path.isdir(folder):
+        return None
+    for name in os.listdir(folder):
+        if os.path.splitext(name)[0] == sha1:
+            return os.path.join(folder, name)
+    return None
+
+
+def put_image(path):
+    # Content-addressed copy of an image file; returns its sha1
+    sha1 = file_sha1(path)
+    target = blob_path(sha1, os.path.splitext(path)[1].lower())
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, target)
+    return sha1
+
+
+def image_field(path, mode=None):
+    # What to put in a response for an image: {"sha1", "url"}, base64 or None
+    mode = mode or request.args.get("images", "ref")
+    if mode not in IMAGE_MODES:
+        mode = "ref"
+    if mode == "none":
+        return None
+    if mode == "inline":
+        with open(path, "rb") as f:
+            return base64.b64encode(f.read()).decode("utf-8")
+    sha1 = put_image(path)
+    return {"sha1": sha1, "url": f"/images/{sha1}"}
+
+
+def serve_image(sha1):
+    path = find_blob(sha1)
+    if path is None:
+        abort(404)
+    response = send_file(path, conditional=True, etag=sha1, max_age=365 * 24 * 3600)
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+# -----------------------------
+# Annotated output images
+# -----------------------------
+def send_annotation(output_folder, filename):
+    # /outputs/<name>_output.jpg[?w=320][&format=webp]: drawn from the boxes
+    # sidecar when there is one, else the file on disk as before
+    sidecar = safe_join(output_folder, os.path.splitext(filename)[0] + annotations.ANNOTATION_SUFFIX)
+    if sidecar is None or not os.path.isfile(sidecar):
+        return send_from_directory(output_folder, filename, max_age=OUTPUT_IMAGE_MAX_AGE)
+
+    fmt = request.args.get("format")
+    if fmt not in annotations.FORMATS:
+        fmt = "webp" if "image/webp" in request.headers.get("Accept", "") else "jpeg"
+    bucket = annotations.bucket_for(request.args.get("w", type=int))
+    etag = annotations.annotation_etag(sidecar, bucket, fmt)
+    if etag is None:
+        abort(404)
+
+    response = Response(mimetype=annotations.FORMATS[fmt][2])
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = f"public, max-age={OUTPUT_IMAGE_MAX_AGE}"
+    response.vary.add("Accept")
+    if etag in request.if_none_match:
+        response.status_code = 304
+        return response
+    response.set_data(annotations.rendered_bytes(sidecar, bucket, fmt, etag))
+    return response
+
+
+# -----------------------------
+# Compression
+# -----------------------------
+def choose_encoding(accept_encoding):
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name.strip())
+    if "br" in accepted and brotli is not None:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response):
+    # after_request hook; streamed responses (SSE, NDJSON) are left alone
+    response.vary.add("Accept-Encoding")
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code in (204, 304) or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)):
+        return response
+    encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+    body = response.get_data()
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def install(app):
+    # /images/<sha1> route + per-request compression
+    app.add_url_rule("/images/<sha1>", "hashed_image", serve_image)
+    app.after_request(compress_response)
+    return app
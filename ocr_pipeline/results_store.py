@@ -0,0 +1,257 @@
+# Indexed results store for processed documents (SQLite).
+#
+#   python -m ocr_pipeline.results_store import fuzzy_front_back/outputs multiimage_extraction/outputs
+#   python -m ocr_pipeline.results_store query --document_type "PAN Card" --side Front --dob_year 1990
+#
+# Every output_data is appended as one row: the fields we filter on get their
+# own indexed columns, the full payload is kept zlib-compressed next to them.
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from ocr_pipeline.pairing import record_fields
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_DB_PATH = os.environ.get("RESULTS_DB", os.path.join(ROOT, "results.sqlite"))
+MAX_LIMIT = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    filename TEXT,
+    source TEXT,
+    document_type TEXT,
+    side TEXT,
+    number TEXT,
+    name TEXT,
+    dob TEXT,
+    dob_year INTEGER,
+    created_at REAL,
+    payload BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_results_type_side ON results (document_type, side);
+CREATE INDEX IF NOT EXISTS idx_results_number ON results (number);
+CREATE INDEX IF NOT EXISTS idx_results_filename ON results (filename);
+CREATE INDEX IF NOT EXISTS idx_results_dob_year ON results (dob_year);
+CREATE TABLE IF NOT EXISTS image_hashes (
+    result_id INTEGER PRIMARY KEY,
+    phash INTEGER,
+    dhash INTEGER
+);
+"""
+INSERT_SQL = (
+    "INSERT INTO results (filename, source, document_type, side, number, name, dob, "
+    "dob_year, created_at, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# query argument -> SQL condition
+FILTERS = {
+    "document_type": "document_type = ?",
+    "side": "side = ?",
+    "number": "number = ?",
+    "filename": "filename = ?",
+    "dob_year": "dob_year = ?",
+    "name": "name LIKE ?",
+    "source": "source = ?",
+}
+
+
+def _row_values(output_data, source, created_at=None):
+    fields = record_fields(output_data)
+    dob = fields["dob"]
+    return (
+        output_data.get("filename"),
+        source,
+        output_data.get("document_type"),
+        fields["side"],
+        fields["number"],
+        fields["name"] or None,
+        dob,
+        int(dob[-4:]) if dob else None,
+        created_at or time.time(),
+        zlib.compress(json.dumps(output_data, ensure_ascii=False).encode("utf-8")),
+    )
+
+
+class ResultsStore:
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # Server workers in separate processes share the file, so wait on locks
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def add(self, output_data, source=None):
+        # Returns the new row id, None when there is nothing to store
+        if not output_data.get("filename"):
+            return None
+        with self._lock:
+            row_id = self._conn.execute(INSERT_SQL, _row_values(output_data, source)).lastrowid
+            self._conn.commit()
+        return row_id
+
+    def add_many(self, results, source=None, created_at=None):
+        return self.add_entries([(r, source, created_at) for r in results])
+
+    def add_entries(self, entries):
+        # entries: (output_data, source, created_at) tuples, inserted in one transaction
+        rows = [_row_values(r, source, ts) for r, source, ts in entries if r.get("filename")]
+        with self._lock:
+            self._conn.executemany(INSERT_SQL, rows)
+            self._conn.commit()
+        return len(rows)
+
+    def search(self, limit=100, offset=0, include_payload=False, **filters):
+        conditions, params = [], []
+        for key, value in filters.items():
+            if value is None or value == "":
+                continue
+            if key not in FILTERS:
+                raise ValueError(f"Unknown filter: {key}")
+            conditions.append(FILTERS[key])
+            if key == "name":
+                value = f"%{value.upper()}%"
+            elif key == "dob_year":
+                value = int(value)
+            params.append(value)
+
+        columns = "id, filename, source, document_type, side, number, name, dob, created_at"
+        if include_payload:
+            columns += ", payload"
+        sql = f"SELECT {columns} FROM results"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY id DESC LIMIT ? OFFSET ?"
+        # SQLite reads LIMIT -1 as "no limit", so clamp instead of passing it through
+        params += [max(1, min(int(limit), MAX_LIMIT)), max(0, int(offset))]
+
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            names = [d[0] for d in cur.description]
+            rows = cur.fetchall()
+
+        out = []
+        for row in rows:
+            item = dict(zip(names, row))
+            if include_payload:
+                item["payload"] = json.loads(zlib.decompress(item["payload"]).decode("utf-8"))
+            out.append(item)
+        return out
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, result_id):
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM results WHERE id = ?", (result_id,)).fetchone()
+        return json.loads(zlib.decompress(row[0]).decode("utf-8")) if row else None
+
+    # Perceptual hashes of stored results (ocr_pipeline.near_duplicates)
+    def add_hashes(self, result_id, phash, dhash):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO image_hashes (result_id, phash, dhash) VALUES (?, ?, ?)",
+                (result_id, phash, dhash),
+            )
+            self._conn.commit()
+
+    def hashes_since(self, result_id):
+        # (result_id, phash, dhash, source) rows, oldest first
+        with self._lock:
+            return self._conn.execute(
+                "SELECT h.result_id, h.phash, h.dhash, r.source FROM image_hashes h "
+                "JOIN results r ON r.id = h.result_id WHERE h.result_id > ? ORDER BY h.result_id",
+                (result_id,),
+            ).fetchall()
+
+
+_default_store = None
+_default_store_pid = None
+_default_store_lock = threading.Lock()
+
+
+def get_store():
+    # Shared store for the Flask apps, opened on first use in each process
+    # (SQLite connections must not cross a fork, e.g. gunicorn --preload)
+    global _default_store, _default_store_pid
+    with _default_store_lock:
+        if _default_store is None or _default_store_pid != os.getpid():
+            _default_store = ResultsStore(DEFAULT_DB_PATH)
+            _default_store_pid = os.getpid()
+    return _default_store
+
+
+def search_args(args):
+    # Turn Flask request.args (or any mapping) into ResultsStore.search kwargs
+    kwargs = {key: args.get(key) for key in FILTERS if args.get(key)}
+    kwargs["limit"] = args.get("limit", 100)
+    kwargs["offset"] = args.get("offset", 0)
+    kwargs["include_payload"] = args.get("payload", "0") == "1"
+    return kwargs
+
+
+# -----------------------------
+# One-time importer for the existing JSON output folders
+# -----------------------------
+def import_json_dirs(store, dirs, batch_size=500):
+    imported = 0
+    batch = []
+    for folder in dirs:
+        for root, _, files in os.walk(folder):
+            source = os.path.relpath(root, ROOT)
+            for name in sorted(files):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Skipping {path}: {e}")
+                    continue
+                if isinstance(data, dict) and "results" in data:
+                    data = data["results"]
+                for result in data if isinstance(data, list) else [data]:
+                    if isinstance(result, dict):
+                        batch.append((result, source, os.path.getmtime(path)))
+                if len(batch) >= batch_size:
+                    imported += _flush(store, batch)
+    imported += _flush(store, batch)
+    return imported
+
+
+def _flush(store, batch):
+    n = store.add_entries(batch)
+    batch.clear()
+    return n
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Results store tools")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="Import existing output JSON folders")
+    imp.add_argument("dirs", nargs="+")
+
+    query = sub.add_parser("query", help="Search stored results")
+    for key in FILTERS:
+        query.add_argument(f"--{key}")
+    query.add_argument("--limit", type=int, default=100)
+    query.add_argument("--payload", action="store_true")
+
+    args = parser.parse_args()
+    store = ResultsStore(args.db)
+    if args.command == "import":
+        print(f"Imported {import_json_dirs(store, args.dirs)} results into {args.db}")
+    else:
+        filters = {key: getattr(args, key) for key in FILTERS}
+        rows = store.search(limit=args.limit, include_payload=args.payload, **filters)
+        print(json.dumps(rows, indent=4, ensure_ascii=False))
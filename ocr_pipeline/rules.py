@@ -0,0 +1,270 @@
+import bisect
+import re
+
+from rapidfuzz import fuzz
+
+# -----------------------------
+# Regex patterns
+# -----------------------------
+PAN_PATTERN = re.compile(r"^[A-Z]{5}[0-9]{4}[A-Z]$")
+AADHAR_PATTERN = re.compile(r"^\d{4}\s\d{4}\s\d{4}$")
+AADHAR_PATTERN_NOSPACE = re.compile(r"^\d{12}$")
+DL_NUMBER_PATTERN = re.compile(r"^[A-Z]{2}\d{2}[0-9A-Z]{11,}$")
+VOTER_PATTERN = re.compile(r"^[A-Z]{3}[0-9]{7}$")
+PASSPORT_PATTERN = re.compile(r"^[A-Z][0-9]{7}$")
+IFSC_PATTERN = re.compile(r"^[A-Z]{4}0[A-Z0-9]{6}$")
+DOB_PATTERN = re.compile(r"\d{2}[-/]\d{2}[-/]\d{4}")
+
+UNKNOWN_DOCUMENT = "Unknown Document"
+
+# A keyword matched in a 0-confidence block still counts this much (vs. 1.0 at 100)
+CONF_WEIGHT_FLOOR = 0.75
+
+# -----------------------------
+# Keyword dictionary (fuzzy classifier)
+# -----------------------------
+DOCUMENT_KEYWORDS = {
+    "PAN Card": [
+        "income tax department", "permanent account number", "govt of india", "father's name"
+    ],
+    "Aadhaar Card": [
+        "aadhaar", "uidai", "government of india", "year of birth", "date of birth", "gender"
+    ],
+    "Voter ID Card": [
+        "election commission of india", "voter id", "elector's photo identity card",
+        "elector's name", "sex", "epic"
+    ],
+    "Passport": [
+        "passport", "republic of india", "place of birth", "date of issue", "date of expiry"
+    ],
+    "Driving License": [
+        "driving license", "dl no", "valid till", "transport", "date of issue", "dob"
+    ],
+    "Bank Passbook": [
+        "account number", "ifsc", "branch", "customer id", "balance", "transaction", "a/c"
+    ]
+}
+
+# -----------------------------
+# Keyword flags (exact classifier)
+# -----------------------------
+# Checked block by block; the first flagged type in this order wins
+BANK_KEYWORDS = ["IFSC", "CIF", "ACCOUNT", "A/C", "SAVING", "SB A/C", "CURRENT", "BRANCH CODE", "BRANCH"]
+DL_KEYWORDS = ["DRIVING LICENCE", "DRIVING LICENSE", "DL NO", "VALID TILL", "DATE OF ISSUE", "DOB", "AUTHORISATION TO DRIVE"]
+VOTER_KEYWORDS = ["ELECTION COMMISSION OF INDIA", "VOTER ID", "ELECTOR'S PHOTO IDENTITY CARD"]
+PASSPORT_KEYWORDS = ["PASSPORT", "REPUBLIC OF INDIA"]
+FLAG_ORDER = ["PAN Card", "Aadhaar Card", "Bank Passbook", "Driving License", "Voter ID Card", "Passport"]
+
+# flask_ui's original rules: Passport is also flagged by its field labels and
+# the Voter ID / Passport number shapes flag nothing
+UI_PASSPORT_KEYWORDS = ["REPUBLIC OF INDIA", "PASSPORT", "TYPE", "CODE", "DATE OF ISSUE", "DATE OF EXPIRY"]
+
+# -----------------------------
+# Side indicators
+# -----------------------------
+# doc_type -> (front indicators, back indicators, number pattern that marks the front)
+SIDE_INDICATORS = {
+    "PAN Card": (
+        ["PERMANENT ACCOUNT NUMBER", "INCOME TAX DEPARTMENT", "GOVT. OF INDIA", "GOVERNMENT OF INDIA",
+         "NAME", "FATHER", "DATE OF BIRTH"],
+        ["INCOME TAX PAN SERVICES UNIT", "CBD BELAPUR", "NSDL", "UTIITSL", "QR CODE",
+         "SCAN THIS CODE", "VERIFY AUTHENTICITY"],
+        PAN_PATTERN,
+    ),
+    "Aadhaar Card": (
+        ["GOVERNMENT OF INDIA", "AADHAAR", "NAME", "DOB", "GENDER"],
+        ["ADDRESS", "UNIQUE IDENTIFICATION", "UNIQUE IDENTIFICATION AUTHORITY OF INDIA", "DISTRICT",
+         "STATE", "PIN", "C/O", "CARE OF", "MOBILE"],
+        None,
+    ),
+    "Voter ID Card": (
+        ["ELECTION COMMISSION OF INDIA", "VOTER ID", "ELECTOR'S PHOTO IDENTITY CARD", "NAME", "FATHER",
+         "DOB", "GENDER"],
+        ["ADDRESS", "DISTRICT", "STATE", "PIN CODE", "C/O", "CARE OF", "ISSUE DATE"],
+        VOTER_PATTERN,
+    ),
+    "Passport": (
+        ["REPUBLIC OF INDIA", "PASSPORT", "NAME", "NATIONALITY", "DATE OF BIRTH", "SEX"],
+        ["ADDRESS", "EMERGENCY CONTACT", "PLACE OF ISSUE", "ISSUING AUTHORITY"],
+        PASSPORT_PATTERN,
+    ),
+    "Bank Passbook": (
+        ["ACCOUNT NUMBER", "IFSC", "BRANCH", "MICR", "CUSTOMER ID", "SAVINGS ACCOUNT", "CURRENT ACCOUNT"],
+        ["DEPOSIT", "WITHDRAWAL", "BALANCE", "CHEQUE NO", "NARRATION"],
+        IFSC_PATTERN,
+    ),
+    "Driving License": (
+        ["DRIVING LICENCE", "DL NO", "VALID TILL"],
+        ["AUTHORISED TO DRIVE", "COV", "TRANSPORT", "NON-TRANSPORT"],
+        DL_NUMBER_PATTERN,
+    ),
+}
+
+# flask_ui: flagged type -> (front keywords, back keywords). The side comes from
+# the first flagged type in UI_SIDE_ORDER, whatever type won the flags
+UI_SIDE_ORDER = ["Aadhaar Card", "PAN Card", "Driving License", "Voter ID Card", "Passport"]
+UI_SIDE_KEYWORDS = {
+    "Aadhaar Card": (["GOVERNMENT OF INDIA", "AADHAAR", "UIDAI"],
+                     ["VID", "ENROLMENT", "HELPLINE", "WWW.UIDAI.GOV.IN", "ADDRESS"]),
+    "PAN Card": (["INCOME TAX DEPARTMENT", "PERMANENT ACCOUNT NUMBER"],
+                 ["INCOME TAX PAN SERVICES UNIT", "CBD BELAPUR", "NSDL", "UTIITSL"]),
+    "Driving License": (["DRIVING LICENCE", "DL NO", "VALID TILL"],
+                        ["AUTHORISED TO DRIVE", "COV", "TRANSPORT", "NON-TRANSPORT"]),
+    "Voter ID Card": (["ELECTION", "ELECTION COMMISSION OF INDIA", "PHOTO IDENTITY CARD"],
+                      ["ADDRESS", "EPIC NO"]),
+    "Passport": (["REPUBLIC OF INDIA", "PASSPORT", "TYPE", "CODE"],
+                 ["PARENTS NAME", "ADDRESS", "PLACE OF ISSUE"]),
+}
+UI_UNKNOWN_SIDE = "Unknown Side"
+
+# Fuzzy side indicators (matched with partial_ratio >= 70)
+FUZZY_SIDE_INDICATORS = {
+    "PAN Card": (["INCOME TAX DEPARTMENT", "PERMANENT ACCOUNT NUMBER", "GOVT. OF INDIA"],
+                 ["QR CODE", "NSDL", "UTIITSL"], PAN_PATTERN),
+    "Aadhaar Card": (["GOVERNMENT OF INDIA", "AADHAAR", "UIDAI", "DOB", "GENDER"],
+                     ["ADDRESS", "DISTRICT", "STATE", "PIN", "CARE OF"], None),
+    "Voter ID Card": (["ELECTION COMMISSION OF INDIA", "ELECTOR'S PHOTO IDENTITY CARD", "NAME", "FATHER", "DOB"],
+                      ["ADDRESS", "DISTRICT", "STATE", "PIN CODE", "ISSUE DATE"], VOTER_PATTERN),
+    "Passport": (["PASSPORT", "REPUBLIC OF INDIA", "NATIONALITY", "DATE OF BIRTH"],
+                 ["ADDRESS", "EMERGENCY CONTACT", "PLACE OF ISSUE"], PASSPORT_PATTERN),
+    "Bank Passbook": (["ACCOUNT NUMBER", "IFSC", "BRANCH", "CUSTOMER ID", "SAVINGS ACCOUNT"],
+                      ["DEPOSIT", "WITHDRAWAL", "BALANCE", "CHEQUE"], IFSC_PATTERN),
+}
+
+
+def is_aadhar_number(text):
+    text = text.strip()
+    return bool(AADHAR_PATTERN.match(text) or AADHAR_PATTERN_NOSPACE.match(text))
+
+
+def has_number(doc_type, blocks):
+    if doc_type == "Aadhaar Card":
+        return any(is_aadhar_number(b) for b in blocks)
+    pattern = SIDE_INDICATORS.get(doc_type, (None, None, None))[2]
+    if pattern is None:
+        return False
+    return any(pattern.match(b.strip().replace(" ", "")) for b in blocks)
+
+
+# -----------------------------
+# Document classifiers
+# -----------------------------
+def block_flags(text, passport_keywords=PASSPORT_KEYWORDS, number_patterns=True):
+    # Document types a single OCR block points at; number_patterns=False
+    # leaves out the Voter ID and Passport number shapes
+    text_clean = text.upper().replace(" ", "")
+    upper = text.upper()
+    flags = set()
+    if "PERMANENTACCOUNTNUMBER" in text_clean or "INCOMETAXDEPARTMENT" in text_clean \
+       or "INCOMETAXPAN" in text_clean or PAN_PATTERN.match(text_clean):
+        flags.add("PAN Card")
+    if is_aadhar_number(text) or "GOVERNMENTOFINDIA" in text_clean \
+       or "UNIQUEIDENTIFICATIONAUTHORITYOFINDIA" in text_clean:
+        flags.add("Aadhaar Card")
+    if any(k in upper for k in BANK_KEYWORDS):
+        flags.add("Bank Passbook")
+    if any(k in upper for k in DL_KEYWORDS) or DL_NUMBER_PATTERN.match(text_clean):
+        flags.add("Driving License")
+    if any(k in upper for k in VOTER_KEYWORDS) or (number_patterns and VOTER_PATTERN.match(text.strip())):
+        flags.add("Voter ID Card")
+    if any(k in upper for k in passport_keywords) or (number_patterns and PASSPORT_PATTERN.match(text.strip())):
+        flags.add("Passport")
+    return flags
+
+
+def flags_doc_type(flags):
+    for doc_type in FLAG_ORDER:
+        if doc_type in flags:
+            return doc_type
+    return UNKNOWN_DOCUMENT
+
+
+def classify_flags(raw_blocks, passport_keywords=PASSPORT_KEYWORDS, number_patterns=True):
+    flags = set()
+    for text in raw_blocks:
+        flags |= block_flags(text, passport_keywords, number_patterns)
+    return flags_doc_type(flags), {d: int(d in flags) for d in FLAG_ORDER}
+
+
+def confidence_weight(conf):
+    # OCR confidence 0-100 -> multiplier in [CONF_WEIGHT_FLOOR, 1]
+    conf = min(max(conf, 0), 100)
+    return CONF_WEIGHT_FLOOR + (1 - CONF_WEIGHT_FLOOR) * conf / 100
+
+
+def classify_document(raw_blocks, min_score=None, confidences=None):
+    # confidences: per-block OCR confidence. Each keyword's score is scaled by
+    # the confidence of the block its best match landed in, so a keyword read
+    # from noise counts for less than the same keyword read cleanly.
+    if not raw_blocks:
+        return None, {}
+    all_text = " ".join(raw_blocks).lower()
+    starts = []
+    offset = 0
+    for block in raw_blocks:
+        starts.append(offset)
+        offset += len(block) + 1
+
+    scores = {}
+    for doc, keywords in DOCUMENT_KEYWORDS.items():
+        if confidences is None:
+            score = max(fuzz.partial_ratio(all_text, kw.lower()) for kw in keywords)
+        else:
+            score = 0
+            for kw in keywords:
+                match = fuzz.partial_ratio_alignment(all_text, kw.lower())
+                block = bisect.bisect_right(starts, (match.src_start + match.src_end) // 2) - 1
+                score = max(score, round(match.score * confidence_weight(confidences[block]), 1))
+        scores[doc] = score
+    best_doc = max(scores, key=scores.get)
+    if min_score is not None and scores[best_doc] < min_score:  # "not sure"
+        return None, scores
+    return best_doc, scores
+
+
+# -----------------------------
+# Side classifiers
+# -----------------------------
+def classify_side_exact(doc_type, raw_blocks):
+    indicators = SIDE_INDICATORS.get(doc_type)
+    if indicators is None:
+        return "Unknown"
+    front, back, _ = indicators
+    all_text = " ".join(raw_blocks).upper()
+    if any(ind in all_text for ind in front) or has_number(doc_type, raw_blocks):
+        return "Front"
+    if any(ind in all_text for ind in back):
+        return "Back"
+    return "Unknown"
+
+
+def classify_side_keywords(flagged, raw_blocks):
+    # flask_ui: flagged is every type the blocks flagged, not just the winner
+    for doc_type in UI_SIDE_ORDER:
+        if doc_type in flagged:
+            front, back = UI_SIDE_KEYWORDS[doc_type]
+            blocks_upper = [b.upper() for b in raw_blocks]
+            if any(k in b for b in blocks_upper for k in front):
+                return "Front"
+            if any(k in b for b in blocks_upper for k in back):
+                return "Back"
+            return UI_UNKNOWN_SIDE
+    return UI_UNKNOWN_SIDE
+
+
+def classify_side(doc_type, raw_blocks, threshold=70):
+    indicators = FUZZY_SIDE_INDICATORS.get(doc_type)
+    if indicators is None:
+        return "Unknown"
+    front, back, _ = indicators
+    all_text = " ".join(raw_blocks).upper()
+
+    def fuzzy_in(text, inds):
+        return any(fuzz.partial_ratio(text, ind.upper()) >= threshold for ind in inds)
+
+    if fuzzy_in(all_text, front) or has_number(doc_type, raw_blocks):
+        return "Front"
+    if fuzzy_in(all_text, back):
+        return "Back"
+    return "Unknown"
+
@@ -0,0 +1,143 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# -----------------------------
+# Script detection per region
+# -----------------------------
+# Indian IDs print most labels twice, in Hindi and in English ("भारत सरकार /
+# Government of India", "पिता का नाम / Father's Name"). Read with the eng
+# model the Hindi lines come back as noise; read with hin they cost a second,
+# slower model. A box is classified before OCR from the shirorekha, the
+# headline Devanagari letters of a word hang from:
+#
+#   - ink components (Otsu, dark or light text) of about text height
+#   - a component is a Devanagari word when it is wider than tall, a
+#     horizontal opening (kernel ~0.6 x text height) survives across most of
+#     its width in its upper 40%, that band is thin and the blob isn't solid
+#     (blurred Latin words merge into filled bars)
+#   - the Devanagari share is the width of such words over all text width
+#
+# A box is "devanagari" from DEVANAGARI_SHARE up (set high: joined bold Latin
+# like "Signature" can look like a headline word, and a skipped block is lost),
+# "mixed" from MIXED_SHARE, else "latin"; "none" when there is no text-like ink.
+# About 1 ms per card line (tens of ms for a whole-page box), well under one
+# Tesseract call.
+LATIN, DEVANAGARI, MIXED, NONE = "latin", "devanagari", "mixed", "none"
+SCRIPTS = (LATIN, DEVANAGARI, MIXED, NONE)
+DEVANAGARI_SHARE = 0.8
+MIXED_SHARE = 0.15
+HEADLINE_KERNEL = 0.6       # opening length, in median text heights
+HEADLINE_BAND = 0.4         # the headline sits in this top share of the word
+HEADLINE_COVER = 0.7        # ... and spans at least this share of its width
+HEADLINE_ROWS = 0.3         # ... in at most this share of its height
+WORD_ASPECT = 1.3           # Devanagari words are at least this much wider than tall
+MAX_FILL = 0.6              # ink share of the box above which a blob is a smear, not a word
+
+# What the script stage does with Devanagari-only boxes: "read" (OCR them with
+# the hin model when installed) or "skip" (drop them; the fields we extract
+# all come from the English lines)
+DEVANAGARI_BLOCKS = os.environ.get("DEVANAGARI_BLOCKS", "read")
+DEVANAGARI_ACTIONS = ("read", "skip")
+
+# Tesseract models per script; ones that aren't installed are left out
+TESSERACT_LANGS = {LATIN: ("eng",), DEVANAGARI: ("hin",), MIXED: ("eng", "hin"), NONE: ("eng",)}
+
+_installed = None
+_installed_lock = threading.Lock()
+
+
+def ink_mask(roi):
+    gray = roi if roi.ndim == 2 else cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    if cv2.countNonZero(ink) > ink.size // 2:       # light text on a dark band
+        ink = cv2.bitwise_not(ink)
+    return ink
+
+
+def devanagari_share(roi):
+    # Share of the text width in headline words, None when there is no text
+    if roi.size == 0:
+        return None
+    ink = ink_mask(roi)
+    _, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    stats = stats[1:]
+    if len(stats) == 0:
+        return None
+    x, y, w, h, area = (stats[:, i].astype(np.int64) for i in range(5))
+    median_h = float(np.median(h))
+    text = (h >= max(6.0, 0.5 * median_h)) & (h <= 4 * median_h)
+    if not text.any():
+        return None
+
+    # Odd length: with an even kernel the anchor shifts and the opening isn't inside the ink
+    length = max(5, int(round(HEADLINE_KERNEL * np.median(h[text])))) | 1
+    opened = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (length, 1)))
+    ys, xs = np.nonzero(opened)
+    comp = labels[ys, xs].astype(np.int64) - 1
+    upper = ys < y[comp] + HEADLINE_BAND * h[comp]
+    comp, ys, xs = comp[upper], ys[upper], xs[upper]
+
+    # Columns the headline covers, and rows where it spans half the word
+    n = len(stats)
+    stride = int(max(ink.shape)) + 1
+    cover = np.bincount(np.unique(comp * stride + xs) // stride, minlength=n)
+    row_keys, row_counts = np.unique(comp * stride + ys, return_counts=True)
+    row_comp = row_keys // stride
+    full_rows = np.bincount(row_comp[row_counts >= 0.5 * w[row_comp]], minlength=n)
+
+    words = (text & (w >= WORD_ASPECT * h) & (cover >= HEADLINE_COVER * w)
+             & (full_rows <= HEADLINE_ROWS * h) & (area < MAX_FILL * w * h))
+    return float(w[words].sum()) / float(w[text].sum())
+
+
+def detect_script(roi):
+    share = devanagari_share(roi)
+    if share is None:
+        return NONE
+    if share >= DEVANAGARI_SHARE:
+        return DEVANAGARI
+    return MIXED if share >= MIXED_SHARE else LATIN
+
+
+# -----------------------------
+# Language routing
+# -----------------------------
+def installed_languages():
+    # Tesseract's traineddata, asked once per process
+    global _installed
+    if _installed is None:
+        with _installed_lock:
+            if _installed is None:
+                try:
+                    import pytesseract
+                    _installed = frozenset(pytesseract.get_languages(config=""))
+                except Exception:
+                    _installed = frozenset()
+    return _installed
+
+
+def ocr_language(script):
+    # "-l" value for a box: its script's models that are installed, else eng
+    installed = installed_languages()
+    langs = [lang for lang in TESSERACT_LANGS.get(script, ("eng",)) if lang in installed]
+    return "+".join(langs) or "eng"
+
+
+def routing_config():
+    # Everything besides a box's pixels that decides which model reads it
+    return {
+        "installed": sorted(installed_languages()),
+        "langs": TESSERACT_LANGS,
+        "devanagari_share": DEVANAGARI_SHARE,
+        "mixed_share": MIXED_SHARE,
+    }
+
+
+def with_language(config, lang):
+    # An explicit -l in the stage config wins
+    if lang == "eng" or "-l " in config:
+        return config
+    return f"{config} -l {lang}"
@@ -0,0 +1,104 @@
+import cv2
+import numpy as np
+
+from ocr_pipeline.preprocessing import resize_max_dim
+
+# -----------------------------
+# Card segmentation
+# -----------------------------
+# Scanned sheets (imgtopdf pages, aadhar_full.png) put one or more cards on a
+# plain page. We estimate the paper colour from the page border, mark every
+# pixel that is not paper, and recursively cut the page along rows/columns
+# that are (almost) all paper (XY-cut). Each remaining piece is one card.
+SEGMENT_MAX_DIM = 800
+PAPER_COLOR_TOLERANCE = 10     # max per-channel distance from the paper colour
+PAPER_BORDER_UNIFORMITY = 0.6  # share of border pixels that must look like paper
+GAP_MAX_FILL = 0.15            # a row/column with less ink than this is a gap
+MIN_GAP_FRACTION = 0.02        # gaps narrower than 2% of the page are ignored
+MIN_REGION_FRACTION = 0.05     # a card covers at least 5% of the page
+CARD_ASPECT_RANGE = (1.25, 2.3) # ID-1 cards are 1.59:1, allow for crops/skew
+PAD = 4                        # px of margin kept around each card (original scale)
+
+
+def _paper_mask(small):
+    border = np.concatenate([small[0], small[-1], small[:, 0], small[:, -1]])
+    paper = np.median(border, axis=0)
+    border_is_paper = np.all(np.abs(border.astype(np.int16) - paper) <= PAPER_COLOR_TOLERANCE, axis=1)
+    if border_is_paper.mean() < PAPER_BORDER_UNIFORMITY:
+        # The card fills the frame (a photo, not a scan) - nothing to split
+        return None
+    diff = np.abs(small.astype(np.int16) - paper.astype(np.int16)).max(axis=2)
+    ink = (diff > PAPER_COLOR_TOLERANCE).astype(np.uint8)
+    return cv2.morphologyEx(ink, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+
+
+def _gaps(profile, min_gap):
+    # (start, end) runs where the profile is below GAP_MAX_FILL
+    is_gap = np.concatenate([[False], profile < GAP_MAX_FILL, [False]])
+    edges = np.flatnonzero(np.diff(is_gap.astype(np.int8)))
+    runs = edges.reshape(-1, 2)
+    return [(s, e) for s, e in runs if e - s >= min_gap]
+
+
+def _xy_cut(ink, x, y, w, h, min_gap, min_area, out, horizontal=True, tried_other=False):
+    region = ink[y:y+h, x:x+w]
+    if region.size == 0 or region.sum() == 0:
+        return
+
+    # Trim paper around the region first
+    rows = np.flatnonzero(region.any(axis=1))
+    cols = np.flatnonzero(region.any(axis=0))
+    y, h = y + rows[0], rows[-1] - rows[0] + 1
+    x, w = x + cols[0], cols[-1] - cols[0] + 1
+    region = ink[y:y+h, x:x+w]
+
+    profile = region.mean(axis=1) if horizontal else region.mean(axis=0)
+    gaps = _gaps(profile, min_gap)
+    if not gaps:
+        if tried_other:
+            if w * h >= min_area:
+                out.append((x, y, w, h))
+            return
+        _xy_cut(ink, x, y, w, h, min_gap, min_area, out, not horizontal, True)
+        return
+
+    start = 0
+    for gap_start, gap_end in gaps + [(len(profile), len(profile))]:
+        if gap_start > start:
+            if horizontal:
+                _xy_cut(ink, x, y + start, w, gap_start - start, min_gap, min_area, out, False)
+            else:
+                _xy_cut(ink, x + start, y, gap_start - start, h, min_gap, min_area, out, True)
+        start = gap_end
+
+
+def find_document_regions(image):
+    # Returns (x, y, w, h) boxes in original image coordinates, in reading
+    # order. A page with a single card (or none found) yields the full image.
+    h, w = image.shape[:2]
+    small, scale = resize_max_dim(image, SEGMENT_MAX_DIM)
+    if small.ndim == 2:
+        small = cv2.cvtColor(small, cv2.COLOR_GRAY2BGR)
+
+    ink = _paper_mask(small)
+    if ink is None:
+        return [(0, 0, w, h)]
+
+    sh, sw = ink.shape
+    boxes = []
+    _xy_cut(ink, 0, 0, sw, sh, max(2, int(MIN_GAP_FRACTION * max(sh, sw))),
+            MIN_REGION_FRACTION * sh * sw, boxes)
+    # Pieces that are not card shaped are text strips or photos inside a
+    # single white card - in that case treat the whole image as one document
+    boxes = [b for b in boxes if CARD_ASPECT_RANGE[0] <= max(b[2], b[3]) / max(min(b[2], b[3]), 1) <= CARD_ASPECT_RANGE[1]]
+    if len(boxes) < 2:
+        return [(0, 0, w, h)]
+
+    regions = []
+    for x, y, bw, bh in boxes:
+        x0 = max(int(x / scale) - PAD, 0)
+        y0 = max(int(y / scale) - PAD, 0)
+        x1 = min(int((x + bw) / scale) + PAD, w)
+        y1 = min(int((y + bh) / scale) + PAD, h)
+        regions.append((x0, y0, x1 - x0, y1 - y0))
+    return regions
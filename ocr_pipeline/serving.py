@@ -0,0 +1,96 @@
+import os
+
+# -----------------------------
+# Production serving settings
+# -----------------------------
+# OCR is CPU bound and Tesseract runs as a child process per block, so:
+#  - one worker process per core pair keeps every core busy without the
+#    workers fighting each other,
+#  - a couple of threads per worker overlap request I/O with the Tesseract
+#    subprocess (the GIL is released while we wait on it),
+#  - OMP_THREAD_LIMIT=1 stops each Tesseract call from spawning a thread per core,
+#    and the OMP/OpenBLAS/MKL caps do the same for numpy and OpenCV. Those are
+#    read when the libraries load, so this module doesn't import numpy or cv2
+#    and serve.py applies them before loading any app.
+CPU_COUNT = os.cpu_count() or 1
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", max(2, CPU_COUNT // 2)))
+THREADS = int(os.environ.get("SERVER_THREADS", 2))
+TIMEOUT = int(os.environ.get("SERVER_TIMEOUT", 120))          # one slow scan, not /process-all
+GRACEFUL_TIMEOUT = int(os.environ.get("SERVER_GRACEFUL_TIMEOUT", 30))
+MAX_REQUESTS = int(os.environ.get("SERVER_MAX_REQUESTS", 1000))  # recycle workers, caps leaks
+BIND = os.environ.get("SERVER_BIND", "127.0.0.1:8000")
+# Engines imported (and EasyOCR's model loaded) before serving; everything
+# else is imported lazily on first use, see engines.py
+WARM_ENGINES = [e for e in os.environ.get("WARM_ENGINES", "tesseract").split(",") if e]
+
+
+NATIVE_THREAD_VARS = ("OMP_THREAD_LIMIT", "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def limit_native_threads():
+    # Must run before numpy/cv2 are imported and Tesseract starts
+    for var in NATIVE_THREAD_VARS:
+        os.environ.setdefault(var, "1")
+
+
+def warm_up_tesseract():
+    # Resolves the binary once, pages the eng model into the OS cache and
+    # lists the installed languages (scripts.py), so the first real request
+    # does not pay for it
+    import numpy as np
+    import pytesseract
+    from ocr_pipeline.scripts import installed_languages
+    try:
+        pytesseract.get_tesseract_version()
+        pytesseract.image_to_string(np.full((32, 96), 255, dtype=np.uint8), config="--psm 6")
+        installed_languages()
+    except pytesseract.TesseractNotFoundError:
+        print("Warning: tesseract binary not found, OCR requests will fail")
+
+
+def warm_up_opencv():
+    import cv2
+    import numpy as np
+    cv2.setNumThreads(1)
+    # First call of each of these initialises OpenCV's internal tables
+    img = np.zeros((64, 64), dtype=np.uint8)
+    _, thresh = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    cv2.findContours(cv2.dilate(thresh, np.ones((5, 5), np.uint8)), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+
+def warm_up_engines(names=WARM_ENGINES):
+    from ocr_pipeline import engines
+    from ocr_pipeline.ocr_engine import get_easyocr_reader
+
+    for name in names:
+        if not engines.available(name):
+            print(f"Warning: OCR engine {name} is not installed, skipping warm-up")
+            continue
+        engines.get_engine(name)
+        if name in ("easyocr", "ensemble"):
+            get_easyocr_reader()
+
+
+def warm_up():
+    warm_up_opencv()
+    warm_up_tesseract()
+    warm_up_engines()
+
+
+def gunicorn_options(**overrides):
+    options = {
+        "bind": BIND,
+        "workers": WORKERS,
+        "threads": THREADS,
+        "worker_class": "gthread",
+        "timeout": TIMEOUT,
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS // 10,
+        # Import the app, engines and compiled rules once in the master and
+        # share them copy-on-write with every forked worker
+        "preload_app": True,
+        "accesslog": "-",
+    }
+    options.update({k: v for k, v in overrides.items() if v is not None})
+    return options
@@ -0,0 +1,372 @@
+import json
+import os
+import time
+import uuid
+
+import cv2
+
+from ocr_pipeline import rules
+from ocr_pipeline.annotations import draw_boxes, save_annotation, sidecar_path
+from ocr_pipeline.engines import get_engine
+from ocr_pipeline.fields import FATHER_KEY, extract_fields, summary_from_fields
+from ocr_pipeline.near_duplicates import PHASH_RADIUS, get_duplicate_index, image_hashes
+from ocr_pipeline.ocr_engine import REOCR_THRESHOLD, is_name_label, ocr_block
+from ocr_pipeline.passbook import iter_rows
+from ocr_pipeline.pipeline import Pipeline, PipelineError
+from ocr_pipeline.preprocessing import image_cache_key, preprocess as preprocess_image
+from ocr_pipeline.regions import COLUMN_GAP, MIN_REGION_SIDE, find_regions, line_ids, line_segments, scale_regions
+from ocr_pipeline.results_store import get_store
+from ocr_pipeline.scripts import (DEVANAGARI, DEVANAGARI_ACTIONS, DEVANAGARI_BLOCKS, SCRIPTS, detect_script,
+                                  ocr_language, routing_config, with_language)
+
+
+
+# -----------------------------
+# ingest
+# -----------------------------
+def ingest(ctx):
+    image_path = ctx["image_path"]
+    image = cv2.imread(image_path)
+    if image is None:
+        raise PipelineError(f"Could not read image: {image_path}")
+    ctx["image"] = image
+    ctx["emit"]("decoded", {"width": image.shape[1], "height": image.shape[0]})
+
+
+# -----------------------------
+# dedupe
+# -----------------------------
+def dedupe(ctx, action="return", radius=PHASH_RADIUS, source=None, outputs=None):
+    # Perceptual-hash lookup against stored results before any OCR. "return"
+    # answers with the stored result and ends the run, "flag" only marks it.
+    # source: the store source this pipeline persists under, so a stored
+    # result always has this app's output shape. outputs: the FileStore the
+    # stored processed_image lives in, checked (and touched) before reuse
+    image = ctx["image"] if ctx.get("image") is not None else cv2.imread(ctx["image_path"])
+    ctx["image_hashes"] = image_hashes(image)
+    match = get_duplicate_index().find(ctx["image_hashes"], radius, source)
+    if match is None:
+        return
+    stored = get_store().get(match["result_id"])
+    if stored is None:
+        return
+    ctx["near_duplicate"] = dict(match, filename=stored.get("filename"))
+    ctx["emit"]("near_duplicate", ctx["near_duplicate"])
+    if action == "return":
+        filename = os.path.basename(ctx["image_path"]) if ctx.get("image_path") else None
+        ctx["output_data"] = dict(stored, filename=filename, near_duplicate_of=ctx["near_duplicate"])
+        if outputs is not None and not _output_exists(outputs, stored.get("processed_image")):
+            # Evicted since it was stored: don't hand out a name that 404s
+            ctx["output_data"]["processed_image"] = None
+        ctx["done"] = True
+
+
+def _output_exists(outputs, image_name):
+    if not image_name:
+        return False
+    return bool(outputs.lookup(image_name) or outputs.lookup(os.path.basename(sidecar_path("", image_name))))
+
+
+# -----------------------------
+# preprocess
+# -----------------------------
+def preprocess(ctx, profile="fast"):
+    cache_key = image_cache_key(ctx["image_path"]) if ctx.get("image_path") else None
+    ctx["prep"] = preprocess_image(ctx["image"], profile, cache_key=cache_key)
+
+
+# -----------------------------
+# segment
+# -----------------------------
+def segment(ctx, method="contours", order="lines", min_side=MIN_REGION_SIDE, drop_nested=False, merge_gap=None):
+    # Blobs of the dilated mask as one array, filtered and ordered (regions.py)
+    prep = ctx["prep"]
+    ctx["regions"] = find_regions(prep["dilated"], method, min_side=min_side, drop_nested=drop_nested,
+                                  merge_gap=merge_gap, order=order)
+    boxes = [tuple(b) for b in scale_regions(ctx["regions"], prep["scale"]).tolist()]
+    ctx["boxes"] = boxes
+    ctx["emit"]("contours", {"count": len(boxes)})
+
+
+# -----------------------------
+# layout
+# -----------------------------
+def layout(ctx, ocr_lines=True, column_gap=COLUMN_GAP):
+    # Groups the segment blobs into lines and column segments (regions.py).
+    # ocr_lines: OCR each line segment as one region instead of its fragments,
+    # so "Name" and its value come back as one block, with fewer OCR calls.
+    regions = ctx["regions"]
+    segments, line_boxes = line_segments(regions, line_ids(regions), column_gap)
+    ctx["line_regions"] = line_boxes
+    ctx["line_members"] = segments
+    if ocr_lines:
+        ctx["boxes"] = [tuple(b) for b in scale_regions(line_boxes, ctx["prep"]["scale"]).tolist()]
+    ctx["emit"]("lines", {"count": len(line_boxes), "blobs": len(regions)})
+
+
+# -----------------------------
+# script
+# -----------------------------
+def script(ctx, devanagari=DEVANAGARI_BLOCKS):
+    # Script of every box (scripts.py), so the ocr stage reads it with the
+    # matching model. devanagari="skip" drops Hindi-only boxes before OCR,
+    # for callers that only want the English fields.
+    if devanagari not in DEVANAGARI_ACTIONS:
+        raise ValueError(f"Unknown Devanagari action: {devanagari}")
+    image = ctx["image"]
+    scripts = [detect_script(image[y:y+h, x:x+w]) for x, y, w, h in ctx["boxes"]]
+    skipped = []
+    if devanagari == "skip":
+        skipped = [box for box, s in zip(ctx["boxes"], scripts) if s == DEVANAGARI]
+        ctx["boxes"] = [box for box, s in zip(ctx["boxes"], scripts) if s != DEVANAGARI]
+        scripts = [s for s in scripts if s != DEVANAGARI]
+    ctx["scripts"] = scripts
+    ctx["skipped_boxes"] = skipped
+    counts = {name: scripts.count(name) for name in SCRIPTS}
+    ctx["emit"]("scripts", dict(counts, skipped=len(skipped)))
+
+
+# Cached OCR reads depend on the routing config and which models are installed
+script.artifact_inputs = routing_config
+
+
+# -----------------------------
+# ocr
+# -----------------------------
+EMPTY_READ = {"text": "", "conf": 0.0, "lines": [], "words": []}
+
+
+def read_roi(roi, engine, config, reocr, reocr_threshold, after_label=False):
+    # Tesseract gets the weak-line retries; other engines come from the registry
+    if engine == "tesseract":
+        return ocr_block(roi, config, reocr=reocr, threshold=reocr_threshold, after_label=after_label)
+    return dict(get_engine(engine)(roi, config) or EMPTY_READ, reocr=None)
+
+
+def ocr(ctx, config="--psm 6", keep_empty=False, reocr=True, reocr_threshold=REOCR_THRESHOLD, engine="tesseract"):
+    # Per-block text plus word/line confidences; weak ID/name blocks get re-OCR'd.
+    # engine="ensemble" merges Tesseract and EasyOCR reads instead. Boxes the
+    # script stage found Hindi in are read with hin (eng+hin when mixed) if
+    # that model is installed; the re-OCR heuristics only know English lines.
+    image = ctx["image"]
+    scripts = ctx.get("scripts")
+    blocks, block_boxes, details = [], [], []
+    after_label = False
+    # The count the "block" events that follow add up to (UI progress)
+    ctx["emit"]("ocr_start", {"count": len(ctx["boxes"])})
+    for index, (x, y, w, h) in enumerate(ctx["boxes"]):
+        roi = image[y:y+h, x:x+w]
+        lang = ocr_language(scripts[index]) if scripts else "eng"
+        result = read_roi(roi, engine, with_language(config, lang), reocr and lang == "eng", reocr_threshold,
+                          after_label)
+        text = result["text"].strip()
+        # A "Name" box in line mode, its value in the next box
+        after_label = bool(text) and is_name_label(text.splitlines()[-1])
+        ctx["emit"]("block", {"index": index, "box": [x, y, w, h], "text": text, "conf": result["conf"]})
+        if text or keep_empty:
+            blocks.append(text)
+            block_boxes.append((x, y, w, h))
+            details.append(dict({k: result[k] for k in ("conf", "lines", "words", "reocr")}, lang=lang))
+    ctx["blocks"] = blocks
+    ctx["block_boxes"] = block_boxes
+    ctx["block_details"] = details
+
+
+# -----------------------------
+# classify
+# -----------------------------
+def classify_flags(ctx, passport_keywords=rules.PASSPORT_KEYWORDS, number_patterns=True, side="indicators"):
+    # Keyword flags, first match in rules.FLAG_ORDER wins. side="indicators":
+    # exact side indicators of that type, "keywords": flask_ui's per-flag lists
+    doc_type, flags = rules.classify_flags(ctx["blocks"], passport_keywords, number_patterns)
+    ctx["doc_type"] = doc_type
+    ctx["scores"] = None
+    if side == "keywords":
+        ctx["side"] = rules.classify_side_keywords({d for d, on in flags.items() if on}, ctx["blocks"])
+    else:
+        ctx["side"] = rules.classify_side_exact(doc_type, ctx["blocks"])
+
+
+def classify_fuzzy(ctx, min_score=None):
+    # rapidfuzz keyword scores, fuzzy side indicators
+    confidences = [d["conf"] for d in ctx["block_details"]] if ctx.get("block_details") else None
+    doc_type, scores = rules.classify_document(ctx["blocks"], min_score=min_score, confidences=confidences)
+    ctx["doc_type"] = doc_type
+    ctx["scores"] = scores
+    ctx["side"] = rules.classify_side(doc_type, ctx["blocks"]) if doc_type else None
+
+
+# -----------------------------
+# extract
+# -----------------------------
+def extract(ctx, side_key="side", include_scores=True, not_predicted_error=False, other_details=False,
+            father_key=FATHER_KEY):
+    doc_type = ctx["doc_type"]
+    filename = os.path.basename(ctx["image_path"]) if ctx.get("image_path") else None
+    ctx["emit"]("side", {"document_type": doc_type, side_key or "side": ctx["side"]})
+
+    if doc_type is None and not_predicted_error:
+        ctx["summary"] = None
+        ctx["output_data"] = {
+            "filename": filename,
+            "raw_detected_text": ctx["blocks"],
+            "document_type": None,
+            "side": None,
+            "error": "Not Predicted"
+        }
+        return
+
+    # One scored value per field from label/value geometry; the checksum-
+    # validated ID (O->0, I->1 ... corrected) fills "number"
+    ctx["fields"], id_number = extract_fields(ctx["blocks"], ctx["block_boxes"], doc_type, ctx.get("block_details"))
+    ctx["summary"] = summary_from_fields(ctx["fields"], doc_type, father_key)
+    if other_details:
+        ctx["summary"]["Other Details"] = [b.strip() for b in ctx["blocks"] if len(b.strip()) > 2]
+
+    output_data = {
+        "filename": filename,
+        "raw_detected_text": ctx["blocks"],
+        "cleaned_summary": ctx["summary"],
+        "document_type": doc_type,
+    }
+    if side_key:
+        output_data[side_key] = ctx["side"]
+    output_data["fields"] = ctx["fields"]
+    output_data["id_number"] = id_number
+    if include_scores and ctx.get("scores") is not None:
+        output_data["fuzzy_scores"] = ctx["scores"]
+    if ctx.get("block_details"):
+        output_data["block_confidence"] = [d["conf"] for d in ctx["block_details"]]
+        output_data["reocr_blocks"] = sum(1 for d in ctx["block_details"] if d["reocr"])
+    if "prep" in ctx:
+        output_data["preprocess_profile"] = ctx["prep"]["profile"]
+    if ctx.get("near_duplicate"):
+        output_data["near_duplicate_of"] = ctx["near_duplicate"]
+    ctx["output_data"] = output_data
+
+
+# -----------------------------
+# table
+# -----------------------------
+def table(ctx, doc_types=("Bank Passbook",)):
+    # Transaction rows for passbook pages, read cell by cell from the ruled
+    # table instead of the contour blocks; each row is emitted as it is read
+    if ctx["doc_type"] not in doc_types or ctx.get("output_data") is None:
+        return
+    # A cache hit restores only the profile name: iter_rows thresholds again
+    prep = ctx.get("prep") or {}
+    image = ctx["image"] if ctx.get("image") is not None else cv2.imread(ctx["image_path"])
+    rows = []
+    for row in iter_rows(image, prep.get("binary"), prep.get("scale", 1.0)):
+        rows.append(row)
+        ctx["emit"]("transaction", row)
+    ctx["transactions"] = rows
+    ctx["output_data"]["transactions"] = rows
+    ctx["output_data"]["balance_mismatches"] = sum(1 for r in rows if r["balance_ok"] is False)
+
+
+# -----------------------------
+# persist
+# -----------------------------
+def annotated_image(ctx):
+    # The image isn't decoded when OCR came from the artifact cache
+    image = ctx["image"].copy() if ctx.get("image") is not None else cv2.imread(ctx["image_path"])
+    return draw_boxes(image, ctx.get("boxes", []))
+
+
+def _save_image(ctx, output_folder, image_name, lazy_image):
+    # lazy_image: write only the boxes sidecar (and a copy of the source), the
+    # image is drawn when served. Returns the names of the files written.
+    if lazy_image and ctx.get("image_path"):
+        return [os.path.basename(p) for p in
+                save_annotation(output_folder, image_name, ctx["image_path"], ctx.get("boxes", []))]
+    cv2.imwrite(os.path.join(output_folder, image_name), annotated_image(ctx))
+    if os.path.exists(sidecar_path(output_folder, image_name)):
+        os.remove(sidecar_path(output_folder, image_name))
+    return [image_name]
+
+
+def _store(ctx, store_source):
+    if store_source:
+        result_id = get_store().add(ctx["output_data"], source=store_source)
+        if result_id is not None and ctx.get("image_hashes"):
+            get_duplicate_index().add(result_id, ctx["image_hashes"])
+
+
+def persist_timestamped(ctx, output_folder, save_image=True, store_source=None, lazy_image=False):
+    # <name>_<YYYYmmdd_HHMMSS>.json and _output.jpg (just.py, document_*, fuzzy_front_back)
+    ts = time.strftime("%Y%m%d_%H%M%S")
+    os.makedirs(output_folder, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(ctx["image_path"]))[0] + ctx.get("name_suffix", "")
+    with open(os.path.join(output_folder, f"{base_name}_{ts}.json"), "w", encoding="utf-8") as f:
+        json.dump(ctx["output_data"], f, ensure_ascii=False, indent=4)
+    if save_image:
+        _save_image(ctx, output_folder, f"{base_name}_{ts}_output.jpg", lazy_image)
+    _store(ctx, store_source)
+
+
+def persist_named(ctx, output_folder, store_source=None, lazy_image=False):
+    # <name>.json and _output.jpg, overwritten on every run (document_type_detection)
+    os.makedirs(output_folder, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(ctx["image_path"]))[0]
+    _save_image(ctx, output_folder, f"{base_name}_output.jpg", lazy_image)
+    with open(os.path.join(output_folder, f"{base_name}.json"), "w", encoding="utf-8") as f:
+        json.dump(ctx["output_data"], f, ensure_ascii=False, indent=4)
+    _store(ctx, store_source)
+
+
+def persist_unique(ctx, output_folder, store_source=None, lazy_image=False, storage=None):
+    # <name>_<uuid8>.json and _output.jpg, file name returned as processed_image (flask_ui).
+    # With a FileStore they go to its sharded layout as one group, else output_folder.
+    unique_id = str(uuid.uuid4())[:8]
+    base_name = os.path.splitext(os.path.basename(ctx["image_path"]))[0]
+    group = f"{base_name}_{unique_id}"
+    names = [f"{group}.json", f"{group}_output.jpg"]
+    folder = os.path.dirname(storage.path_for(names[0], group)) if storage is not None else output_folder
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, names[0]), "w", encoding="utf-8") as f:
+        json.dump(ctx["output_data"], f, ensure_ascii=False, indent=4)
+    written = _save_image(ctx, folder, names[1], lazy_image)
+    ctx["output_data"]["processed_image"] = names[1]
+    if storage is not None:
+        for name in [names[0]] + written:
+            storage.add(name, group)
+    _store(ctx, store_source)
+
+
+def persist_by_prediction(ctx, predicted_folder, not_predicted_folder, store_source=None):
+    # <file>.json into predicted / not_predicted (multiimage_extraction)
+    folder = predicted_folder if ctx["output_data"].get("document_type") else not_predicted_folder
+    os.makedirs(folder, exist_ok=True)
+    ctx["result_path"] = os.path.join(folder, f"{os.path.basename(ctx['image_path'])}.json")
+    with open(ctx["result_path"], "w", encoding="utf-8") as f:
+        json.dump(ctx["output_data"], f, indent=4, ensure_ascii=False)
+    _store(ctx, store_source)
+
+
+def no_persist(ctx):
+    pass
+
+
+# -----------------------------
+# Standard pipeline
+# -----------------------------
+def build_pipeline(classify=classify_fuzzy, classify_config=None, profile="fast", ocr_config=None,
+                   extract_config=None, persist=no_persist, persist_config=None, cache=None, dedupe_action=None,
+                   segment_config=None, layout_config=None, script_config=None):
+    # dedupe_action: None (no near-duplicate lookup), "return" or "flag"
+    return Pipeline([
+        ("ingest", ingest),
+        *([("dedupe", dedupe, {"action": dedupe_action, "source": (persist_config or {}).get("store_source"),
+                               "outputs": (persist_config or {}).get("storage")})]
+          if dedupe_action else []),
+        ("preprocess", preprocess, {"profile": profile}),
+        ("segment", segment, segment_config or {}),
+        ("layout", layout, layout_config or {}),
+        ("script", script, script_config or {}),
+        ("ocr", ocr, ocr_config or {}),
+        ("classify", classify, classify_config or {}),
+        ("extract", extract, extract_config or {}),
+        ("table", table),
+        ("persist", persist, persist_config or {}),
+    ], cache=cache)
@@ -0,0 +1,242 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# -----------------------------
+# Managed file storage (uploads / outputs)
+# -----------------------------
+# Files are laid out by hash prefix so no directory grows past a few thousand
+# entries:
+#
+#   <root>/<h[:2]>/<h[2:4]>/<name>      h = sha1(group), group defaults to name
+#
+# Files that belong together (an extraction's JSON and annotation sidecar)
+# share a group and so a directory, and are evicted together. Every file is
+# recorded in an SQLite index (<root>/index.sqlite) with its size and last
+# access, so lookups, totals and eviction never list a directory. A sweeper
+# thread per process enforces the quota: groups untouched for longer than
+# max_age go first, then the least recently used until the total is under
+# max_bytes.
+#
+#   python -m ocr_pipeline.storage stats flask_ui/uploads
+#   python -m ocr_pipeline.storage adopt flask_ui/uploads     (index flat legacy files)
+#   python -m ocr_pipeline.storage sweep flask_ui/outputs --max-gb 5 --max-days 30
+INDEX_NAME = "index.sqlite"
+SWEEP_INTERVAL = float(os.environ.get("STORAGE_SWEEP_SECONDS", 300))
+TOUCH_INTERVAL = 60.0          # accessed_at is rewritten at most once a minute per file
+EVICT_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    grp TEXT,
+    path TEXT,
+    size INTEGER,
+    created_at REAL,
+    accessed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_files_grp ON files (grp);
+CREATE INDEX IF NOT EXISTS idx_files_accessed ON files (accessed_at);
+"""
+
+
+def env_quota(prefix):
+    # <PREFIX>_MAX_GB / <PREFIX>_MAX_DAYS -> (max_bytes, max_age seconds), None when unset
+    max_gb = os.environ.get(f"{prefix}_MAX_GB")
+    max_days = os.environ.get(f"{prefix}_MAX_DAYS")
+    return (
+        int(float(max_gb) * 1024 ** 3) if max_gb else None,
+        float(max_days) * 86400 if max_days else None,
+    )
+
+
+class FileStore:
+    def __init__(self, root, max_bytes=None, max_age=None, sweep_interval=SWEEP_INTERVAL):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self.db_path = os.path.join(root, INDEX_NAME)
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    # SQLite connections and threads don't survive a fork: reopen per process
+    def _db(self):
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._pid = os.getpid()
+            self._sweeper = None
+        return self._conn
+
+    def _ensure_sweeper(self):
+        if (self.max_bytes is None and self.max_age is None) or self.sweep_interval <= 0:
+            return
+        if self._sweeper is None or not self._sweeper.is_alive():
+            self._sweeper = threading.Thread(target=self._sweep_loop, daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Storage sweep of {self.root} failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+    # -----------------------------
+    # Layout + index
+    # -----------------------------
+    def path_for(self, name, group=None):
+        # Where <name> lives; creates the shard directory
+        digest = hashlib.sha1((group or name).encode("utf-8")).hexdigest()
+        folder = os.path.join(self.root, digest[:2], digest[2:4])
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, name)
+
+    def add(self, name, group=None, path=None):
+        # Record a file already written at path_for(name, group)
+        path = path or self.path_for(name, group)
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            self._ensure_sweeper()
+            conn.execute(
+                "INSERT OR REPLACE INTO files (name, grp, path, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (name, group or name, os.path.relpath(path, self.root), os.path.getsize(path), now, now),
+            )
+            conn.commit()
+        return path
+
+    def save(self, name, file_storage, group=None):
+        # Werkzeug FileStorage (or anything with .save(path)) into the store
+        path = self.path_for(name, group)
+        file_storage.save(path)
+        return self.add(name, group, path)
+
+    def lookup(self, name):
+        # Absolute path of a stored file, or None. Flat files from before the
+        # store existed are still found at <root>/<name>.
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            self._ensure_sweeper()
+            row = conn.execute("SELECT path, accessed_at FROM files WHERE name = ?", (name,)).fetchone()
+            if row is not None and now - row[1] > TOUCH_INTERVAL:
+                conn.execute("UPDATE files SET accessed_at = ? WHERE name = ?", (now, name))
+                conn.commit()
+        if row is not None:
+            return os.path.join(self.root, row[0])
+        legacy = os.path.join(self.root, os.path.basename(name))
+        return legacy if os.path.basename(name) == name and os.path.isfile(legacy) else None
+
+    def names(self, limit=None):
+        with self._lock:
+            sql = "SELECT name FROM files ORDER BY created_at DESC"
+            rows = self._db().execute(sql + (" LIMIT ?" if limit else ""), (limit,) if limit else ()).fetchall()
+        return [r[0] for r in rows]
+
+    def usage(self):
+        with self._lock:
+            count, size = self._db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+        return {"files": count, "bytes": size}
+
+    # -----------------------------
+    # Eviction
+    # -----------------------------
+    def _evict_groups(self, groups):
+        removed = 0
+        with self._lock:
+            conn = self._db()
+            for group in groups:
+                for (path,) in conn.execute("SELECT path FROM files WHERE grp = ?", (group,)).fetchall():
+                    try:
+                        os.remove(os.path.join(self.root, path))
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+                conn.execute("DELETE FROM files WHERE grp = ?", (group,))
+            conn.commit()
+        return removed
+
+    def sweep(self, now=None):
+        # Returns the number of files removed
+        now = now or time.time()
+        removed = 0
+        if self.max_age is not None:
+            while True:
+                with self._lock:
+                    groups = [g for (g,) in self._db().execute(
+                        "SELECT grp FROM files GROUP BY grp HAVING MAX(accessed_at) < ? LIMIT ?",
+                        (now - self.max_age, EVICT_BATCH),
+                    ).fetchall()]
+                if not groups:
+                    break
+                removed += self._evict_groups(groups)
+
+        if self.max_bytes is not None:
+            while True:
+                excess = self.usage()["bytes"] - self.max_bytes
+                if excess <= 0:
+                    break
+                with self._lock:
+                    rows = self._db().execute(
+                        "SELECT grp, SUM(size) FROM files GROUP BY grp ORDER BY MAX(accessed_at) LIMIT ?",
+                        (EVICT_BATCH,),
+                    ).fetchall()
+                victims = []
+                for group, size in rows:
+                    victims.append(group)
+                    excess -= size
+                    if excess <= 0:
+                        break
+                if not victims:
+                    break
+                removed += self._evict_groups(victims)
+        return removed
+
+    def adopt(self):
+        # One-time migration: move flat files in root into the sharded layout
+        moved = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith(INDEX_NAME):
+                    continue
+                target = self.path_for(entry.name)
+                os.replace(entry.path, target)
+                self.add(entry.name, path=target)
+                moved += 1
+        return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Managed upload/output storage")
+    parser.add_argument("command", choices=["stats", "adopt", "sweep"])
+    parser.add_argument("root")
+    parser.add_argument("--max-gb", type=float)
+    parser.add_argument("--max-days", type=float)
+    args = parser.parse_args()
+
+    store = FileStore(
+        args.root,
+        max_bytes=int(args.max_gb * 1024 ** 3) if args.max_gb else None,
+        max_age=args.max_days * 86400 if args.max_days else None,
+        sweep_interval=0,
+    )
+    if args.command == "adopt":
+        print(f"Moved {store.adopt()} files into {args.root}")
+    elif args.command == "sweep":
+        print(f"Removed {store.sweep()} files")
+    print(store.usage())
@@ -0,0 +1,102 @@
+import os
+import queue
+import threading
+import time
+
+try:
+    # inotify (Linux) / FSEvents / ReadDirectoryChangesW through watchdog, if installed
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# -----------------------------
+# Incremental folder watcher
+# -----------------------------
+# Rescans the folder through the manifest (stat-only for unchanged files) and
+# queues only new or modified images. With watchdog installed a filesystem
+# event triggers the rescan straight away, otherwise we poll.
+POLL_INTERVAL = 5.0
+SETTLE_SECONDS = 1.0   # skip files modified this recently, they may still be copying
+
+
+class _RescanTrigger(FileSystemEventHandler):
+    def __init__(self, wake):
+        self.wake = wake
+
+    def on_any_event(self, event):
+        if not event.is_directory:
+            self.wake.set()
+
+
+class FolderWatcher:
+    def __init__(self, folder, manifest, handler, workers=1, poll_interval=POLL_INTERVAL):
+        # handler(image_path) -> (status, result_path)
+        self.folder = folder
+        self.manifest = manifest
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.jobs = queue.Queue()
+        self._queued = set()
+        self._queued_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._observer = None
+
+    def enqueue_changes(self):
+        now = time.time()
+        added = 0
+        for path, sha1 in self.manifest.scan(self.folder):
+            if now - os.path.getmtime(path) < SETTLE_SECONDS:
+                continue
+            with self._queued_lock:
+                if path in self._queued:
+                    continue
+                self._queued.add(path)
+            self.jobs.put((path, sha1))
+            added += 1
+        return added
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                path, sha1 = self.jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                status, result_path = self.handler(path)
+                self.manifest.mark_done(path, sha1, status, result_path)
+            except Exception as e:
+                print(f"Failed to process {path}: {e}")
+            finally:
+                with self._queued_lock:
+                    self._queued.discard(path)
+                self.jobs.task_done()
+
+    def _scanner(self):
+        while not self._stop.is_set():
+            self.enqueue_changes()
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def start(self):
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(_RescanTrigger(self._wake), self.folder, recursive=False)
+            self._observer.start()
+        for target in [self._scanner] + [self._worker] * self.workers:
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        for t in self._threads:
+            t.join()
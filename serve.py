@@ -0,0 +1,90 @@
+# Production entry point for the OCR apps.
+#
+#   python serve.py fuzzy_front_back --workers 4 --threads 2 --bind 0.0.0.0:8000
+#
+# Uses gunicorn (pre-fork workers, app preloaded in the master) when it is
+# installed, waitress on Windows, and the threaded Werkzeug server without
+# debug/reloader as a last resort. The app modules keep their own
+# `app.run(debug=True)` for local development.
+import argparse
+import importlib.util
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+from ocr_pipeline import serving
+
+# Thread caps first: numpy/cv2 read them when they load, i.e. with the app
+serving.limit_native_threads()
+
+# name -> app module, relative to the repo root
+APPS = {
+    "flask_ui": "flask_ui/app.py",
+    "fuzzy_front_back": "fuzzy_front_back/app.py",
+    "multiimage_extraction": "multiimage_extraction/app.py",
+    "ocr_accuracy": "ocr_accuracy/app.py",
+    "document_side_detection": "document_side_detection/app.py",
+    "document_type_detection": "document_type_detection/app.py",
+    "just": "just.py",
+}
+
+
+def load_app(name):
+    # Every folder has its own app.py, so load them under distinct module names
+    path = os.path.join(BASE_DIR, APPS[name])
+    sys.path.insert(0, os.path.dirname(path))
+    spec = importlib.util.spec_from_file_location(f"{name}_app", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module.create_app()
+
+
+def run_gunicorn(name, options):
+    from gunicorn.app.base import BaseApplication
+
+    class OCRApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app(name)
+
+    OCRApplication().run()
+
+
+def run_fallback(name, options):
+    host, port = options["bind"].rsplit(":", 1)
+    app = load_app(name)
+    try:
+        from waitress import serve
+        serve(app, host=host, port=int(port), threads=options["workers"] * options["threads"],
+              channel_timeout=options["timeout"])
+    except ImportError:
+        print("gunicorn/waitress not installed, using the threaded Werkzeug server")
+        app.run(host=host, port=int(port), debug=False, use_reloader=False, threaded=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve an OCR app in production mode")
+    parser.add_argument("app", choices=sorted(APPS))
+    parser.add_argument("--bind")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads", type=int)
+    parser.add_argument("--timeout", type=int)
+    args = parser.parse_args()
+
+    options = serving.gunicorn_options(
+        bind=args.bind, workers=args.workers, threads=args.threads, timeout=args.timeout
+    )
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        gunicorn = None
+
+    if gunicorn is not None:
+        run_gunicorn(args.app, options)
+    else:
+        run_fallback(args.app, options)
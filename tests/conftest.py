@@ -0,0 +1,76 @@
+import importlib.util
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Keep every store the pipeline opens out of the repo root
+_tmp = tempfile.mkdtemp(prefix="ocr-tests-")
+os.environ.setdefault("ARTIFACT_CACHE", "off")
+os.environ.setdefault("RESULTS_DB", os.path.join(_tmp, "results.sqlite"))
+os.environ.setdefault("IMAGE_BLOB_DIR", os.path.join(_tmp, "image_blobs"))
+os.environ.setdefault("PROFILE_DIR", os.path.join(_tmp, "profiles"))
+# Every test client comes from 127.0.0.1, don't rate limit it
+os.environ.setdefault("ADMISSION_BURST", "100000")
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+# What the fake Tesseract reads in every box: (word, conf, line number)
+FAKE_WORDS = [("INCOME", 90), ("TAX", 91), ("DEPARTMENT", 92)], [("ABCDE1234F", 85)]
+
+
+@pytest.fixture
+def fake_tesseract(monkeypatch):
+    # image_to_data without a Tesseract install; boxes too small to hold a
+    # line read as empty
+    pytesseract = pytest.importorskip("pytesseract")
+    calls = []
+
+    def image_to_data(roi, config="", output_type=None):
+        calls.append(config)
+        if roi.shape[0] <= 20:
+            return {"text": [""], "conf": [-1], "block_num": [0], "par_num": [0], "line_num": [0]}
+        words = [(w, c, n) for n, line in enumerate(FAKE_WORDS, 1) for w, c in line]
+        return {"text": [w for w, _, _ in words], "conf": [c for _, c, _ in words],
+                "block_num": [1] * len(words), "par_num": [1] * len(words), "line_num": [n for _, _, n in words]}
+
+    monkeypatch.setattr(pytesseract, "image_to_data", image_to_data)
+    return calls
+
+
+def load_app(relative_path, name):
+    # Import an app module from its file, as serve.py does
+    path = os.path.join(ROOT, relative_path)
+    sys.path.insert(0, os.path.dirname(path))
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def flask_ui(monkeypatch, tmp_path):
+    # flask_ui with its uploads under tmp_path and nothing persisted
+    from ocr_pipeline import stages
+    from ocr_pipeline.storage import FileStore
+
+    module = load_app("flask_ui/app.py", "flask_ui_app")
+    monkeypatch.setattr(module, "upload_store", FileStore(str(tmp_path / "uploads")))
+    monkeypatch.setattr(module, "pipeline", module.pipeline.without("dedupe").replace("persist", stages.no_persist))
+    return module
+
+
+@pytest.fixture
+def card_image(tmp_path):
+    # A white card with three dark text lines, as PNG
+    import cv2
+    import numpy as np
+
+    image = np.full((240, 480, 3), 255, np.uint8)
+    for n, text in enumerate(["INCOME TAX DEPARTMENT", "RAHUL KUMAR", "ABCDE1234F"]):
+        cv2.putText(image, text, (20, 60 + 60 * n), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+    path = str(tmp_path / "card.png")
+    cv2.imwrite(path, image)
+    return path
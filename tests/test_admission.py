@@ -0,0 +1,134 @@
+import threading
+import time
+import types
+
+import pytest
+from flask import Flask
+
+from ocr_pipeline import admission
+from ocr_pipeline.admission import Admission, LocalBuckets, Rejected
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def lanes(**overrides):
+    config = {
+        "interactive": {"priority": 0, "max_in_flight": 2, "slo": 10.0, "max_queue": 4, "cost": 1.0},
+        "batch": {"priority": 1, "max_in_flight": 1, "slo": 10.0, "max_queue": 2, "cost": 1.0},
+    }
+    for lane, values in overrides.items():
+        config[lane] = dict(config[lane], **values)
+    return config
+
+
+def test_bucket_allows_a_burst_then_refills(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    buckets = LocalBuckets(rate=2.0, burst=3.0)
+    assert [buckets.take("a") for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("a") == pytest.approx(0.5)
+    assert buckets.take("b") == 0       # per client
+    clock.now += 1.0
+    assert buckets.take("a", cost=2.0) == 0
+    assert buckets.take("a", cost=5.0) == pytest.approx(2.5)
+
+
+def test_buckets_keep_only_the_most_recent_clients():
+    buckets = LocalBuckets(rate=1.0, burst=1.0, max_clients=2)
+    for client in ("a", "b", "c"):
+        buckets.take(client)
+    assert list(buckets._buckets) == ["b", "c"]
+    assert buckets.take("a") == 0       # forgotten, so a full bucket again
+
+
+def test_rate_limited_client_gets_429_with_retry_after():
+    gate = Admission(slots=2, lanes=lanes(), buckets=LocalBuckets(rate=0.5, burst=1.0))
+    gate.release("interactive", gate.acquire("interactive", "a"))
+    with pytest.raises(Rejected) as e:
+        gate.acquire("interactive", "a")
+    assert (e.value.status, e.value.retry_after) == (429, 2)
+
+
+def test_batch_is_capped_and_shed_when_over_its_slo():
+    gate = Admission(slots=2, lanes=lanes(batch={"slo": 0.5}), buckets=LocalBuckets(burst=100))
+    started = gate.acquire("batch", "a")
+    with pytest.raises(Rejected) as e:
+        gate.acquire("batch", "b")      # one mean service time (1 s) > 0.5 s SLO
+    assert e.value.status == 503
+    # the other slot is still open to interactive requests
+    gate.release("interactive", gate.acquire("interactive", "c"))
+    gate.release("batch", started)
+    assert gate.stats()["batch"]["in_flight"] == 0
+
+
+def test_freed_slot_goes_to_interactive_before_batch():
+    gate = Admission(slots=1, lanes=lanes(), buckets=LocalBuckets(burst=100))
+    held = gate.acquire("interactive", "a")
+    order = []
+
+    def wait_for(lane):
+        started = gate.acquire(lane, lane)
+        order.append(lane)
+        gate.release(lane, started)
+
+    threads = [threading.Thread(target=wait_for, args=(lane,)) for lane in ("batch", "interactive")]
+    for thread in threads:
+        thread.start()
+        while sum(s["queued"] for s in gate.stats().values()) < threads.index(thread) + 1:
+            time.sleep(0.001)
+    gate.release("interactive", held)
+    for thread in threads:
+        thread.join(5)
+    assert order == ["interactive", "batch"]
+
+
+def test_admit_holds_the_slot_until_the_response_closes(monkeypatch):
+    gate = Admission(slots=1, lanes=lanes(interactive={"max_in_flight": 1, "slo": 0.1}),
+                     buckets=LocalBuckets(burst=100))
+    monkeypatch.setattr(admission, "_default", gate)
+    app = Flask(__name__)
+    app.add_url_rule("/work", "work", admission.admit("interactive")(lambda: "ok"))
+    client = app.test_client()
+
+    first = client.get("/work")
+    assert first.status_code == 200
+    busy = client.get("/work")
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == "1"
+    busy.close()
+    first.close()
+    again = client.get("/work")
+    assert again.status_code == 200
+    again.close()
+
+
+def test_client_is_the_address_unless_the_key_is_configured(monkeypatch):
+    monkeypatch.setattr(admission, "API_KEYS", frozenset({"partner-1"}))
+    app = Flask(__name__)
+    env = {"REMOTE_ADDR": "10.0.0.7"}
+    with app.test_request_context(headers={"X-API-Key": "made-up-123"}, environ_base=env):
+        assert admission.client_id() == "10.0.0.7"
+    with app.test_request_context(headers={"X-API-Key": "partner-1"}, environ_base=env):
+        assert admission.client_id() == "key:partner-1"
+    with app.test_request_context(environ_base=env):
+        assert admission.client_id() == "10.0.0.7"
+
+
+def test_rotating_keys_share_one_bucket(monkeypatch):
+    gate = Admission(slots=2, lanes=lanes(), buckets=LocalBuckets(rate=0.01, burst=2.0))
+    monkeypatch.setattr(admission, "_default", gate)
+    app = Flask(__name__)
+    app.add_url_rule("/work", "work", admission.admit("interactive")(lambda: "ok"))
+    client = app.test_client()
+    statuses = []
+    for n in range(3):
+        response = client.get("/work", headers={"X-API-Key": f"key-{n}"})
+        statuses.append(response.status_code)
+        response.close()
+    assert statuses == [200, 200, 429]
@@ -0,0 +1,58 @@
+import os
+import time
+import uuid
+
+import cv2
+
+from ocr_pipeline import annotations, stages
+from ocr_pipeline.near_duplicates import image_hashes
+from ocr_pipeline.storage import FileStore
+
+
+def persisted(card_image, outputs, store_source=None):
+    image = cv2.imread(card_image)
+    ctx = {"image_path": card_image, "image": image, "image_hashes": image_hashes(image),
+           "boxes": [(20, 30, 200, 40)], "output_data": {"filename": "card.png", "document_type": "PAN Card"}}
+    stages.persist_unique(ctx, outputs.root, store_source=store_source, lazy_image=True, storage=outputs)
+    return ctx["output_data"]["processed_image"]
+
+
+def test_sidecar_renders_after_the_upload_is_replaced_or_gone(tmp_path, card_image):
+    outputs = FileStore(str(tmp_path / "outputs"))
+    name = persisted(card_image, outputs)
+    sidecar = outputs.lookup(os.path.splitext(name)[0] + annotations.ANNOTATION_SUFFIX)
+    first = annotations.render(sidecar)
+
+    cv2.imwrite(card_image, cv2.imread(card_image) * 0)     # re-upload under the same name
+    assert annotations.render(sidecar) == first
+    os.remove(card_image)                                   # evicted from the upload store
+    assert annotations.render(sidecar) == first
+    assert annotations.annotation_etag(sidecar) is not None
+
+
+def test_source_copy_is_part_of_the_output_group(tmp_path, card_image):
+    outputs = FileStore(str(tmp_path / "outputs"), max_age=1, sweep_interval=0)
+    name = persisted(card_image, outputs)
+    stem = os.path.splitext(name)[0]
+    assert sorted(outputs.names()) == sorted([
+        stem.replace("_output", "") + ".json", stem + annotations.ANNOTATION_SUFFIX,
+        stem + annotations.SOURCE_SUFFIX + ".png",
+    ])
+    assert outputs.sweep(now=time.time() + 10) == 3
+    assert outputs.names() == []
+
+
+def test_near_duplicate_return_drops_an_evicted_image(tmp_path, card_image):
+    outputs = FileStore(str(tmp_path / "outputs"), max_age=1, sweep_interval=0)
+    source = f"annotations-{uuid.uuid4().hex[:8]}"
+    name = persisted(card_image, outputs, store_source=source)
+
+    def rerun():
+        ctx = {"image_path": card_image, "image": cv2.imread(card_image), "emit": lambda *a: None}
+        stages.dedupe(ctx, action="return", source=source, outputs=outputs)
+        assert ctx["done"]
+        return ctx["output_data"]
+
+    assert rerun()["processed_image"] == name
+    outputs.sweep(now=time.time() + 10)
+    assert rerun()["processed_image"] is None
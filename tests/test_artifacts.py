@@ -0,0 +1,66 @@
+import cv2
+
+from ocr_pipeline import stages
+from ocr_pipeline.artifacts import ArtifactCache, artifact_key
+from ocr_pipeline.stages import build_pipeline
+
+
+def test_key_follows_cached_stage_config_only():
+    base = build_pipeline()
+    same = build_pipeline(classify=stages.classify_flags, extract_config={"include_scores": False})
+    other_ocr = build_pipeline(ocr_config={"config": "--psm 4"})
+    key = artifact_key("abc", base.stage_configs())
+    assert artifact_key("abc", same.stage_configs()) == key
+    assert artifact_key("abc", other_ocr.stage_configs()) != key
+    assert artifact_key("def", base.stage_configs()) != key
+
+
+def test_second_run_reads_the_cache(tmp_path, fake_tesseract, card_image):
+    cache = ArtifactCache(str(tmp_path / "artifacts.sqlite"))
+    pipeline = build_pipeline(cache=cache)
+
+    first = pipeline.run_ctx({"image_path": card_image})
+    calls = len(fake_tesseract)
+    assert not first["cache_hit"] and calls > 0
+    assert cache.count() == 1
+
+    events = []
+    second = pipeline.run_ctx({"image_path": card_image, "emit": lambda e, d: events.append(e)})
+    assert second["cache_hit"]
+    assert len(fake_tesseract) == calls
+    assert second["output_data"]["document_type"] == first["output_data"]["document_type"]
+    assert second["blocks"] == first["blocks"]
+    assert events[:2] == ["decoded", "contours"]
+    assert events.count("block") == len(first["boxes"])
+
+
+def test_classify_only_change_reuses_the_artifact(tmp_path, fake_tesseract, card_image):
+    cache = ArtifactCache(str(tmp_path / "artifacts.sqlite"))
+    build_pipeline(cache=cache).run(card_image)
+    ctx = build_pipeline(classify=stages.classify_flags, cache=cache).run_ctx({"image_path": card_image})
+    assert ctx["cache_hit"]
+    assert cache.count() == 1
+
+
+def test_replay_sends_the_events_of_a_fresh_run(tmp_path, fake_tesseract, card_image):
+    # A short mark the fake engine reads as empty still gets its block
+    # event, so progress reaches the ocr_start total
+    image = cv2.imread(card_image)
+    cv2.rectangle(image, (320, 200), (360, 206), (0, 0, 0), -1)
+    cv2.imwrite(card_image, image)
+    pipeline = build_pipeline(cache=ArtifactCache(str(tmp_path / "artifacts.sqlite")))
+    fake_tesseract.clear()
+    runs = []
+    for _ in range(2):
+        events = []
+        pipeline.run_ctx({"image_path": card_image, "emit": lambda e, d: events.append((e, d))})
+        runs.append([(e, d) for e, d in events if e != "scripts"])
+    fresh, replayed = runs
+
+    assert replayed == fresh
+    total = next(d["count"] for e, d in fresh if e == "ocr_start")
+    blocks = [d for e, d in fresh if e == "block"]
+    assert len(blocks) == total == len(fake_tesseract)
+    assert [d["index"] for d in blocks] == list(range(total))
+    assert [e for e, _ in fresh][:4] == ["decoded", "contours", "lines", "ocr_start"]
+    assert "" in [d["text"] for d in blocks]
@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from conftest import load_app
+from ocr_pipeline.artifacts import ArtifactCache
+from ocr_pipeline.manifest import Manifest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "multiimage_extraction"))
+import batch  # noqa: E402
+
+
+def test_run_one_records_a_vanished_file_as_failed(tmp_path):
+    result = batch.run_one(str(tmp_path / "gone.jpg"))
+    assert result["error"].startswith("Processing failed")
+    assert result["sha1"] is None
+
+
+def test_mark_done_tolerates_a_vanished_file(tmp_path):
+    manifest = Manifest(str(tmp_path / "checkpoint.sqlite"))
+    manifest.mark_done(str(tmp_path / "gone.jpg"), None, status="error")
+    assert manifest.is_done(str(tmp_path / "gone.jpg"))
+    manifest.close()
+
+
+def test_run_one_uses_its_own_apps_module():
+    load_app("fuzzy_front_back/app.py", "fuzzy_first")     # its folder now leads sys.path
+    assert batch.load_app().__file__ == batch.APP_PATH
+
+
+def test_unreadable_image_fails_without_stopping_the_run(tmp_path, monkeypatch):
+    # run_batch turns the cache off for the process; undo that after the test
+    monkeypatch.delenv("ARTIFACT_CACHE", raising=False)
+    images = tmp_path / "in"
+    images.mkdir()
+    (images / "a_broken.jpg").write_bytes(b"not a jpeg")
+    cv2.imwrite(str(images / "b_blank.png"), np.full((40, 40, 3), 255, dtype=np.uint8))
+    out = tmp_path / "out"
+
+    stats = batch.run_batch([str(images)], str(out), workers=1, max_in_flight=2, shard_size=10,
+                            checkpoint_every=1)
+    assert stats["processed"] == 2 and stats["failed"] == 1
+    assert os.environ["ARTIFACT_CACHE"] == "off"
+    with open(out / "results-00000.jsonl", encoding="utf-8") as f:
+        rows = {os.path.basename(r["path"]): r for r in map(json.loads, f)}
+    assert rows["a_broken.jpg"]["error"].startswith("Could not read")
+    assert "error" not in rows["b_blank.png"] or not rows["b_blank.png"]["error"].startswith("Could not")
+
+    # Resuming skips both
+    again = batch.run_batch([str(images)], str(out), 1, 2, 10, 1)
+    assert again["processed"] == 0 and again["skipped"] == 2
+
+
+def test_failed_result_for_a_dead_worker():
+    result = batch.failed_result("/x.jpg", RuntimeError("boom"))
+    assert result == {"error": "Processing failed: boom", "path": "/x.jpg", "sha1": None}
+
+
+def test_artifact_cache_prunes_oldest(tmp_path, monkeypatch):
+    monkeypatch.setattr("ocr_pipeline.artifacts.PRUNE_EVERY", 5)
+    cache = ArtifactCache(str(tmp_path / "artifacts.sqlite"), max_entries=3)
+    for i in range(10):
+        cache.put(f"{i:040d}-cfg", {"i": i})
+    assert cache.count() == 3
+    assert cache.get(f"{9:040d}-cfg") == {"i": 9}
+    assert cache.get(f"{0:040d}-cfg") is None
+    cache.close()
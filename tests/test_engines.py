@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from conftest import load_app
+from ocr_pipeline import engines
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # Registrations made by a test are undone after it
+    monkeypatch.setattr(engines, "ENGINES", dict(engines.ENGINES))
+    monkeypatch.setattr(engines, "REQUIRES", dict(engines.REQUIRES))
+    monkeypatch.setattr(engines, "_loaded", {})
+    return engines
+
+
+def test_engines_load_on_first_use_and_stay_loaded(registry):
+    registry.register("basename", "os.path:basename")
+    assert "basename" not in registry.loaded()
+    assert registry.get_engine("basename") is os.path.basename
+    assert registry.loaded() == ["basename"]
+    registry.register("basename", "os.path:dirname")       # re-registering drops the loaded reader
+    assert registry.get_engine("basename") is os.path.dirname
+
+
+def test_unknown_engine_is_an_error(registry):
+    with pytest.raises(ValueError):
+        registry.get_engine("paddle")
+    with pytest.raises(ValueError):
+        registry.check("paddle")
+    assert not registry.available("paddle")
+
+
+def test_missing_package_is_reported_without_importing(registry):
+    registry.register("missing", "no_such_ocr_package:read", requires="no_such_ocr_package")
+    assert not registry.available("missing")
+    with pytest.raises(RuntimeError, match="no_such_ocr_package"):
+        registry.check("missing")
+    assert registry.loaded() == []
+    registry.check("tesseract")
+
+
+def test_app_refuses_to_start_on_a_missing_engine(registry, monkeypatch):
+    registry.register("missing", "no_such_ocr_package:read", requires="no_such_ocr_package")
+    module = load_app("fuzzy_front_back/app.py", "fuzzy_app_engines")
+    monkeypatch.setattr(module, "OCR_ENGINE", "missing")
+    monkeypatch.setattr(module, "warm_up", lambda: pytest.fail("warmed up a broken config"))
+    with pytest.raises(RuntimeError, match="OCR engine missing"):
+        module.create_app()
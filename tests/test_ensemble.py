@@ -0,0 +1,91 @@
+import threading
+import time
+
+from ocr_pipeline import ensemble
+from ocr_pipeline.ensemble import ensemble_block, merge_reads, vote_line
+
+
+def read(*lines):
+    # lines: (text, conf)
+    return {"text": "\n".join(t for t, _ in lines), "conf": sum(c for _, c in lines) / len(lines),
+            "lines": [{"text": t, "conf": c} for t, c in lines], "words": []}
+
+
+def test_more_confident_engine_wins_disagreements():
+    assert vote_line("RAHUL KUMAR", "RAHIL KUMAR", 90, 50) == "RAHUL KUMAR"
+    assert vote_line("RAHUL KUMAR", "RAHIL KUMAR", 40, 50) == "RAHIL KUMAR"
+
+
+def test_vote_snaps_to_a_valid_id():
+    # The confident read has Z for 2, the other engine has 8 for B
+    assert vote_line("ABCDE1Z34F", "A8CDE1234F", 90, 60) == "ABCDE1234F"
+
+
+def test_vote_without_a_valid_id_keeps_the_confidence_vote():
+    assert vote_line("ABCDE1Z34F", "A8CDE1Z34F", 90, 60) == "ABCDE1Z34F"
+
+
+def test_merge_pairs_similar_lines_and_keeps_the_rest():
+    tesseract = read(("INCOME TAX DEPARTMENT", 90), ("ABCDE1Z34F", 80))
+    easyocr = read(("A8CDE1234F", 60))
+    merged = merge_reads({"tesseract": tesseract, "easyocr": easyocr})
+    assert [line["text"] for line in merged["lines"]] == ["INCOME TAX DEPARTMENT", "ABCDE1234F"]
+    assert merged["method"] == "vote"
+    assert merged["engines"] == {"tesseract": tesseract["text"], "easyocr": easyocr["text"]}
+
+
+def test_slow_engine_misses_the_deadline():
+    def fast(roi, config):
+        return read(("RAHUL KUMAR", 70))
+
+    def slow(roi, config):
+        time.sleep(0.5)
+        return read(("RAHUL KUMAR", 99))
+
+    result = ensemble_block(None, deadline=0.1, engines={"fast": fast, "slow": slow})
+    assert result["method"] == "fallback:fast"
+    assert result["text"] == "RAHUL KUMAR"
+
+
+def test_no_text_from_either_engine():
+    def empty(roi, config):
+        return None
+
+    assert ensemble_block(None, deadline=0.1, engines={"a": empty, "b": empty})["method"] == "empty"
+
+
+def test_failing_engine_falls_back_to_the_other():
+    def broken(roi, config):
+        raise RuntimeError("model crashed")
+
+    def fine(roi, config):
+        return read(("ABCDE1234F", 80))
+
+    result = ensemble_block(None, deadline=1, engines={"broken": broken, "fine": fine})
+    assert result["method"] == "fallback:fine"
+    assert result["text"] == "ABCDE1234F"
+
+
+def test_stragglers_neither_block_later_reads_nor_pile_up(monkeypatch):
+    monkeypatch.setattr(ensemble, "ENSEMBLE_MAX_STRAGGLERS", 2)
+    release = threading.Event()
+    started = []
+
+    def stuck(roi, config):
+        started.append(1)
+        release.wait(5)
+        return read(("RAHUL KUMAR", 99))
+
+    def fast(roi, config):
+        return read(("RAHUL KUMAR", 70))
+
+    engines = {"stuck": stuck, "fast": fast}
+    try:
+        start = time.monotonic()
+        methods = [ensemble_block(None, deadline=0.05, engines=engines)["method"] for _ in range(6)]
+        # every block answers at the deadline or sooner, none waits on an old stuck read
+        assert time.monotonic() - start < 2
+        assert methods == ["fallback:fast"] * 6
+        assert len(started) == 2
+    finally:
+        release.set()
@@ -0,0 +1,61 @@
+from ocr_pipeline.fields import FIELD_SCHEMA, extract_fields
+
+ROW = 40
+
+
+def fields(*lines, doc_type="PAN Card", confs=None):
+    # One block per line, stacked down the card
+    boxes = [(20, 20 + ROW * i, 360, 30) for i in range(len(lines))]
+    details = [{"conf": c, "lines": [{"text": t, "conf": c}]} for t, c in zip(lines, confs)] if confs else None
+    record, _ = extract_fields(list(lines), boxes, doc_type, details)
+    return record
+
+
+def values(record):
+    return {k: v["value"] for k, v in record.items() if v}
+
+
+def test_every_schema_field_is_present():
+    assert list(fields("nothing useful")) == FIELD_SCHEMA
+
+
+def test_inline_labels():
+    record = fields("Name: RAHUL KUMAR  DOB: 01/01/1990", "Father's Name: RAMESH KUMAR")
+    assert values(record) == {"name": "RAHUL KUMAR", "dob": "01/01/1990", "father_name": "RAMESH KUMAR"}
+    assert record["name"]["confidence"] == 1.0
+
+
+def test_value_on_the_line_below_a_label():
+    record = fields("INCOME TAX DEPARTMENT", "Name", "RAHUL KUMAR", "Father's Name", "RAMESH KUMAR",
+                    "Date of Birth", "01/01/1990")
+    assert values(record)["name"] == "RAHUL KUMAR"
+    assert values(record)["father_name"] == "RAMESH KUMAR"
+    assert values(record)["dob"] == "01/01/1990"
+    assert record["name"]["confidence"] == 0.8
+    assert values(record)["issuing_authority"] == "Income Tax Department"
+
+
+def test_value_to_the_right_of_a_label():
+    record, _ = extract_fields(["Name", "RAHUL KUMAR"], [(20, 20, 80, 30), (120, 20, 200, 30)])
+    assert record["name"] == {"value": "RAHUL KUMAR", "confidence": 0.9}
+
+
+def test_header_words_are_not_names():
+    assert fields("Name", "GOVERNMENT OF INDIA")["name"] is None
+
+
+def test_ocr_confidence_picks_between_candidates():
+    record = fields("Name: RAHUL KUMAR", "Name: RAHUL KUNAR", confs=[40, 90])
+    assert record["name"] == {"value": "RAHUL KUNAR", "confidence": 0.9}
+
+
+def test_gender_and_unlabelled_dob():
+    record = fields("MALE", "01/01/1990", doc_type="Aadhaar Card")
+    assert values(record)["gender"] == "Male"
+    assert record["dob"] == {"value": "01/01/1990", "confidence": 0.6}
+
+
+def test_number_is_the_validated_id():
+    assert fields("ABCPE1Z34F")["number"] == {"value": "ABCPE1234F", "confidence": 0.9}
+    # Right shape, wrong holder type: kept at low confidence
+    assert fields("ABCXE1234F")["number"] == {"value": "ABCXE1234F", "confidence": 0.3}
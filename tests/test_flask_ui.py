@@ -0,0 +1,69 @@
+import json
+import threading
+
+
+def upload(client, path, name="card.png"):
+    with open(path, "rb") as f:
+        response = client.post("/upload", data={"file": (f, name)}, content_type="multipart/form-data")
+    return response.get_json()["filename"]
+
+
+def sse_events(response):
+    body = response.get_data(as_text=True)
+    response.close()    # releases the admission slot
+    events = []
+    for message in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in message.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_extract_stream_sends_progress_then_the_result(flask_ui, fake_tesseract, card_image):
+    client = flask_ui.app.test_client()
+    name = upload(client, card_image)
+    response = client.get(f"/extract-stream/{name}")
+    assert response.mimetype == "text/event-stream"
+
+    events = sse_events(response)
+    names = [event for event, _ in events]
+    assert names[0] == "decoded"
+    assert names[-1] == "result"
+    assert "block" in names
+    assert names.index("provisional_type") < names.index("side") < names.index("result")
+    result = events[-1][1]
+    assert result["document_type"] == "PAN Card"
+    assert result["document_side"] == "Front"
+
+
+def test_extract_stream_reports_a_missing_file(flask_ui):
+    response = flask_ui.app.test_client().get("/extract-stream/missing.png")
+    assert sse_events(response) == [("error", {"error": "File not found"})]
+
+
+def test_file_routes_use_the_uploaded_name(flask_ui, card_image):
+    client = flask_ui.app.test_client()
+    assert upload(client, card_image, name="my card.png") == "my_card.png"
+    response = client.get("/uploads/my card.png")
+    assert response.status_code == 200
+    response.close()
+
+
+def test_closing_the_stream_stops_the_ocr_worker(flask_ui, fake_tesseract, card_image, monkeypatch):
+    # The first Tesseract call is held until the consumer has gone away
+    import pytesseract
+
+    gate = threading.Event()
+    read = pytesseract.image_to_data
+
+    def slow_first_read(*args, **kwargs):
+        if len(fake_tesseract) == 0:
+            gate.wait(5)
+        return read(*args, **kwargs)
+
+    monkeypatch.setattr(pytesseract, "image_to_data", slow_first_read)
+    events = flask_ui.iter_process_document(card_image)
+    total = next(data["count"] for event, data in events if event == "ocr_start")
+    assert total == 3
+    threading.Timer(0.05, gate.set).start()
+    events.close()          # returns once the worker has stopped
+    assert len(fake_tesseract) == 1
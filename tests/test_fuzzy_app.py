@@ -0,0 +1,25 @@
+import pytest
+
+from conftest import load_app
+
+
+@pytest.fixture(scope="module")
+def fuzzy():
+    return load_app("fuzzy_front_back/app.py", "fuzzy_front_back_app")
+
+
+@pytest.mark.parametrize("name", ["..", "../app.py", "/etc/passwd", "a/../../app.py"])
+def test_input_path_stays_in_the_input_folder(fuzzy, name):
+    path = fuzzy.input_path(name)
+    assert path is None or path.startswith(fuzzy.os.path.realpath(fuzzy.INPUT_FOLDER) + fuzzy.os.sep)
+
+
+@pytest.mark.parametrize("pages", ["../app.py", "..", "x.jpg,../../requirements.txt"])
+def test_passbook_rejects_paths_outside_the_input_folder(fuzzy, pages):
+    response = fuzzy.app.test_client().get("/passbook", query_string={"pages": pages})
+    response.close()    # releases the batch lane slot
+    assert response.status_code == 404
+
+
+def test_process_rejects_the_parent_folder(fuzzy):
+    assert fuzzy.app.test_client().get("/process/..").status_code == 404
@@ -0,0 +1,86 @@
+import numpy as np
+
+from ocr_pipeline import rules
+from ocr_pipeline.id_numbers import best_id, correct_batch, format_id, verhoeff_valid
+
+
+def digits(text):
+    return np.array([[int(c) for c in text]])
+
+
+def with_check_digit(prefix):
+    valid = [d for d in "0123456789" if verhoeff_valid(digits(prefix + d))[0]]
+    assert len(valid) == 1
+    return prefix + valid[0]
+
+
+def test_verhoeff_known_value():
+    assert verhoeff_valid(digits("2363"))[0]
+    assert not verhoeff_valid(digits("2364"))[0]
+
+
+def test_verhoeff_catches_every_single_digit_error():
+    number = with_check_digit("23456789012")
+    for i in range(len(number)):
+        for d in "0123456789":
+            if d != number[i]:
+                assert not verhoeff_valid(digits(number[:i] + d + number[i + 1:]))[0]
+
+
+def test_aadhaar_letter_misreads_are_corrected():
+    number = with_check_digit("20456789012")
+    misread = number.replace("0", "O", 1)
+    found = correct_batch([f"{misread[:4]} {misread[4:8]} {misread[8:]}"])[0]
+    assert [(c["kind"], c["value"], c["substitutions"]) for c in found] == [("Aadhaar", number, 1)]
+
+
+def test_aadhaar_digit_misreads_are_rejected():
+    number = with_check_digit("23456789012")
+    wrong = number[:5] + str((int(number[5]) + 1) % 10) + number[6:]
+    assert correct_batch([wrong]) == [[]]
+
+
+def test_pan_shape_and_holder_type():
+    assert [c["value"] for c in correct_batch(["ABCPE1Z34F"])[0]] == ["ABCPE1234F"]
+    # 4th letter must be a holder type
+    assert correct_batch(["ABCXE1234F"]) == [[]]
+
+
+def test_best_id_prefers_the_documents_own_kind():
+    texts = ["ABC1234567", "ABCPE1234F"]
+    assert best_id(texts, "PAN Card")["kind"] == "PAN"
+    assert best_id(texts, "Voter ID Card")["kind"] == "Voter ID"
+    assert best_id(["nothing here"]) is None
+
+
+def test_phone_numbers_and_digit_runs_are_not_ids():
+    for doc_type in ("Aadhaar Card", "Voter ID Card", "Passport", None):
+        assert best_id(["Mobile: 8765432101"], doc_type) is None
+        assert best_id(["12345678", "Ref 98765432", "Pin 560001"], doc_type) is None
+    assert correct_batch(["8765432101 12345678"]) == [[]]
+
+
+def test_a_letter_run_is_never_made_from_digits_alone():
+    # One letter left in the run: corrected; none: rejected
+    assert [c["value"] for c in correct_batch(["A8C1234567"])[0]] == ["ABC1234567"]
+    assert correct_batch(["0BC1234567"])[0][0]["value"] == "OBC1234567"
+    assert correct_batch(["8871234567"]) == [[]]
+    assert correct_batch(["A2345678"])[0][0]["kind"] == "Passport"
+    assert correct_batch(["I2345678"]) == [[{"kind": "Passport", "value": "I2345678", "raw": "I2345678",
+                                             "substitutions": 0}]]
+
+
+def test_substitutions_are_capped():
+    assert correct_batch(["ABCPE1Z34F"])[0][0]["substitutions"] == 1
+    assert correct_batch(["ABCPEIZ3AF"]) == [[]]          # three digit positions read as letters
+
+
+def test_known_document_type_only_takes_its_own_kind():
+    assert best_id(["ABC1234567"], "Aadhaar Card") is None
+    assert best_id(["ABC1234567"], "Voter ID Card")["value"] == "ABC1234567"
+    assert best_id(["ABC1234567"], rules.UNKNOWN_DOCUMENT)["kind"] == "Voter ID"
+
+
+def test_format_groups_aadhaar_digits():
+    number = with_check_digit("23456789012")
+    assert format_id(best_id([number])) == f"{number[:4]} {number[4:8]} {number[8:]}"
@@ -0,0 +1,39 @@
+import os
+
+from ocr_pipeline.manifest import Manifest, file_sha1
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return os.path.abspath(str(path))
+
+
+def test_scan_returns_only_new_or_changed_files(tmp_path):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    a = write(folder / "a.jpg", b"aaa")
+    b = write(folder / "b.png", b"bbb")
+    write(folder / "notes.txt", b"not an image")
+    manifest = Manifest(str(tmp_path / "manifest.sqlite"))
+
+    assert manifest.scan(str(folder)) == sorted([(a, file_sha1(a)), (b, file_sha1(b))])
+    manifest.mark_done(a)
+    manifest.mark_done(b)
+    assert manifest.scan(str(folder)) == []
+
+    # New content is picked up; a touch with the same bytes is not
+    write(folder / "a.jpg", b"a changed")
+    os.utime(b, ns=(1, 1))
+    assert manifest.scan(str(folder)) == [(a, file_sha1(a))]
+    assert manifest.needs_processing(b) is None
+    manifest.close()
+
+
+def test_needs_processing(tmp_path):
+    path = write(tmp_path / "c.jpg", b"ccc")
+    manifest = Manifest(str(tmp_path / "manifest.sqlite"))
+    assert manifest.needs_processing(path) == file_sha1(path)
+    manifest.mark_done(path, status="ok")
+    assert manifest.needs_processing(path) is None
+    assert manifest.count() == 1
+    manifest.close()
@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+
+from ocr_pipeline import near_duplicates
+from ocr_pipeline.near_duplicates import DuplicateIndex, HashIndex, hamming, image_hashes
+from ocr_pipeline.results_store import ResultsStore
+
+
+def flip_bits(h, bits):
+    for b in bits:
+        h ^= 1 << int(b)
+    return h
+
+
+def test_query_matches_brute_force_before_and_after_merge(monkeypatch):
+    monkeypatch.setattr(near_duplicates, "MERGE_MIN", 500)
+    rng = np.random.default_rng(0)
+    phashes = rng.integers(0, 2 ** 64, size=1600, dtype=np.uint64)
+    index = HashIndex()
+    index.add_many(range(1500), phashes[:1500], phashes[:1500])          # merged into the word tables
+    index.add_many(range(1500, 1600), phashes[1500:], phashes[1500:])    # still searched linearly
+    assert index._merged == 1500
+
+    for target in (3, 1550):
+        probe = flip_bits(int(phashes[target]), rng.choice(64, size=6, replace=False))
+        hits = index.query(probe, radius=8)
+        expected = np.flatnonzero(hamming(phashes, probe) <= 8).tolist()
+        assert sorted(item for item, _ in hits) == expected
+        assert hits[0] == (target, 6)
+
+
+def test_hashes_survive_recompression_and_resizing(card_image):
+    image = cv2.imread(card_image)
+    _, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 40])
+    copy = cv2.resize(cv2.imdecode(jpeg, cv2.IMREAD_COLOR), None, fx=0.7, fy=0.7)
+    (p1, d1), (p2, d2) = image_hashes(image), image_hashes(copy)
+    assert hamming(np.array([p1], np.uint64), p2)[0] <= near_duplicates.PHASH_RADIUS
+    assert hamming(np.array([d1], np.uint64), d2)[0] <= near_duplicates.DHASH_RADIUS
+
+
+def test_find_only_returns_results_of_the_same_source(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    index = DuplicateIndex(store)
+    hashes = (0x0F0F_0F0F_0F0F_0F0F, 0x1234)
+    fuzzy_id = store.add({"filename": "a.jpg", "side": "Front"}, source="fuzzy_front_back")
+    index.add(fuzzy_id, hashes)
+
+    assert index.find(hashes, source="flask_ui") is None
+    assert index.find(hashes, source="fuzzy_front_back") == {"result_id": fuzzy_id, "distance": 0}
+    assert index.find(hashes)["result_id"] == fuzzy_id
+
+    ui_id = store.add({"filename": "a.jpg", "document_side": "Front"}, source="flask_ui")
+    index.add(ui_id, (hashes[0] ^ 1, hashes[1]))
+    assert index.find(hashes, source="flask_ui") == {"result_id": ui_id, "distance": 1}
+    assert index.find(hashes)["result_id"] == fuzzy_id
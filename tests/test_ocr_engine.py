@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from ocr_pipeline import ocr_engine
+from ocr_pipeline.ocr_engine import is_reocr_target, ocr_block, weakest_target_conf
+
+
+@pytest.mark.parametrize("text", [
+    "INCOME TAX DEPARTMENT", "GOVT. OF INDIA", "Permanent Account Number", "Signature", "ELECTION COMMISSION OF INDIA",
+    "Government of India",
+])
+def test_headers_are_not_retried(text):
+    assert not is_reocr_target(text)
+
+
+@pytest.mark.parametrize("text", ["ABCDE1234F", "2345 6789 0123", "Name: Rahul Kumar", "Father's Name", "RAHUL KUMAR"])
+def test_ids_names_and_labels_are_retried(text):
+    assert is_reocr_target(text)
+
+
+def test_mixed_case_name_only_after_a_label():
+    assert not is_reocr_target("Rahul Kumar")
+    assert is_reocr_target("Rahul Kumar", after_label=True)
+    lines = [{"text": "Name", "conf": 95.0}, {"text": "Rahul Kumar", "conf": 40.0}, {"text": "Some words", "conf": 10.0}]
+    assert weakest_target_conf({"lines": lines}) == 40.0
+
+
+def read(text, conf):
+    return {"text": text, "conf": conf, "lines": [{"text": text, "conf": conf}], "words": []}
+
+
+def test_weak_header_block_is_read_once(monkeypatch):
+    calls = []
+
+    def read_block(roi, config):
+        calls.append(config)
+        return read("INCOME TAX DEPARTMENT", 20.0)
+
+    monkeypatch.setattr(ocr_engine, "read_block", read_block)
+    result = ocr_block(np.zeros((30, 200), np.uint8))
+    assert result["reocr"] is None
+    assert len(calls) == 1
+
+
+def test_weak_id_keeps_the_best_retry(monkeypatch):
+    reads = iter([read("ABCDE1234F", 30.0), read("ABCDE1234F", 80.0)])
+    monkeypatch.setattr(ocr_engine, "read_block", lambda roi, config: next(reads))
+    result = ocr_block(np.zeros((30, 200), np.uint8))
+    assert result["reocr"] == "upscale"
+    assert result["conf"] == 80.0
@@ -0,0 +1,64 @@
+from ocr_pipeline.pairing import PAIR_THRESHOLD, blocking_keys, pair_score, pair_sides, record_fields
+
+
+def result(filename, side, name=None, dob=None, number=None, doc_type="Aadhaar Card"):
+    summary = {"Name": name, "DOB": dob, "Number": number}
+    return {"filename": filename, "document_type": doc_type, "side": side,
+            "cleaned_summary": summary, "raw_detected_text": []}
+
+
+def record(*args, **kwargs):
+    return record_fields(result("x.jpg", *args, **kwargs))
+
+
+def test_same_number_pairs_at_full_score():
+    front = record("Front", name="RAHUL KUMAR", number="2345 6789 0123")
+    back = record("Back", number="234567890123")
+    assert pair_score(front, back) == 100.0
+
+
+def test_different_numbers_never_pair():
+    front = record("Front", name="RAHUL KUMAR", dob="01/01/1990", number="2345 6789 0123")
+    back = record("Back", name="RAHUL KUMAR", dob="01/01/1990", number="9876 5432 1098")
+    assert pair_score(front, back) == 0.0
+
+
+def test_dob_alone_does_not_pair():
+    front = record("Front", dob="01/01/1990")
+    back = record("Back", dob="01-01-1990")
+    assert front["dob"] == back["dob"]
+    assert pair_score(front, back) == 0.0
+
+
+def test_dob_with_a_different_name_stays_below_threshold():
+    front = record("Front", name="RAHUL KUMAR", dob="01/01/1990")
+    back = record("Back", name="SUNITA DEVI", dob="01/01/1990")
+    assert pair_score(front, back) < PAIR_THRESHOLD
+
+
+def test_name_and_dob_pair():
+    front = record("Front", name="RAHUL KUMAR", dob="01/01/1990")
+    back = record("Back", name="RAHUL KUMAR", dob="01/01/1990")
+    assert pair_score(front, back) == 100.0
+
+
+def test_blocking_keys():
+    rec = record("Front", name="RAHUL KUMAR", dob="01/01/1990", number="2345 6789 0123")
+    assert set(blocking_keys(rec)) == {
+        ("Aadhaar Card", "num", "234567890123"),
+        ("Aadhaar Card", "last4", "0123"),
+        ("Aadhaar Card", "dob", "01/01/1990"),
+        ("Aadhaar Card", "initials", "RAHK"),
+    }
+
+
+def test_pair_sides_keeps_same_birthday_strangers_apart():
+    results = [
+        result("a_front.jpg", "Front", dob="01/01/1990"),
+        result("b_back.jpg", "Back", dob="01/01/1990"),
+        result("c_front.jpg", "Front", name="RAHUL KUMAR", number="2345 6789 0123"),
+        result("c_back.jpg", "Back", number="2345 6789 0123"),
+    ]
+    merged = pair_sides(results)
+    assert [(p["front"], p["back"]) for p in merged["pairs"]] == [("c_front.jpg", "c_back.jpg")]
+    assert sorted(merged["unpaired"]) == ["a_front.jpg", "b_back.jpg"]
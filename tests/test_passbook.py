@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+import pytest
+
+from ocr_pipeline import passbook
+from ocr_pipeline.artifacts import ArtifactCache
+from ocr_pipeline.passbook import column_roles, iter_pages, iter_rows, parse_amount
+from ocr_pipeline.stages import build_pipeline
+
+COLUMNS = [40, 200, 500, 650, 800, 960]
+ROWS = [40, 100, 160, 220, 280]
+HEADER = ["DATE", "PARTICULARS", "WITHDRAWAL", "DEPOSIT", "BALANCE"]
+
+
+def ruled_page():
+    # A ruled 5-column table, header + 3 rows, every cell inked
+    page = np.full((360, 1000, 3), 255, np.uint8)
+    for y in ROWS:
+        cv2.line(page, (COLUMNS[0], y), (COLUMNS[-1], y), (0, 0, 0), 2)
+    for x in COLUMNS:
+        cv2.line(page, (x, ROWS[0]), (x, ROWS[-1]), (0, 0, 0), 2)
+    for y0 in ROWS[:-1]:
+        for x0 in COLUMNS[:-1]:
+            cv2.putText(page, "00", (x0 + 20, y0 + 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+    return page
+
+
+@pytest.fixture
+def cell_texts(monkeypatch):
+    # Cells are read left to right, top to bottom: feed them in that order
+    pytesseract = pytest.importorskip("pytesseract")
+    texts = []
+    monkeypatch.setattr(pytesseract, "image_to_string", lambda cell, config="": texts.pop(0))
+    return texts
+
+
+def test_column_roles_from_header_or_position():
+    assert column_roles(HEADER, 5) == ["date", "narration", "debit", "credit", "balance"]
+    assert column_roles(["", "", "", "", ""], 5) == ["date", "narration", "debit", "credit", "balance"]
+    assert column_roles(["", "", ""], 3) == ["narration"] * 3
+
+
+def test_parse_amount():
+    assert parse_amount("1,25,000.50") == 125000.5
+    assert parse_amount("450.00 DR") == -450.0
+    assert parse_amount("") is None
+
+
+def test_balance_check_flags_the_misread_row(cell_texts):
+    cell_texts += HEADER
+    cell_texts += ["01/01/2024", "OPENING", "", "", "1,000.00"]
+    cell_texts += ["02/01/2024", "ATM", "200.00", "", "800.00"]
+    cell_texts += ["03/01/2024", "SALARY", "", "500.00", "1400.00"]
+    rows = list(iter_rows(ruled_page()))
+    assert [r["row"] for r in rows] == [1, 2, 3]
+    assert [r["balance_ok"] for r in rows] == [None, True, False]
+    assert rows[1]["debit"] == 200.0 and rows[1]["narration"] == "ATM"
+    assert not cell_texts
+
+
+def test_balance_is_carried_across_pages(cell_texts, tmp_path):
+    paths = []
+    for n in range(2):
+        paths.append(str(tmp_path / f"page{n}.png"))
+        cv2.imwrite(paths[-1], ruled_page())
+    cell_texts += HEADER + ["01/01/2024", "A", "", "", "100"] + ["02/01/2024", "B", "", "50", "150"] * 2
+    cell_texts += HEADER + ["03/01/2024", "C", "", "50", "200"] * 3
+    rows = list(iter_pages(paths))
+    assert [r["page"] for r in rows] == [1, 1, 1, 2, 2, 2]
+    assert [r["balance_ok"] for r in rows] == [None, True, False, True, False, False]
+
+
+def classify_passbook(ctx):
+    ctx["doc_type"], ctx["scores"], ctx["side"] = "Bank Passbook", None, "Front"
+
+
+def test_same_page_twice_with_the_artifact_cache(tmp_path, fake_tesseract, monkeypatch):
+    monkeypatch.setattr(passbook, "read_cell", lambda gray, box, role: "" if role == "narration" else "100")
+    path = str(tmp_path / "passbook.png")
+    cv2.imwrite(path, ruled_page())
+    pipeline = build_pipeline(classify=classify_passbook, cache=ArtifactCache(str(tmp_path / "artifacts.sqlite")))
+
+    first = pipeline.run_ctx({"image_path": path})
+    second = pipeline.run_ctx({"image_path": path})
+    assert second["cache_hit"]
+    assert first["transactions"] and second["transactions"] == first["transactions"]
@@ -0,0 +1,63 @@
+import numpy as np
+
+from ocr_pipeline import preprocessing
+from ocr_pipeline.preprocessing import PROFILES, choose_profile, preprocess, scale_box, select_profile
+
+
+def page(noise=0.0, seed=0):
+    # White page, two lines of thin black "strokes", optional Gaussian noise
+    image = np.full((400, 600), 255, dtype=np.uint8)
+    for x in range(50, 400, 12):
+        image[100:130, x:x + 4] = 0
+    for x in range(50, 300, 12):
+        image[200:230, x:x + 4] = 0
+    if noise:
+        rng = np.random.default_rng(seed)
+        image = np.clip(image + rng.normal(0, noise, image.shape), 0, 255).astype(np.uint8)
+    return image
+
+
+def test_choose_profile_thresholds():
+    assert choose_profile({"noise": 12.0, "contrast": 80.0}) == "heavy"
+    assert choose_profile({"noise": 1.0, "contrast": 80.0}) == "fast"
+    assert choose_profile({"noise": 1.0, "contrast": 10.0}) == "balanced"
+    assert choose_profile({"noise": 5.0, "contrast": 80.0}) == "balanced"
+
+
+def test_only_noisy_page_gets_heavy():
+    assert select_profile(page())[0] != "heavy"
+    assert select_profile(page(noise=40))[0] == "heavy"
+
+
+def test_select_profile_cached_by_key():
+    key = ("some/image.png", 1, 1)
+    profile, stats = select_profile(page(), cache_key=key)
+    assert stats is not None
+    cached, stats = select_profile(page(noise=40), cache_key=key)
+    assert (cached, stats) == (profile, None)
+    preprocessing._profile_cache.pop(key)
+
+
+def test_every_profile_gives_text_white_binary():
+    for name in PROFILES:
+        prep = preprocess(page(), name)
+        assert prep["profile"] == name
+        assert prep["binary"].shape == prep["dilated"].shape
+        # Ink on the text lines, none on the empty bottom of the page
+        s = prep["scale"]
+        assert prep["binary"][int(100 * s):int(130 * s)].mean() > 20
+        assert prep["binary"][int(300 * s):].max() == 0
+
+
+def test_unknown_profile():
+    try:
+        preprocess(page(), "sharpest")
+    except ValueError as e:
+        assert "sharpest" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_scale_box_maps_back():
+    assert scale_box((10, 20, 30, 40), 1.0) == (10, 20, 30, 40)
+    assert scale_box((10, 20, 30, 40), 0.5) == (20, 40, 60, 80)
@@ -0,0 +1,112 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import ROOT
+from ocr_pipeline import profiling
+from ocr_pipeline.profiling import ProfileSession
+
+
+def busy_worker_loop(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def document(path):
+    ctx = {"image_path": path, "output_data": {}}
+    profiling.note(ctx)
+    return ctx["output_data"].get("profile"), profiling.current()
+
+
+def test_propagate_without_a_session_is_a_no_op():
+    assert profiling.current() is None
+    assert profiling.propagate(document) is document
+
+
+def test_worker_thread_runs_under_the_request_session():
+    session = ProfileSession("sample", "test").start()
+    seen = []
+    try:
+        thread = threading.Thread(target=profiling.propagate(lambda: seen.append(document("a.jpg"))))
+        thread.start()
+        thread.join()
+    finally:
+        session.stop()
+    assert seen == [(session.ref(), session)]
+    assert [d["image_path"] for d in session.documents] == ["a.jpg"]
+
+
+def test_pool_workers_are_noted_and_reset_after():
+    session = ProfileSession("sample", "test").start()
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            refs = list(pool.map(profiling.propagate(document), ["a.jpg", "b.jpg", "c.jpg"]))
+            # pool threads drop the session once their task is done
+            assert set(pool.map(lambda _: profiling.current(), range(4))) == {None}
+    finally:
+        session.stop()
+    assert [ref for ref, _ in refs] == [session.ref()] * 3
+    assert sorted(d["image_path"] for d in session.documents) == ["a.jpg", "b.jpg", "c.jpg"]
+
+
+def test_sampler_covers_worker_stacks():
+    session = ProfileSession("sample", "test").start()
+    try:
+        thread = threading.Thread(target=profiling.propagate(busy_worker_loop), args=(0.2,))
+        thread.start()
+        thread.join()
+    finally:
+        session.stop()
+    assert any(frame[2] == "busy_worker_loop" for stack in session.stacks for frame in stack)
+
+
+@pytest.fixture
+def profiled_app(monkeypatch, tmp_path):
+    from flask import Flask
+
+    from ocr_pipeline.storage import FileStore
+
+    monkeypatch.setattr(profiling, "PROFILING", True)
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "s3cret")
+    monkeypatch.setattr(profiling, "_store", FileStore(str(tmp_path / "profiles")))
+    app = Flask(__name__)
+    app.add_url_rule("/work", "work", lambda: "ok")
+    return profiling.install(app).test_client()
+
+
+def get(client, url, **headers):
+    response = client.get(url, headers=headers)
+    response.close()        # saves the profile
+    return response
+
+
+def test_profiling_is_off_by_default():
+    env = {k: v for k, v in os.environ.items() if k != "PROFILING"}
+    out = subprocess.run([sys.executable, "-c", "from ocr_pipeline import profiling; print(profiling.PROFILING)"],
+                         cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+def test_trigger_and_routes_need_the_token(profiled_app):
+    assert "X-Profile-Id" not in get(profiled_app, "/work?profile=sample").headers
+    assert "X-Profile-Id" not in get(profiled_app, "/work", **{"X-Profile": "cprofile",
+                                                               "X-Profile-Token": "guess"}).headers
+    assert get(profiled_app, "/profiles").status_code == 404
+
+    profile_id = get(profiled_app, "/work?profile=sample&profile_token=s3cret").headers["X-Profile-Id"]
+    assert get(profiled_app, f"/profiles/{profile_id}").status_code == 404
+    listed = get(profiled_app, "/profiles", **{"X-Profile-Token": "s3cret"})
+    assert listed.get_json()["profiles"] == [profile_id]
+    assert get(profiled_app, f"/profiles/{profile_id}?profile_token=s3cret").status_code == 200
+
+
+def test_no_token_configured_means_no_http_access(profiled_app, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "")
+    assert "X-Profile-Id" not in get(profiled_app, "/work?profile=sample&profile_token=").headers
+    assert get(profiled_app, "/profiles?profile_token=").status_code == 404
@@ -0,0 +1,57 @@
+import numpy as np
+
+from ocr_pipeline.preprocessing import scale_box
+from ocr_pipeline.regions import find_regions, line_ids, line_segments, scale_regions
+
+
+def mask_with(boxes, shape=(300, 600)):
+    mask = np.zeros(shape, dtype=np.uint8)
+    for x, y, w, h in boxes:
+        mask[y:y+h, x:x+w] = 255
+    return mask
+
+
+def rows(boxes):
+    return np.array([[x, y, w, h, w * h] for x, y, w, h in boxes], dtype=np.int32)
+
+
+def test_contours_and_components_find_the_same_boxes():
+    boxes = [(300, 20, 80, 30), (20, 24, 120, 26), (20, 100, 200, 40), (400, 200, 12, 12), (500, 200, 5, 40)]
+    mask = mask_with(boxes)
+    mask[110:130, 30:60] = 0                     # a hole...
+    mask[115:125, 35:55] = 255                   # ...with a blob inside: not a block of its own
+    by_contours = find_regions(mask, "contours")
+    by_components = find_regions(mask, "components")
+    assert by_contours[:, :4].tolist() == by_components[:, :4].tolist()
+    # reading order, and the 5 px wide sliver is dropped by min_side
+    assert [tuple(r) for r in by_contours[:, :4]] == [boxes[1], boxes[0], boxes[2], boxes[3]]
+
+
+def test_nested_and_merged_regions():
+    mask = mask_with([(20, 20, 200, 100), (400, 20, 40, 20), (450, 20, 40, 20)])
+    mask[60:120, 40:100] = 0                     # a notch open at the bottom, not a hole...
+    mask[80:100, 50:80] = 255                    # ...so this blob is found, inside the outer box
+    assert len(find_regions(mask)) == 4
+    assert find_regions(mask, drop_nested=True, merge_gap=6)[:, :4].tolist() == [
+        [20, 20, 200, 100], [400, 20, 90, 20],
+    ]
+
+
+def test_line_ids_tolerate_jitter_and_isolate_tall_boxes():
+    regions = rows([(200, 104, 50, 20), (20, 100, 60, 20), (100, 96, 60, 22),
+                    (20, 40, 60, 20), (300, 10, 80, 200)])
+    assert line_ids(regions).tolist() == [2, 2, 2, 0, 1]
+
+
+def test_line_segments_split_columns_at_wide_gaps():
+    regions = rows([(20, 100, 60, 20), (100, 100, 60, 20), (400, 100, 60, 20), (20, 150, 60, 20)])
+    segment, bounds = line_segments(regions, line_ids(regions))
+    assert segment.tolist() == [0, 0, 1, 2]
+    assert bounds[:, :4].tolist() == [[20, 100, 140, 20], [400, 100, 60, 20], [20, 150, 60, 20]]
+    assert bounds[:, 4].tolist() == [2400, 1200, 1200]
+
+
+def test_scale_regions_matches_scale_box():
+    regions = rows([(13, 7, 101, 33), (250, 91, 9, 17), (0, 0, 1, 1)])
+    for scale in (1.0, 0.37, 1.5, 2.0):
+        assert scale_regions(regions, scale).tolist() == [list(scale_box(tuple(r[:4]), scale)) for r in regions]
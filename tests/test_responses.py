@@ -0,0 +1,66 @@
+import base64
+import gzip
+
+import pytest
+from flask import Flask, Response
+
+from ocr_pipeline import responses
+from ocr_pipeline.responses import choose_encoding, select_fields
+
+
+@pytest.fixture
+def client(card_image):
+    app = responses.install(Flask(__name__))
+    big = {"text": ["INCOME TAX DEPARTMENT"] * 200, "summary": {"Name": "RAHUL KUMAR", "DOB": None}}
+
+    app.add_url_rule("/big", "big", lambda: responses.shaped_json(big))
+    app.add_url_rule("/image", "image", lambda: {"image": responses.image_field(card_image)})
+    app.add_url_rule("/stream", "stream", lambda: Response(iter(["x" * 4096]), mimetype="application/x-ndjson"))
+    return app.test_client()
+
+
+def test_select_fields_nested_and_in_lists():
+    data = {"document_type": "PAN Card", "cleaned_summary": {"Name": "A", "DOB": "B"}, "raw": [1]}
+    assert select_fields(data, "document_type,cleaned_summary.Name") == {
+        "document_type": "PAN Card", "cleaned_summary": {"Name": "A"}}
+    assert select_fields([data, data], ["cleaned_summary.DOB", "missing"]) == [{"cleaned_summary": {"DOB": "B"}}] * 2
+    assert select_fields(data, "") is data
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("br, gzip") == ("br" if responses.brotli else "gzip")
+
+
+def test_json_is_compressed_and_fields_applied(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert b"RAHUL" in gzip.decompress(response.get_data())
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    small = client.get("/big?fields=summary.Name", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    assert small.get_json() == {"summary": {"Name": "RAHUL KUMAR"}}
+
+
+def test_streams_are_not_compressed(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data() == b"x" * 4096
+
+
+def test_image_modes(client, card_image):
+    ref = client.get("/image").get_json()["image"]
+    assert ref["url"] == f"/images/{ref['sha1']}"
+    served = client.get(ref["url"])
+    assert served.status_code == 200
+    assert "immutable" in served.headers["Cache-Control"]
+    with open(card_image, "rb") as f:
+        raw = f.read()
+    assert served.get_data() == raw
+
+    assert base64.b64decode(client.get("/image?images=inline").get_json()["image"]) == raw
+    assert client.get("/image?images=none").get_json()["image"] is None
+    assert client.get("/images/" + "0" * 40).status_code == 404
+    assert client.get("/images/../../etc").status_code == 404
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from ocr_pipeline import results_store
+from ocr_pipeline.results_store import MAX_LIMIT, ResultsStore, search_args
+
+
+def result(filename, doc_type="PAN Card", side="Front", name="RAHUL KUMAR", dob="01/01/1990"):
+    return {"filename": filename, "document_type": doc_type, "side": side,
+            "cleaned_summary": {"Name": name, "DOB": dob, "Number": "ABCPE1234F"},
+            "raw_detected_text": ["ABCPE1234F"]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    store.add_many([result(f"{i}.jpg") for i in range(5)], source="test")
+    store.add(result("v.jpg", doc_type="Voter ID Card", side="Back", name="SUNITA DEVI", dob="02/02/1985"))
+    return store
+
+
+def test_indexed_filters(store):
+    assert [r["filename"] for r in store.search(document_type="Voter ID Card")] == ["v.jpg"]
+    assert len(store.search(dob_year=1990)) == 5
+    assert [r["filename"] for r in store.search(name="sunita")] == ["v.jpg"]
+    assert store.search(number="ABCPE1234F", limit=2)[0]["filename"] == "4.jpg"
+    assert len(store.search(source="test")) == 5
+
+
+def test_payload_round_trip(store):
+    row = store.search(filename="v.jpg", include_payload=True)[0]
+    assert row["payload"]["cleaned_summary"]["Name"] == "SUNITA DEVI"
+    assert store.get(row["id"]) == row["payload"]
+
+
+def test_limit_is_clamped(store, monkeypatch):
+    assert len(store.search(limit=-1)) == 1
+    assert len(store.search(limit=0)) == 1
+    monkeypatch.setattr(results_store, "MAX_LIMIT", 2)
+    assert len(store.search(limit=MAX_LIMIT)) == 2
+    assert len(store.search(limit=3, offset=-5)) == 2
+
+
+def test_unknown_filter(store):
+    with pytest.raises(ValueError):
+        store.search(colour="red")
+
+
+def test_search_args():
+    args = search_args({"document_type": "PAN Card", "side": "", "limit": "5", "payload": "1"})
+    assert args == {"document_type": "PAN Card", "limit": "5", "offset": 0, "include_payload": True}
+
+
+def test_get_store_reopens_after_fork(monkeypatch, tmp_path):
+    monkeypatch.setattr(results_store, "DEFAULT_DB_PATH", str(tmp_path / "shared.sqlite"))
+    monkeypatch.setattr(results_store, "_default_store", None)
+    first = results_store.get_store()
+    assert results_store.get_store() is first
+    monkeypatch.setattr(results_store, "_default_store_pid", os.getpid() + 1)   # as seen in a forked child
+    assert results_store.get_store() is not first
@@ -0,0 +1,54 @@
+from ocr_pipeline import rules, stages
+from ocr_pipeline.fields import FATHER_KEY, FIELD_SCHEMA, summary_from_fields
+
+
+def classify(blocks, **config):
+    ctx = {"blocks": blocks}
+    stages.classify_flags(ctx, **config)
+    return ctx["doc_type"], ctx["side"]
+
+
+UI_CONFIG = {"passport_keywords": rules.UI_PASSPORT_KEYWORDS, "number_patterns": False, "side": "keywords"}
+
+
+def test_flag_order_picks_pan_over_aadhaar():
+    blocks = ["INCOME TAX DEPARTMENT", "GOVERNMENT OF INDIA"]
+    assert rules.classify_flags(blocks)[0] == "PAN Card"
+
+
+def test_unflagged_blocks_are_unknown():
+    assert rules.classify_flags(["hello", "world"])[0] == rules.UNKNOWN_DOCUMENT
+
+
+def test_number_patterns_only_flag_in_the_shared_rules():
+    assert classify(["ABC1234567"])[0] == "Voter ID Card"
+    assert classify(["ABC1234567"], **UI_CONFIG)[0] == rules.UNKNOWN_DOCUMENT
+
+
+def test_ui_rules_flag_passport_from_field_labels():
+    blocks = ["DATE OF EXPIRY 01/01/2030"]
+    assert classify(blocks)[0] == rules.UNKNOWN_DOCUMENT
+    assert classify(blocks, **UI_CONFIG)[0] == "Passport"
+
+
+def test_exact_side_indicators():
+    assert classify(["INCOME TAX DEPARTMENT", "ABCDE1234F"]) == ("PAN Card", "Front")
+    assert classify(["INCOME TAX PAN SERVICES UNIT", "NSDL"]) == ("PAN Card", "Back")
+
+
+def test_ui_side_checks_aadhaar_keywords_first():
+    # PAN wins the type, but the flask_ui chain reads the side off Aadhaar's lists
+    blocks = ["INCOME TAX DEPARTMENT", "1234 5678 9012", "VID 9999"]
+    assert classify(blocks) == ("PAN Card", "Front")
+    assert classify(blocks, **UI_CONFIG) == ("PAN Card", "Back")
+    assert classify(["GOVERNMENT OF INDIA"], **UI_CONFIG) == ("Aadhaar Card", "Front")
+    assert classify(["SB A/C 1234"], **UI_CONFIG) == ("Bank Passbook", rules.UI_UNKNOWN_SIDE)
+
+
+def test_summary_father_key_follows_the_app():
+    record = dict.fromkeys(FIELD_SCHEMA)
+    record["father_name"] = {"value": "RAMESH KUMAR", "confidence": 1.0}
+    assert summary_from_fields(record, "PAN Card")[FATHER_KEY] == "RAMESH KUMAR"
+    ui_summary = summary_from_fields(record, "PAN Card", "Father's Name")
+    assert ui_summary["Father's Name"] == "RAMESH KUMAR"
+    assert FATHER_KEY not in ui_summary
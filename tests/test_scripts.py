@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+import pytest
+
+from ocr_pipeline import scripts
+from ocr_pipeline.artifacts import artifact_key
+from ocr_pipeline.stages import build_pipeline
+
+
+def hindi_words(image, x0, y0, count):
+    # Word shapes hanging from a shirorekha: a bar on top, stems below it
+    for k in range(count):
+        x = x0 + 80 * k
+        image[y0:y0 + 3, x:x + 60] = 0
+        for stem in range(0, 60, 12):
+            image[y0:y0 + 26, x + stem:x + stem + 3] = 0
+        image[y0 + 12:y0 + 15, x:x + 30] = 0
+    return image
+
+
+def latin_line(image, x0, text="Government of India"):
+    cv2.putText(image, text, (x0, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+    return image
+
+
+def blank(width):
+    return np.full((60, width), 255, np.uint8)
+
+
+def test_detect_script():
+    assert scripts.detect_script(hindi_words(blank(500), 10, 15, 5)) == scripts.DEVANAGARI
+    assert scripts.detect_script(latin_line(blank(500), 10)) == scripts.LATIN
+    assert scripts.detect_script(latin_line(hindi_words(blank(700), 10, 15, 2), 200)) == scripts.MIXED
+    assert scripts.detect_script(blank(100)) == scripts.NONE
+
+
+def test_light_text_on_a_dark_band():
+    assert scripts.detect_script(255 - hindi_words(blank(500), 10, 15, 5)) == scripts.DEVANAGARI
+
+
+@pytest.fixture
+def installed(monkeypatch):
+    def set_installed(*langs):
+        monkeypatch.setattr(scripts, "_installed", frozenset(langs))
+    return set_installed
+
+
+def test_language_routing_uses_installed_models_only(installed):
+    installed("eng")
+    assert scripts.ocr_language(scripts.DEVANAGARI) == "eng"
+    assert scripts.ocr_language(scripts.MIXED) == "eng"
+    installed("eng", "hin")
+    assert scripts.ocr_language(scripts.DEVANAGARI) == "hin"
+    assert scripts.ocr_language(scripts.MIXED) == "eng+hin"
+    assert scripts.ocr_language(scripts.LATIN) == "eng"
+
+
+def test_explicit_language_in_the_config_wins():
+    assert scripts.with_language("--psm 6", "eng") == "--psm 6"
+    assert scripts.with_language("--psm 6", "hin") == "--psm 6 -l hin"
+    assert scripts.with_language("--psm 6 -l eng", "hin") == "--psm 6 -l eng"
+
+
+def test_artifact_key_follows_routing_and_installed_models(installed, monkeypatch):
+    pipeline = build_pipeline()
+
+    def key():
+        return artifact_key("abc", pipeline.stage_configs())
+
+    installed("eng")
+    eng_only = key()
+    installed("eng", "hin")
+    assert key() != eng_only
+    with_hin = key()
+    monkeypatch.setattr(scripts, "DEVANAGARI_SHARE", 0.9)
+    stricter = key()
+    assert stricter != with_hin
+    monkeypatch.setattr(scripts, "TESSERACT_LANGS", dict(scripts.TESSERACT_LANGS, mixed=("hin",)))
+    assert key() != stricter
+    assert artifact_key("abc", build_pipeline(script_config={"devanagari": "skip"}).stage_configs()) != key()
+
+
+def test_key_includes_stage_defaults():
+    configs = build_pipeline().stage_configs()
+    assert configs["script"]["devanagari"] == scripts.DEVANAGARI_BLOCKS
+    assert configs["ocr"]["config"] == "--psm 6"
@@ -0,0 +1,32 @@
+import numpy as np
+
+from ocr_pipeline.segmentation import find_document_regions
+
+
+def sheet(cards):
+    # White A4-ish page with grey, card-shaped rectangles at (x, y, w, h)
+    image = np.full((1400, 1000, 3), 255, dtype=np.uint8)
+    for x, y, w, h in cards:
+        image[y:y+h, x:x+w] = (120, 140, 160)
+        image[y + 20:y + 40, x + 20:x + w - 20] = 0      # a line of "text"
+    return image
+
+
+def test_two_cards_are_split_in_reading_order():
+    cards = [(100, 100, 540, 340), (100, 700, 540, 340)]
+    regions = find_document_regions(sheet(cards))
+    assert len(regions) == 2
+    for (x, y, w, h), (cx, cy, cw, ch) in zip(regions, cards):
+        assert abs(x - cx) <= 10 and abs(y - cy) <= 10
+        assert abs(w - cw) <= 20 and abs(h - ch) <= 20
+
+
+def test_single_card_is_the_whole_image():
+    image = sheet([(100, 100, 540, 340)])
+    assert find_document_regions(image) == [(0, 0, 1000, 1400)]
+
+
+def test_photo_filling_the_frame_is_not_split():
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, (600, 900, 3), dtype=np.uint8)
+    assert find_document_regions(image) == [(0, 0, 900, 600)]
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+from ocr_pipeline.serving import NATIVE_THREAD_VARS, gunicorn_options
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def run_python(code):
+    env = {k: v for k, v in os.environ.items() if k not in NATIVE_THREAD_VARS}
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True,
+                         check=True)
+    return out.stdout.strip().splitlines()[-1]
+
+
+def test_thread_caps_are_set_before_numpy_loads():
+    line = run_python(
+        "import os, sys; import serve; "
+        "print('numpy' in sys.modules, 'cv2' in sys.modules, "
+        "all(os.environ[v] == '1' for v in serve.serving.NATIVE_THREAD_VARS))"
+    )
+    assert line == "False False True"
+
+
+def test_every_app_has_a_factory():
+    line = run_python(
+        "import serve; from flask import Flask; "
+        "print(all(isinstance(serve.load_app(name), Flask) for name in sorted(serve.APPS)))"
+    )
+    assert line == "True"
+
+
+def test_gunicorn_options_overrides():
+    options = gunicorn_options(workers=3, bind=None)
+    assert options["workers"] == 3
+    assert options["preload_app"] is True
+    assert options["bind"]
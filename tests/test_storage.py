@@ -0,0 +1,73 @@
+import os
+import time
+
+from ocr_pipeline import storage
+from ocr_pipeline.storage import FileStore
+
+
+class Upload:
+    # Stands in for werkzeug's FileStorage
+    def __init__(self, data):
+        self.data = data
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.data)
+
+
+def accessed_at(store, name):
+    return store._db().execute("SELECT accessed_at FROM files WHERE name = ?", (name,)).fetchone()[0]
+
+
+def test_save_shards_by_group_and_lookup_finds_it(tmp_path):
+    store = FileStore(str(tmp_path))
+    path = store.save("a.json", Upload(b"{}"), group="job1")
+    store.save("a_output.jpg", Upload(b"jpg"), group="job1")
+    assert os.path.dirname(path) == os.path.dirname(store.path_for("x", "job1"))
+    assert os.path.relpath(path, str(tmp_path)).count(os.sep) == 2
+    assert store.lookup("a.json") == path
+    assert store.lookup("missing.json") is None
+    assert store.usage() == {"files": 2, "bytes": 5}
+
+
+def test_lookup_touches_at_most_once_per_interval(tmp_path, monkeypatch):
+    store = FileStore(str(tmp_path))
+    store.save("a.png", Upload(b"x"))
+    first = accessed_at(store, "a.png")
+    store.lookup("a.png")
+    assert accessed_at(store, "a.png") == first
+    monkeypatch.setattr(storage, "TOUCH_INTERVAL", -1)
+    store.lookup("a.png")
+    assert accessed_at(store, "a.png") > first
+
+
+def test_sweep_evicts_least_recently_used_groups_whole(tmp_path, monkeypatch):
+    store = FileStore(str(tmp_path), max_bytes=10, sweep_interval=0)
+    for group in ("old", "new"):
+        store.save(f"{group}.json", Upload(b"12345"), group=group)
+        store.save(f"{group}.jpg", Upload(b"12345"), group=group)
+    monkeypatch.setattr(storage, "TOUCH_INTERVAL", -1)
+    store.lookup("new.jpg")
+    # one file of a group touched keeps the whole group
+    assert store.sweep() == 2
+    assert sorted(store.names()) == ["new.jpg", "new.json"]
+    assert not os.path.exists(store.path_for("old.json", "old"))
+
+
+def test_sweep_by_age(tmp_path):
+    store = FileStore(str(tmp_path), max_age=60, sweep_interval=0)
+    store.save("a.png", Upload(b"x"))
+    assert store.sweep() == 0
+    assert store.sweep(now=time.time() + 120) == 1
+    assert store.lookup("a.png") is None
+
+
+def test_adopt_moves_flat_legacy_files(tmp_path):
+    (tmp_path / "legacy.png").write_bytes(b"png")
+    store = FileStore(str(tmp_path))
+    # found before the migration, at its flat path
+    assert store.lookup("legacy.png") == str(tmp_path / "legacy.png")
+    assert store.lookup("../legacy.png") is None
+    assert store.adopt() == 1
+    assert not (tmp_path / "legacy.png").exists()
+    assert store.lookup("legacy.png") == store.path_for("legacy.png")